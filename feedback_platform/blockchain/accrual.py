@@ -0,0 +1,123 @@
+# feedback_platform/blockchain/accrual.py
+"""
+Crédito de recompensas por feedback em uma única transação.
+
+O saldo virtual sobe com um UPDATE relativo ao valor no banco (F()), sem o
+ler-modificar-gravar de profile.save(), então envios simultâneos do mesmo
+usuário não perdem incrementos. Onde o banco suporta (PostgreSQL, SQLite
+>= 3.35), o novo saldo volta no próprio UPDATE (RETURNING, ver
+blockchain/returning.py), sem um SELECT.
+
+Os contadores de feedback da empresa (total, aprovados, úteis) sobem na
+mesma transação que muda o feedback, também com F(), para as listagens não
+precisarem de COUNT(*).
+"""
+
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from blockchain.ledger import get_reward_ledger
+from blockchain.models import Company, Feedback, LedgerOutbox, RewardTransaction, UserProfile
+from blockchain.returning import update_returning
+
+logger = logging.getLogger(__name__)
+
+
+def reward_amount():
+    return Decimal(settings.REWARD_PER_FEEDBACK)
+
+
+def _increment_balance(user_id, amount):
+    """virtual_balance += amount no perfil de `user_id`; o novo saldo, ou None sem perfil."""
+    rows = update_returning(
+        UserProfile.objects.filter(user_id=user_id),
+        {'virtual_balance': F('virtual_balance') + amount},
+        ['virtual_balance'],
+    )
+    return rows[0][0] if rows else None
+
+
+def bump_company_counters(company_id, **deltas):
+    """Soma deltas aos contadores da empresa: bump_company_counters(1, feedback_count=1)."""
+    Company.objects.filter(id=company_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def credit_reward(user_id, amount=None):
+    """
+    Soma `amount` (padrão REWARD_PER_FEEDBACK) ao virtual_balance, criando o
+    perfil se preciso, e registra a RewardTransaction PENDING que o
+    process_reward_batch vai mintar. Retorna o novo virtual_balance.
+    """
+    amount = reward_amount() if amount is None else amount
+    with transaction.atomic():
+        balance = _increment_balance(user_id, amount)
+        if balance is None:
+            profile, created = UserProfile.objects.get_or_create(
+                user_id=user_id, defaults={'virtual_balance': amount}
+            )
+            # Outro envio criou o perfil entre o UPDATE e o INSERT
+            balance = profile.virtual_balance if created else _increment_balance(user_id, amount)
+        RewardTransaction.objects.create(user_id=user_id, amount=amount, tx_type='REWARD', status='PENDING')
+    return balance
+
+
+def submit_feedback(user, company_id, comment):
+    """
+    Cria o feedback e credita a recompensa na mesma transação. Retorna
+    (feedback, novo saldo). Com REWARD_LEDGER_BACKEND = 'redis' a recompensa
+    é gravada na LedgerOutbox junto com o feedback e vai para o ledger
+    write-behind; o saldo retornado é None (ainda não aplicado). Se o Redis
+    falhar, a linha da outbox é creditada direto no banco.
+    """
+    if settings.REWARD_LEDGER_BACKEND == 'redis':
+        with transaction.atomic():
+            feedback = Feedback.objects.create(user=user, company_id=company_id, comment=comment, is_approved=False)
+            bump_company_counters(company_id, feedback_count=1)
+            outbox = LedgerOutbox.objects.create(user=user, feedback=feedback, amount=reward_amount())
+        try:
+            get_reward_ledger().append(user.id, outbox.amount, feedback.id, outbox_id=outbox.id)
+            return feedback, None
+        except Exception as e:
+            logger.warning(f"⚠️ Ledger de recompensas indisponível ({e}); creditando direto no banco")
+            with transaction.atomic():
+                if LedgerOutbox.objects.filter(id=outbox.id).delete()[0]:
+                    return feedback, credit_reward(user.id, outbox.amount)
+            return feedback, None
+
+    with transaction.atomic():
+        feedback = Feedback.objects.create(user=user, company_id=company_id, comment=comment, is_approved=False)
+        bump_company_counters(company_id, feedback_count=1)
+        return feedback, credit_reward(user.id)
+
+
+def approve_feedback(feedback):
+    """
+    Aprova o feedback e credita a recompensa ao autor. O UPDATE só pega o
+    feedback se ainda não aprovado, então duas aprovações simultâneas não
+    recompensam duas vezes. Retorna o novo saldo do autor, ou None se o
+    feedback já estava aprovado.
+    """
+    with transaction.atomic():
+        if not Feedback.objects.filter(id=feedback.id, is_approved=False).update(is_approved=True):
+            return None
+        feedback.is_approved = True
+        bump_company_counters(feedback.company_id, approved_count=1)
+        return credit_reward(feedback.user_id)
+
+
+def mark_useful(feedback, useful=True):
+    """
+    Marca (ou desmarca) o feedback como útil e ajusta useful_count da
+    empresa. Como na aprovação, o UPDATE só pega o feedback se o valor mudar.
+    Retorna True se mudou.
+    """
+    with transaction.atomic():
+        if not Feedback.objects.filter(id=feedback.id, is_useful=not useful).update(is_useful=useful):
+            return False
+        feedback.is_useful = useful
+        bump_company_counters(feedback.company_id, useful_count=1 if useful else -1)
+    return True
@@ -7,4 +7,9 @@ class BlockchainConfig(AppConfig):
     
     def ready(self):
         import blockchain.tasks.rewards
-        import blockchain.tasks.events
\ No newline at end of file
+        import blockchain.tasks.events
+        import blockchain.tasks.withdrawals
+        import blockchain.tasks.confirmations
+        import blockchain.tasks.replacements
+        import blockchain.tasks.ledger
+        import blockchain.signals
\ No newline at end of file
@@ -0,0 +1,75 @@
+# feedback_platform/blockchain/balances.py
+"""
+Atualizações de saldo em conjunto: um SELECT para resolver carteiras em
+perfis e um UPDATE com F() para aplicar os deltas de todos eles, em vez de
+get()/save() por perfil.
+"""
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Lower
+
+from blockchain.models import UserProfile
+
+BALANCE_FIELDS = ('virtual_balance', 'blockchain_balance')
+# Perfis por SELECT/UPDATE: mantém o número de parâmetros abaixo do limite do
+# SQLite (32766) e o CASE com tamanho razoável
+PROFILE_CHUNK_SIZE = 500
+
+
+def _chunks(items):
+    items, size = list(items), PROFILE_CHUNK_SIZE
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def profile_ids_by_wallet(addresses):
+    """
+    Mapeia carteiras para ids de perfil sem diferenciar maiúsculas (usa o
+    índice em LOWER(wallet_address)): uma query a cada PROFILE_CHUNK_SIZE
+    endereços. As chaves do dict são os endereços em minúsculas.
+    """
+    mapping = {}
+    for chunk in _chunks({address.lower() for address in addresses}):
+        mapping.update(
+            UserProfile.objects.annotate(wallet_lower=Lower('wallet_address'))
+            .filter(wallet_lower__in=chunk)
+            .values_list('wallet_lower', 'id')
+        )
+    return mapping
+
+
+def _delta_expression(deltas):
+    return Case(
+        *[When(id=profile_id, then=Value(delta)) for profile_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=DecimalField(max_digits=36, decimal_places=18),
+    )
+
+
+def apply_balance_deltas(**deltas_by_field):
+    """
+    Soma deltas ({id do perfil: Decimal}) aos campos de saldo com UPDATEs
+    relativos ao valor atual no banco (F()), um a cada PROFILE_CHUNK_SIZE
+    perfis, então não perde atualizações concorrentes:
+
+        apply_balance_deltas(virtual_balance={1: -x}, blockchain_balance={1: x})
+
+    Chame dentro de transaction.atomic() se os lotes precisarem ser atômicos.
+    """
+    unknown = set(deltas_by_field) - set(BALANCE_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos de saldo inválidos: {sorted(unknown)}")
+
+    profile_ids = set()
+    for deltas in deltas_by_field.values():
+        profile_ids.update(deltas or ())
+
+    updated = 0
+    for chunk in _chunks(sorted(profile_ids)):
+        updates = {}
+        for field, deltas in deltas_by_field.items():
+            chunk_deltas = {pid: deltas[pid] for pid in chunk if deltas and pid in deltas}
+            if chunk_deltas:
+                updates[field] = F(field) + _delta_expression(chunk_deltas)
+        updated += UserProfile.objects.filter(id__in=chunk).update(**updates)
+    return updated
@@ -0,0 +1,50 @@
+# feedback_platform/blockchain/benchmarks/__init__.py
+"""
+Benchmarks executados fora do runner de testes, a partir de feedback_platform/:
+
+    python -m blockchain.benchmarks.bench_withdraw
+
+Cada script usa um banco de testes descartável (db.sqlite3 não é tocado) e
+uma chain local eth-tester (pip install "web3[tester]").
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'feedback_platform.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database(on_disk=False):
+    """
+    Cria e destrói um banco de testes, como o runner do Django faz. Com
+    on_disk=True o SQLite fica em um arquivo temporário: o banco em memória
+    não aceita escritas concorrentes de várias threads.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    db_dir = tempfile.mkdtemp() if on_disk else None
+    if db_dir:
+        connection.settings_dict['TEST']['NAME'] = os.path.join(db_dir, 'bench.sqlite3')
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if db_dir:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def report(label, count, elapsed, unit='req'):
+    rate = count / elapsed if elapsed else float('inf')
+    print(f"{label:<45} {count:>7} {unit} em {elapsed:8.3f}s → {rate:10.1f} {unit}/s")
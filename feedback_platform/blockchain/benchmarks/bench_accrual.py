@@ -0,0 +1,85 @@
+# feedback_platform/blockchain/benchmarks/bench_accrual.py
+"""
+Envios de feedback concorrentes (--clients threads) para poucos usuários:
+o fluxo antigo da view (create, get_or_create, virtual_balance += ...;
+save(), create, cada um em autocommit) contra blockchain.accrual (uma
+transação, UPDATE com F() ... RETURNING). Mede feedbacks/s e confere se o
+virtual_balance final bate com o número de recompensas: o fluxo antigo
+perde incrementos quando dois envios do mesmo usuário se cruzam.
+
+O banco de testes é um SQLite em arquivo (escritas de várias threads).
+
+    python -m blockchain.benchmarks.bench_accrual [--feedbacks 2000] [--clients 8] [--users 4]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from blockchain import accrual  # noqa: E402
+from blockchain.models import Company, Feedback, RewardTransaction, UserProfile  # noqa: E402
+
+
+def legacy_submit(user, company_id, comment):
+    """O corpo de submit_feedback antes do blockchain.accrual."""
+    Feedback.objects.create(user=user, company_id=company_id, comment=comment, is_approved=False)
+    profile, created = UserProfile.objects.get_or_create(user=user)
+    profile.virtual_balance += accrual.reward_amount()
+    profile.save()
+    RewardTransaction.objects.create(user=user, amount=accrual.reward_amount(), tx_type='REWARD', status='PENDING')
+
+
+def run(label, submit, users, company, count, clients):
+    UserProfile.objects.update(virtual_balance=0)
+    RewardTransaction.objects.all().delete()
+    Feedback.objects.all().delete()
+
+    def client(indexes):
+        try:
+            for i in indexes:
+                submit(users[i % len(users)], company.id, f"feedback {i}")
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, [range(c, count, clients) for c in range(clients)]))
+    elapsed = time.perf_counter() - start
+
+    report(label, count, elapsed, unit="feedbacks")
+    expected = RewardTransaction.objects.aggregate(total=Sum('amount'))['total']
+    balance = UserProfile.objects.aggregate(total=Sum('virtual_balance'))['total']
+    lost = (expected - balance) / accrual.reward_amount()
+    print(f"{'':<45} saldo {balance} de {expected} esperados ({lost:.0f} incrementos perdidos)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feedbacks", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--users", type=int, default=4)
+    args = parser.parse_args()
+
+    with test_database(on_disk=True), override_settings(DEBUG=False, REWARD_PER_FEEDBACK=Decimal("0.5")):
+        users = [User.objects.create_user(username=f"bench_{i}") for i in range(args.users)]
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        company = Company.objects.create(name="Bench")
+        # A conexão principal não pode segurar o banco enquanto as threads escrevem
+        connection.close()
+
+        run("view antiga (autocommit, save())", legacy_submit, users, company, args.feedbacks, args.clients)
+        run("blockchain.accrual (atomic, F())", accrual.submit_feedback, users, company, args.feedbacks, args.clients)
+
+
+if __name__ == "__main__":
+    main()
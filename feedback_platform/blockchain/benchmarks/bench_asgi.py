@@ -0,0 +1,183 @@
+# feedback_platform/blockchain/benchmarks/bench_asgi.py
+"""
+Pedidos de saque (POST /api/tokens/withdraw/) concorrentes sob WSGI e ASGI,
+no mesmo processo e sem servidor HTTP: as requisições vão direto para o
+handler de cada protocolo.
+
+O envio ao broker (schedule_withdrawal, depois do commit da reserva) é
+substituído por um stand-in que demora --delay segundos, como um broker/nó
+remoto lento. Sob WSGI cada requisição ocupa uma das --threads threads do
+worker (como gunicorn --threads) até o fim; sob ASGI um único event loop
+mantém --concurrency requisições em andamento, cada uma com sua thread para
+o trecho síncrono.
+
+O banco de testes é um SQLite em arquivo. Com centenas de escritores o
+SQLite espera pelo lock em sleeps de até 100 ms, o que mediria o SQLite e
+não o protocolo; por isso a reserva do saque passa por um lock no processo,
+que enfileira as escritas como um servidor de banco faria.
+
+    python -m blockchain.benchmarks.bench_asgi [--requests 400] [--delay 0.1]
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from blockchain.models import RewardTransaction, UserProfile  # noqa: E402
+from blockchain.views import reserve_withdrawal  # noqa: E402
+
+CSRF_TOKEN = "a" * 32
+WALLET = "0x2222222222222222222222222222222222222222"
+BODY = f"amount=1&wallet_address={WALLET}".encode()
+
+
+def session_cookie():
+    user = User.objects.create_user(username="bench_asgi", password="bench")
+    UserProfile.objects.create(user=user, blockchain_balance=Decimal(10 ** 9))
+    client = Client()
+    client.login(username="bench_asgi", password="bench")
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f"{settings.SESSION_COOKIE_NAME}={session}; {settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}"
+
+
+def wsgi_post(app, path, cookie):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_TYPE": "application/x-www-form-urlencoded",
+        "CONTENT_LENGTH": str(len(BODY)),
+        "HTTP_COOKIE": cookie,
+        "HTTP_X_CSRFTOKEN": CSRF_TOKEN,
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(BODY),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+    response = app(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+    b"".join(response)
+    response.close()
+    return status[0]
+
+
+async def asgi_post(app, path, cookie):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/x-www-form-urlencoded"),
+            (b"content-length", str(len(BODY)).encode()),
+            (b"cookie", cookie.encode()),
+            (b"x-csrftoken", CSRF_TOKEN.encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": BODY, "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # O cliente nunca desconecta; o Django cancela esta espera ao responder
+        await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_wsgi(path, cookie, count, threads):
+    app = get_wsgi_application()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        statuses = list(executor.map(lambda _: wsgi_post(app, path, cookie), range(count)))
+    return statuses, time.perf_counter() - start
+
+
+def run_asgi(path, cookie, count, concurrency):
+    app = get_asgi_application()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            return await asgi_post(app, path, cookie)
+
+    async def main():
+        return await asyncio.gather(*(one() for _ in range(count)))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(main())
+    return statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--delay", type=float, default=0.1, help="latência do broker/nó simulado (s)")
+    parser.add_argument("--threads", type=int, default=8, help="threads do worker WSGI")
+    parser.add_argument("--concurrency", type=int, default=200, help="requisições em andamento no ASGI")
+    args = parser.parse_args()
+
+    write_lock = threading.Lock()
+
+    def reserve_then_enqueue(*reserve_args):
+        with write_lock:
+            withdrawal = reserve_withdrawal(*reserve_args)
+        # Envio ao broker simulado: logo depois do commit, na mesma thread
+        time.sleep(args.delay)
+        return withdrawal
+
+    with test_database(on_disk=True), override_settings(DEBUG=False, MIN_WITHDRAWAL="1"), mock.patch(
+        "blockchain.views.schedule_withdrawal"
+    ), mock.patch("blockchain.views.reserve_withdrawal", reserve_then_enqueue):
+        cookie = session_cookie()
+        path = reverse("withdraw-tokens")
+        for label, run, workers in (
+            (f"WSGI, {args.threads} threads", run_wsgi, args.threads),
+            (f"ASGI, {args.concurrency} em andamento", run_asgi, args.concurrency),
+        ):
+            statuses, elapsed = run(path, cookie, args.requests, workers)
+            assert set(statuses) == {202}, sorted(set(statuses))
+            report(label, len(statuses), elapsed)
+        assert RewardTransaction.objects.filter(tx_type="WITHDRAWAL").count() == 2 * args.requests
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# feedback_platform/blockchain/benchmarks/bench_balances.py
+"""
+Leitura de saldos de muitas carteiras contra um nó JSON-RPC local (eth-tester
+servido por HTTP) com latência injetada por requisição HTTP, comparando:
+
+  - check_balance: um balanceOf (uma requisição) por carteira
+  - balances_of:   eth_calls empacotados em requisições JSON-RPC em lote,
+                   com vários lotes em paralelo
+
+O caminho Multicall3 (MULTICALL3_ADDRESS) não é medido aqui: o eth-tester não
+tem o contrato deployado.
+
+    python -m blockchain.benchmarks.bench_balances [--wallets 2000] [--delay 0.02]
+"""
+
+import argparse
+import time
+
+from blockchain.benchmarks import report, setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+
+from blockchain import services  # noqa: E402
+from blockchain.testing import TEST_PRIVATE_KEY, RPCStubServer, deploy_feedback_token  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wallets", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.02, help="atraso por requisição HTTP (s)")
+    parser.add_argument("--sequential", type=int, default=200, help="carteiras lidas uma a uma")
+    args = parser.parse_args()
+
+    with RPCStubServer() as stub, override_settings(
+        WEB3_HTTP_PROVIDER_URL=stub.url,
+        CONTRACT_ADDRESS=deploy_feedback_token(stub.w3),
+        PRIVATE_KEY=TEST_PRIVATE_KEY,
+        CHAIN_ID=stub.w3.eth.chain_id,
+        NONCE_BACKEND="local",
+    ):
+        service = services.BlockchainService()
+        wallets = [services.Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(args.wallets)]
+        for i in range(0, len(wallets), services.MAX_BATCH_SIZE):
+            chunk = wallets[i:i + services.MAX_BATCH_SIZE]
+            service.batch_mint(chunk, [1] * len(chunk))
+        stub.delay = args.delay
+
+        sample = wallets[:args.sequential]
+        start = time.perf_counter()
+        for wallet in sample:
+            service.check_balance(wallet)
+        report("check_balance (1 requisição por carteira)", len(sample), time.perf_counter() - start,
+               unit="saldos")
+
+        expected = None
+        for chunk_size, concurrency in ((100, 1), (500, 1), (500, 4)):
+            start = time.perf_counter()
+            balances = service.balances_of(wallets, chunk_size=chunk_size, concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            report(f"balances_of (lote {chunk_size}, {concurrency} em paralelo)", len(balances), elapsed,
+                   unit="saldos")
+            expected = expected or balances
+            assert balances == expected
+
+
+if __name__ == "__main__":
+    main()
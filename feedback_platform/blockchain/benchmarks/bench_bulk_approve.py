@@ -0,0 +1,72 @@
+# feedback_platform/blockchain/benchmarks/bench_bulk_approve.py
+"""
+Aprovação de --feedbacks feedbacks pendentes (de --users autores): um por
+vez com accrual.approve_feedback, como a view de aprovação individual faz,
+contra blockchain.moderation.bulk_approve_feedback (UPDATE ... RETURNING,
+bulk_create e UPDATE com F() por lote). Confere que os saldos batem.
+
+    python -m blockchain.benchmarks.bench_bulk_approve [--feedbacks 5000] [--users 100]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from blockchain import accrual  # noqa: E402
+from blockchain.models import Company, Feedback, RewardTransaction, UserProfile  # noqa: E402
+from blockchain.moderation import bulk_approve_feedback, select_pending  # noqa: E402
+
+
+def reset(users, company, count):
+    Feedback.objects.all().delete()
+    RewardTransaction.objects.all().delete()
+    UserProfile.objects.update(virtual_balance=0)
+    Company.objects.update(approved_count=0)
+    Feedback.objects.bulk_create(
+        (Feedback(user=users[i % len(users)], company=company, comment=f"feedback {i}") for i in range(count)),
+        batch_size=5000,
+    )
+
+
+def check_totals(count):
+    balance = UserProfile.objects.aggregate(total=Sum("virtual_balance"))["total"]
+    assert balance == count * accrual.reward_amount(), (balance, count)
+    assert RewardTransaction.objects.count() == count
+    assert Company.objects.get().approved_count == count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feedbacks", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    with test_database(on_disk=True), override_settings(DEBUG=False, REWARD_PER_FEEDBACK=Decimal("0.5")):
+        users = [User.objects.create_user(username=f"bench_{i}") for i in range(args.users)]
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        company = Company.objects.create(name="Bench")
+
+        reset(users, company, args.feedbacks)
+        start = time.perf_counter()
+        for feedback in Feedback.objects.only("id", "user_id", "company_id", "is_approved"):
+            accrual.approve_feedback(feedback)
+        report("um por vez (approve_feedback)", args.feedbacks, time.perf_counter() - start, unit="feedbacks")
+        check_totals(args.feedbacks)
+
+        reset(users, company, args.feedbacks)
+        start = time.perf_counter()
+        approved = bulk_approve_feedback(select_pending(company_id=company.id))
+        report("em massa (bulk_approve_feedback)", approved, time.perf_counter() - start, unit="feedbacks")
+        check_totals(args.feedbacks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# feedback_platform/blockchain/benchmarks/bench_calldata.py
+"""
+Montagem do calldata de batchMint por lote: contract.functions.batchMint(...)
++ build_transaction (encoder genérico do web3, como era no batch_mint) contra
+o encoder direto de blockchain/calldata.py, para cada tamanho de lote. Só
+CPU: sem chain e sem banco. Confere que os dois calldatas são idênticos.
+
+    python -m blockchain.benchmarks.bench_calldata [--iterations 200] [--sizes 10 50 100]
+"""
+
+import argparse
+import time
+
+from blockchain.benchmarks import report, setup_django
+
+setup_django()
+
+from web3 import Web3  # noqa: E402
+
+from blockchain.calldata import batch_mint_call  # noqa: E402
+from blockchain.services import MAX_BATCH_SIZE, load_contract_artifact  # noqa: E402
+
+PARAMS = {"chainId": 1, "gas": 5_000_000, "nonce": 0, "maxFeePerGas": 3 * 10 ** 9, "maxPriorityFeePerGas": 10 ** 9}
+
+
+def run(label, iterations, build):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        tx = build()
+    elapsed = time.perf_counter() - start
+    report(label, iterations, elapsed, unit="lotes")
+    return tx["data"], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, MAX_BATCH_SIZE])
+    args = parser.parse_args()
+
+    contract = Web3().eth.contract(
+        address=Web3.to_checksum_address("0x" + "ff" * 20), abi=load_contract_artifact()["abi"]
+    )
+    for size in args.sizes:
+        recipients = [Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(size)]
+        amounts = [(i + 1) * 10 ** 18 for i in range(size)]
+
+        generic, generic_elapsed = run(
+            f"web3 build_transaction, {size} destinatários", args.iterations,
+            lambda: contract.functions.batchMint(recipients, amounts).build_transaction(PARAMS),
+        )
+        direct, direct_elapsed = run(
+            f"calldata direto, {size} destinatários", args.iterations,
+            lambda: batch_mint_call(contract, recipients, amounts).build_transaction(PARAMS),
+        )
+        assert generic == direct, "calldata diverge do encoder do web3"
+        print(f"{'':<45} {generic_elapsed / direct_elapsed:.0f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
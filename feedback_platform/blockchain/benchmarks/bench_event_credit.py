@@ -0,0 +1,96 @@
+# feedback_platform/blockchain/benchmarks/bench_event_credit.py
+"""
+Aplicação de créditos de eventos BatchMinted sintéticos (sem chain),
+comparando:
+
+  - por destinatário: get(wallet_address__iexact) + save() em um atomic()
+                      por destinatário (implementação anterior)
+  - em conjunto:      apply_block_range, que resolve as carteiras em uma
+                      query e credita com UPDATE/F() numa transação por intervalo
+
+    python -m blockchain.benchmarks.bench_event_credit [--events 500] [--recipients 100]
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from hexbytes import HexBytes  # noqa: E402
+from web3.datastructures import AttributeDict  # noqa: E402
+
+from blockchain.models import ChainCursor, ProcessedLog, UserProfile  # noqa: E402
+from blockchain.services import Web3  # noqa: E402
+from blockchain.tasks.events import BATCH_MINTED, apply_block_range, get_event_cursor  # noqa: E402
+
+WALLETS = 5000
+EVENTS_PER_BLOCK_RANGE = 200
+
+
+def synthetic_events(wallets, count, recipients):
+    rng = random.Random(42)
+    return [
+        AttributeDict({
+            "blockNumber": i,
+            "transactionHash": HexBytes("0x%064x" % (i + 1)),
+            "logIndex": 0,
+            "args": AttributeDict({
+                "recipients": rng.sample(wallets, recipients),
+                "amounts": [10**18] * recipients,
+            }),
+        })
+        for i in range(count)
+    ]
+
+
+def credit_per_recipient(events):
+    for event in events:
+        for recipient, amount in zip(event.args.recipients, event.args.amounts):
+            with transaction.atomic():
+                profile = UserProfile.objects.get(wallet_address__iexact=recipient)
+                profile.blockchain_balance += Decimal(amount) / Decimal(10**18)
+                profile.save(update_fields=['blockchain_balance'])
+
+
+def credit_set_based(events):
+    ChainCursor.objects.all().delete()
+    ProcessedLog.objects.all().delete()
+    cursor = get_event_cursor("0x" + "77" * 20, BATCH_MINTED, 0)
+    for start in range(0, len(events), EVENTS_PER_BLOCK_RANGE):
+        chunk = events[start:start + EVENTS_PER_BLOCK_RANGE]
+        apply_block_range(cursor, chunk[0].blockNumber, chunk[-1].blockNumber, chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--recipients", type=int, default=100)
+    args = parser.parse_args()
+
+    with test_database(), override_settings(DEBUG=False):
+        users = User.objects.bulk_create(User(username=f"bench_{i}") for i in range(WALLETS))
+        wallets = [Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(WALLETS)]
+        UserProfile.objects.bulk_create(
+            UserProfile(user=user, wallet_address=wallet.lower()) for user, wallet in zip(users, wallets)
+        )
+        events = synthetic_events(wallets, args.events, args.recipients)
+
+        for label, credit in [("por destinatário", credit_per_recipient), ("em conjunto", credit_set_based)]:
+            UserProfile.objects.update(blockchain_balance=0)
+            start = time.perf_counter()
+            credit(events)
+            elapsed = time.perf_counter() - start
+            report(label, len(events), elapsed, unit="eventos")
+            total = sum(UserProfile.objects.values_list("blockchain_balance", flat=True))
+            assert total == args.events * args.recipients, total
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# feedback_platform/blockchain/benchmarks/bench_event_scan.py
+"""
+Catch-up do listener de BatchMinted sobre um backlog grande de blocos,
+contra um provider simulado: cada get_logs custa --latency segundos e
+intervalos acima de --provider-limit blocos são recusados com "query
+returned more than 10000 results" (como Alchemy/Infura). Compara:
+
+  - intervalo único:   o get_logs(from_block, 'latest') antigo
+  - janela fixa:       EVENT_SCAN_BLOCK_RANGE, sem adaptação nem paralelismo
+  - adaptativa:        janela que cresce/encolhe, sequencial
+  - adaptativa ×N:     janela adaptativa com N buscas em paralelo
+
+    python -m blockchain.benchmarks.bench_event_scan [--blocks 1000000] [--latency 0.05]
+"""
+
+import argparse
+import threading
+import time
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+
+from blockchain.models import ChainCursor  # noqa: E402
+from blockchain.tasks.events import BATCH_MINTED, ScanWindow, get_event_cursor, scan_events  # noqa: E402
+
+
+class SimulatedLogProvider:
+    """Serviço falso: só contract.address e contract.events.BatchMinted.get_logs."""
+
+    def __init__(self, latency, limit):
+        self.latency = latency
+        self.limit = limit
+        self.calls = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+        self.contract = self
+        self.events = self
+        self.BatchMinted = self
+        self.address = "0x" + "55" * 20
+
+    def get_logs(self, from_block, to_block):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if to_block - from_block + 1 > self.limit:
+                self.refused += 1
+                raise ValueError({"code": -32005, "message": "query returned more than 10000 results"})
+        return []
+
+
+def run(label, blocks, latency, limit, window, concurrency):
+    ChainCursor.objects.all().delete()
+    provider = SimulatedLogProvider(latency, limit)
+    cursor = get_event_cursor(provider.address, BATCH_MINTED, 0)
+    start = time.perf_counter()
+    with override_settings(EVENT_SCAN_CONCURRENCY=concurrency):
+        scan_events(provider, cursor, blocks - 1, window)
+    elapsed = time.perf_counter() - start
+    report(label, blocks, elapsed, unit="blocos")
+    print(f"{'':<45} {provider.calls} chamadas get_logs, {provider.refused} recusadas")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, default=1_000_000)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência por get_logs (s)")
+    parser.add_argument("--provider-limit", type=int, default=10_000, help="maior intervalo aceito")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with test_database():
+        common = (args.blocks, args.latency, args.provider_limit)
+        try:
+            SimulatedLogProvider(args.latency, args.provider_limit).get_logs(0, args.blocks - 1)
+        except ValueError as e:
+            print(f"{'intervalo único':<45} falhou: {e}")
+        run("janela fixa (2000 blocos)", *common, ScanWindow(2000, 2000, 1000), 1)
+        run("adaptativa", *common, ScanWindow(2000, 100_000, 1000), 1)
+        run(f"adaptativa ×{args.concurrency}", *common, ScanWindow(2000, 100_000, 1000), args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# feedback_platform/blockchain/benchmarks/bench_ledger.py
+"""
+Envios de feedback concorrentes (--clients threads, --users usuários) com a
+recompensa creditada na hora (REWARD_LEDGER_BACKEND = 'db') e com o ledger
+write-behind ('redis'): no segundo, mede também o flush_reward_ledger que
+aplica os eventos somados por usuário, e confere que os saldos batem.
+
+Sem --redis-url usa fakeredis no próprio processo (o XADD não paga a ida e
+volta de rede); aponte para o Redis do Celery para números reais.
+
+    python -m blockchain.benchmarks.bench_ledger [--feedbacks 5000] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from blockchain import accrual  # noqa: E402
+from blockchain.ledger import RewardLedger  # noqa: E402
+from blockchain.models import Company, Feedback, RewardTransaction, UserProfile  # noqa: E402
+from blockchain.tasks.ledger import flush_reward_ledger  # noqa: E402
+
+STREAM = "rewards:bench"
+
+
+def make_ledger(url):
+    if url:
+        ledger = RewardLedger.from_url(url)
+    else:
+        import fakeredis
+        ledger = RewardLedger(fakeredis.FakeRedis())
+    ledger.stream = STREAM
+    ledger.client.delete(STREAM)
+    return ledger
+
+
+def submit_all(users, company, count, clients):
+    def client(indexes):
+        try:
+            for i in indexes:
+                accrual.submit_feedback(users[i % len(users)], company.id, f"feedback {i}")
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, [range(c, count, clients) for c in range(clients)]))
+    return time.perf_counter() - start
+
+
+def reset():
+    UserProfile.objects.update(virtual_balance=0)
+    RewardTransaction.objects.all().delete()
+    Feedback.objects.all().delete()
+
+
+def check_totals(count):
+    balance = UserProfile.objects.aggregate(total=Sum('virtual_balance'))['total']
+    assert balance == count * accrual.reward_amount(), (balance, count)
+    rows = RewardTransaction.objects.count()
+    print(f"{'':<45} saldos corretos; {rows} RewardTransaction para {count} feedbacks")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feedbacks", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    ledger = make_ledger(args.redis_url)
+    with test_database(on_disk=True), override_settings(
+        DEBUG=False, REWARD_PER_FEEDBACK=Decimal("0.5")
+    ), mock.patch("blockchain.accrual.get_reward_ledger", return_value=ledger), mock.patch(
+        "blockchain.tasks.ledger.get_reward_ledger", return_value=ledger
+    ):
+        users = [User.objects.create_user(username=f"bench_{i}") for i in range(args.users)]
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        company = Company.objects.create(name="Bench")
+        connection.close()
+
+        with override_settings(REWARD_LEDGER_BACKEND="db"):
+            elapsed = submit_all(users, company, args.feedbacks, args.clients)
+        report("crédito na hora (db)", args.feedbacks, elapsed, unit="feedbacks")
+        check_totals(args.feedbacks)
+
+        reset()
+        connection.close()
+        with override_settings(REWARD_LEDGER_BACKEND="redis"):
+            elapsed = submit_all(users, company, args.feedbacks, args.clients)
+            report("write-behind (redis): envio", args.feedbacks, elapsed, unit="feedbacks")
+            start = time.perf_counter()
+            applied = flush_reward_ledger()
+            report("write-behind (redis): flush", applied, time.perf_counter() - start, unit="eventos")
+        check_totals(args.feedbacks)
+
+
+if __name__ == "__main__":
+    main()
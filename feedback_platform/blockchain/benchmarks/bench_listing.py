@@ -0,0 +1,116 @@
+# feedback_platform/blockchain/benchmarks/bench_listing.py
+"""
+Listagens de feedback sobre --feedbacks linhas (--companies empresas, um
+terço aprovado): uma página profunda da fila de moderação e de uma empresa
+por OFFSET sem os índices de Feedback (como antes) e por keyset com os
+índices, e os contadores da empresa por COUNT(*) contra os campos mantidos
+por blockchain.accrual.
+
+    python -m blockchain.benchmarks.bench_listing [--feedbacks 200000] [--depth 0.8]
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Q  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from blockchain.models import Company, Feedback  # noqa: E402
+from blockchain.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_queryset  # noqa: E402
+
+REPEAT = 50
+
+
+def populate(count, companies):
+    user = User.objects.create_user(username="bench_listing")
+    companies = Company.objects.bulk_create(Company(name=f"Empresa {i}") for i in range(companies))
+    start = timezone.now() - timedelta(days=30)
+    Feedback.objects.bulk_create(
+        (
+            Feedback(
+                user=user,
+                company=companies[i % len(companies)],
+                comment=f"feedback {i}",
+                is_approved=i % 3 == 0,
+                is_useful=i % 7 == 0,
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+    # auto_now_add grava o mesmo instante em todos: espalha em 30 dias
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE blockchain_feedback SET created_at = datetime(%s, '+' || id || ' seconds')",
+            [start.strftime("%Y-%m-%d %H:%M:%S")],
+        )
+    for company in companies:
+        counts = Feedback.objects.filter(company=company).aggregate(
+            total=Count("id"), approved=Count("id", filter=Q(is_approved=True)), useful=Count("id", filter=Q(is_useful=True))
+        )
+        Company.objects.filter(id=company.id).update(
+            feedback_count=counts["total"], approved_count=counts["approved"], useful_count=counts["useful"]
+        )
+    return companies
+
+
+def timed(label, query, unit="páginas"):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        query()
+    report(label, REPEAT, time.perf_counter() - start, unit=unit)
+
+
+def offset_page(queryset, offset):
+    return lambda: list(queryset.order_by("-created_at", "-id")[offset:offset + DEFAULT_PAGE_SIZE])
+
+
+def keyset_page(queryset, offset):
+    cursor = encode_cursor(queryset.order_by("-created_at", "-id")[offset - 1])
+    return lambda: list(keyset_queryset(queryset, cursor)[:DEFAULT_PAGE_SIZE])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feedbacks", type=int, default=200000)
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--depth", type=float, default=0.8, help="posição da página na listagem (0-1)")
+    args = parser.parse_args()
+
+    with test_database(), override_settings(DEBUG=False):
+        company = populate(args.feedbacks, args.companies)[0]
+        pending = Feedback.objects.filter(is_approved=False)
+        by_company = Feedback.objects.filter(company=company)
+        pending_offset = int(pending.count() * args.depth)
+        company_offset = int(by_company.count() * args.depth)
+
+        indexes = Feedback._meta.indexes
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(Feedback, index)
+        timed("moderação, OFFSET sem índices", offset_page(pending, pending_offset))
+        timed("empresa, OFFSET sem índices", offset_page(by_company, company_offset))
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Feedback, index)
+        timed("moderação, keyset (feedback_pending_idx)", keyset_page(pending, pending_offset))
+        timed("empresa, keyset (índice por empresa)", keyset_page(by_company, company_offset))
+
+        timed("contadores da empresa, COUNT(*)", lambda: by_company.aggregate(
+            total=Count("id"), approved=Count("id", filter=Q(is_approved=True)), useful=Count("id", filter=Q(is_useful=True))
+        ), unit="leituras")
+        timed("contadores da empresa, campos", lambda: Company.objects.values(
+            "feedback_count", "approved_count", "useful_count"
+        ).get(id=company.id), unit="leituras")
+
+
+if __name__ == "__main__":
+    main()
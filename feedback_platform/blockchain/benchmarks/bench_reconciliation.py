@@ -0,0 +1,90 @@
+# feedback_platform/blockchain/benchmarks/bench_reconciliation.py
+"""
+Reconciliação de blockchain_balance sobre muitos perfis contra um serviço
+simulado: cada lote de BALANCE_READ_CHUNK_SIZE saldos custa --latency
+segundos (uma requisição em lote / eth_call ao Multicall3). Compara a
+reconciliação em um processo com o pool de --workers processos e extrapola
+o tempo para 1M de carteiras.
+
+O pool usa fork (Linux): os filhos herdam o banco de testes em memória e o
+serviço simulado.
+
+    python -m blockchain.benchmarks.bench_reconciliation [--profiles 100000] [--latency 0.05]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from blockchain.models import UserProfile  # noqa: E402
+from blockchain.reconciliation import reconcile_balances  # noqa: E402
+
+
+class SimulatedBalanceService:
+    """Serviço falso: balances_of devolve 1 FBTK por carteira, com latência por lote."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def balances_of(self, addresses, block="latest"):
+        chunks = -(-len(addresses) // settings.BALANCE_READ_CHUNK_SIZE)
+        # Lotes em paralelo dentro do processo, como em iter_balances
+        time.sleep(self.latency * -(-chunks // settings.BALANCE_READ_CONCURRENCY))
+        return {address: Decimal(1) for address in addresses}
+
+
+def create_profiles(count):
+    users = User.objects.bulk_create(User(username=f"bench_{i}") for i in range(count))
+    UserProfile.objects.bulk_create(
+        (
+            UserProfile(
+                user=user,
+                wallet_address="0x%040x" % (i + 1),
+                # 1% com divergência
+                blockchain_balance=Decimal(1) if i % 100 else Decimal("0.5"),
+            )
+            for i, user in enumerate(users)
+        ),
+        batch_size=5000,
+    )
+
+
+def run(label, count, workers, chunk_size):
+    start = time.perf_counter()
+    scanned = drifted = 0
+    for partition_count, drifts in reconcile_balances(0, chunk_size=chunk_size, workers=workers):
+        scanned += partition_count
+        drifted += len(drifts)
+    elapsed = time.perf_counter() - start
+    assert scanned == count and drifted == count // 100, (scanned, drifted)
+    report(label, scanned, elapsed, unit="carteiras")
+    print(f"{'':<45} 1M carteiras em ~{elapsed * 1_000_000 / scanned / 60:.1f} min")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência por lote de saldos (s)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with test_database(), override_settings(DEBUG=False), mock.patch(
+        "blockchain.reconciliation.get_blockchain_service", return_value=SimulatedBalanceService(args.latency)
+    ):
+        create_profiles(args.profiles)
+        run("1 processo", args.profiles, 1, args.chunk_size)
+        run(f"pool de {args.workers} processos", args.profiles, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# feedback_platform/blockchain/benchmarks/bench_reward_batch.py
+"""
+Memória e tempo de process_reward_batch conforme o backlog de recompensas
+PENDING cresce. O batch_mint é simulado (sem chain): mede só o lado do banco.
+O pico de memória (tracemalloc) deve ficar estável, limitado por
+REWARD_CLAIM_CHUNK_SIZE, e não crescer com o backlog; as queries por lote
+de mint não devem crescer com o número de carteiras do lote.
+
+    python -m blockchain.benchmarks.bench_reward_batch [--sizes 1000 10000 50000]
+"""
+
+import argparse
+import time
+import tracemalloc
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from blockchain.models import RewardTransaction, UserProfile  # noqa: E402
+from blockchain.services import MAX_BATCH_SIZE  # noqa: E402
+from blockchain.tasks.rewards import process_reward_batch  # noqa: E402
+
+WALLETS = 500
+
+
+class StubService:
+    """Sem chain e sem guardar as chamadas (um Mock acumularia os argumentos)."""
+
+    contract = True
+
+    def batch_mint(self, recipients, amounts):
+        return "0x" + "ab" * 32
+
+
+def create_backlog(users, count):
+    RewardTransaction.objects.all().delete()
+    RewardTransaction.objects.bulk_create(
+        (
+            RewardTransaction(user=users[i % len(users)], amount=Decimal("0.5"), tx_type="REWARD")
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50, MAX_BATCH_SIZE])
+    args = parser.parse_args()
+
+    # DEBUG=False como num worker: com DEBUG o Django guarda as últimas queries
+    with test_database(), override_settings(DEBUG=False):
+        users = User.objects.bulk_create(User(username=f"bench_{i}") for i in range(WALLETS))
+        UserProfile.objects.bulk_create(
+            UserProfile(user=user, wallet_address="0x%040x" % (i + 1)) for i, user in enumerate(users)
+        )
+
+        with mock.patch("blockchain.tasks.rewards.get_blockchain_service", return_value=StubService()):
+            for size in args.sizes:
+                create_backlog(users, size)
+                tracemalloc.start()
+                start = time.perf_counter()
+                process_reward_batch()
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                report(f"process_reward_batch ({size} pendentes)", size, elapsed, unit="recompensas")
+                print(f"{'':<45} pico de memória: {peak / 1024:,.0f} KiB")
+
+            # Um lote de mint com uma recompensa por carteira
+            for batch_size in args.batch_sizes:
+                create_backlog(users[:batch_size], batch_size)
+                with CaptureQueriesContext(connection) as ctx:
+                    process_reward_batch()
+                print(f"lote de {batch_size:>4} carteiras: {len(ctx.captured_queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
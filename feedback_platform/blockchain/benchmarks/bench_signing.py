@@ -0,0 +1,94 @@
+# feedback_platform/blockchain/benchmarks/bench_signing.py
+"""
+Transações batchMint (--batch destinatários) codificadas e assinadas por
+segundo: inline em uma thread, inline em --threads threads (como os envios
+paralelos de process_reward_batch, disputando o GIL) e no SigningPool com
+--workers processos alimentado pelas mesmas threads. Só CPU: sem chain e
+sem banco, a transação assinada não é transmitida.
+
+    python -m blockchain.benchmarks.bench_signing [--txs 2000] [--workers 4]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchain.benchmarks import report, setup_django
+
+setup_django()
+
+from web3 import Web3  # noqa: E402
+
+from blockchain.services import MAX_BATCH_SIZE, load_contract_artifact  # noqa: E402
+from blockchain.signing import SigningPool  # noqa: E402
+from blockchain.testing import TEST_PRIVATE_KEY  # noqa: E402
+
+CONTRACT_ADDRESS = "0x" + "ff" * 20
+FEES = {"type": 2, "maxFeePerGas": 3 * 10 ** 9, "maxPriorityFeePerGas": 10 ** 9}
+
+
+def make_calls(w3, count, batch):
+    contract = w3.eth.contract(address=Web3.to_checksum_address(CONTRACT_ADDRESS), abi=load_contract_artifact()["abi"])
+    wallets = [Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(batch)]
+    return [
+        (
+            contract.functions.batchMint(wallets, [10 ** 18] * batch),
+            {"chainId": 1, "gas": 5_000_000, "nonce": nonce, **FEES},
+        )
+        for nonce in range(count)
+    ]
+
+
+def sign_inline(w3, call):
+    tx_function, params = call
+    tx = tx_function.build_transaction(params)
+    return w3.eth.account.sign_transaction(tx, TEST_PRIVATE_KEY).raw_transaction
+
+
+def sign_pool(pool, call):
+    tx_function, params = call
+    return pool.sign({"to": tx_function.address, "value": 0, **params}, tx_function.abi, tx_function.args)[1]
+
+
+def run(label, calls, sign, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        signed = [sign(call) for call in calls]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            signed = list(executor.map(sign, calls))
+    elapsed = time.perf_counter() - start
+    report(label, len(signed), elapsed, unit="tx")
+    return signed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    w3 = Web3()
+    calls = make_calls(w3, args.txs, args.batch)
+
+    baseline = run("inline, 1 thread", calls, lambda call: sign_inline(w3, call), 1)
+    run(f"inline, {args.threads} threads", calls, lambda call: sign_inline(w3, call), args.threads)
+
+    pool = SigningPool(TEST_PRIVATE_KEY, args.workers)
+    try:
+        # Sobe os processos (spawn) antes de medir
+        list(ThreadPoolExecutor(args.workers).map(lambda call: sign_pool(pool, call), calls[: args.workers]))
+        signed = run(
+            f"pool de {args.workers} processos, {args.threads} threads", calls,
+            lambda call: sign_pool(pool, call), args.threads,
+        )
+    finally:
+        pool.shutdown()
+
+    assert [bytes(raw) for raw in baseline] == signed, "pool e inline divergem"
+
+
+if __name__ == "__main__":
+    main()
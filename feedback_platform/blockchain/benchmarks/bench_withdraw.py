@@ -0,0 +1,103 @@
+# feedback_platform/blockchain/benchmarks/bench_withdraw.py
+"""
+Saques contra um nó JSON-RPC local (eth-tester servido por HTTP) com latência
+injetada por chamada RPC.
+
+1. Latência da view withdraw_tokens (p50/p99): a view só valida, reserva o
+   saldo e enfileira, então não deve depender da latência da chain.
+2. Vazão do worker process_withdrawal drenando a fila, comparando:
+     - fresh:  um BlockchainService novo por saque (novo HTTPProvider,
+               is_connected() e parse do ABI a cada envio)
+     - shared: o serviço compartilhado do processo (get_blockchain_service)
+
+    python -m blockchain.benchmarks.bench_withdraw [--requests 200] [--delay 0.05]
+"""
+
+import argparse
+import statistics
+import time
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from blockchain import services  # noqa: E402
+from blockchain.models import UserProfile  # noqa: E402
+from blockchain.tasks.withdrawals import process_withdrawal  # noqa: E402
+from blockchain.testing import TEST_PRIVATE_KEY, RPCStubServer, deploy_feedback_token  # noqa: E402
+
+
+def fresh_service():
+    services.load_contract_artifact.cache_clear()
+    return services.BlockchainService()
+
+
+def request_withdrawals(client, count):
+    url = reverse("withdraw-tokens")
+    queued = []
+    latencies = []
+    with mock.patch("blockchain.views.schedule_withdrawal", side_effect=queued.append):
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post(url, {"amount": "1", "wallet_address": "0x" + "22" * 20})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 202, response.content
+    return queued, latencies
+
+
+def drain(queued):
+    start = time.perf_counter()
+    for transaction_id in queued:
+        assert process_withdrawal(transaction_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.05, help="atraso por chamada RPC (s)")
+    args = parser.parse_args()
+
+    with RPCStubServer() as stub, test_database():
+        contract_address = deploy_feedback_token(stub.w3)
+        with override_settings(
+            WEB3_HTTP_PROVIDER_URL=stub.url,
+            CONTRACT_ADDRESS=contract_address,
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CHAIN_ID=stub.w3.eth.chain_id,
+            MIN_WITHDRAWAL=Decimal("0"),
+            NONCE_BACKEND="local",
+        ):
+            admin = services.BlockchainService()
+            admin.batch_mint([admin.admin_address], [10 * args.requests])
+            stub.delay = args.delay
+
+            user = User.objects.create_user(username="bench")
+            UserProfile.objects.create(user=user, blockchain_balance=Decimal(10 * args.requests))
+            client = Client()
+            client.force_login(user)
+
+            queued, latencies = request_withdrawals(client, args.requests)
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+            print(f"withdraw_tokens com RPC a {args.delay * 1000:.0f}ms: p50={p50:.2f}ms p99={p99:.2f}ms")
+
+            half = len(queued) // 2
+            with mock.patch("blockchain.tasks.withdrawals.get_blockchain_service", fresh_service):
+                elapsed = drain(queued[:half])
+            report("process_withdrawal (serviço novo por saque)", half, elapsed, unit="tx")
+
+            services.reset_blockchain_services()
+            elapsed = drain(queued[half:])
+            report("process_withdrawal (serviço compartilhado)", len(queued) - half, elapsed, unit="tx")
+
+
+if __name__ == "__main__":
+    main()
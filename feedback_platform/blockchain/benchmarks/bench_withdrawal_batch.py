@@ -0,0 +1,95 @@
+# feedback_platform/blockchain/benchmarks/bench_withdrawal_batch.py
+"""
+Gas por saque e vazão (saques/s) numa chain local eth-tester, comparando:
+
+  - individual: process_withdrawal, um transfer por saque
+  - lote:       process_withdrawal_batch, um batchTransfer por MAX_BATCH_SIZE saques
+
+O modo lote só usa batchTransfer se o artifact tiver sido recompilado depois
+da inclusão da função no contrato (npx hardhat compile); caso contrário ele
+cai para transfers individuais e o benchmark avisa.
+
+    python -m blockchain.benchmarks.bench_withdrawal_batch [--withdrawals 200]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+from unittest import mock
+
+from blockchain.benchmarks import report, setup_django, test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from web3 import EthereumTesterProvider  # noqa: E402
+
+from blockchain import services  # noqa: E402
+from blockchain.models import RewardTransaction, UserProfile  # noqa: E402
+from blockchain.tasks.withdrawals import process_withdrawal, process_withdrawal_batch  # noqa: E402
+from blockchain.testing import TEST_PRIVATE_KEY, deploy_feedback_token  # noqa: E402
+
+
+def create_withdrawals(user, count, offset=0):
+    # Carteiras novas a cada rodada, para comparar o mesmo custo de storage
+    RewardTransaction.objects.bulk_create(
+        RewardTransaction(
+            user=user,
+            amount=Decimal("1"),
+            tx_type="WITHDRAWAL",
+            to_address=services.Web3.to_checksum_address("0x%040x" % (offset + i + 1)),
+        )
+        for i in range(count)
+    )
+    return list(RewardTransaction.objects.filter(status="PENDING").values_list("id", flat=True))
+
+
+def gas_used(service, tx_hashes):
+    return sum(service.w3.eth.get_transaction_receipt(h).gasUsed for h in set(tx_hashes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--withdrawals", type=int, default=200)
+    args = parser.parse_args()
+
+    provider = EthereumTesterProvider()
+    w3 = services.Web3(provider)
+    contract_address = deploy_feedback_token(w3)
+
+    with test_database(), override_settings(
+        CONTRACT_ADDRESS=contract_address,
+        PRIVATE_KEY=TEST_PRIVATE_KEY,
+        CHAIN_ID=w3.eth.chain_id,
+        NONCE_BACKEND="local",
+    ):
+        service = services.BlockchainService(provider=provider)
+        patcher = mock.patch("blockchain.tasks.withdrawals.get_blockchain_service", return_value=service)
+        patcher.start()
+        service.batch_mint([service.admin_address], [10 * args.withdrawals])
+
+        user = User.objects.create_user(username="bench")
+        UserProfile.objects.create(user=user)
+
+        ids = create_withdrawals(user, args.withdrawals)
+        start = time.perf_counter()
+        tx_hashes = [process_withdrawal(transaction_id) for transaction_id in ids]
+        elapsed = time.perf_counter() - start
+        report("individual (transfer por saque)", len(ids), elapsed, unit="saques")
+        print(f"{'':<45} gas/saque: {gas_used(service, tx_hashes) / len(ids):,.0f}")
+
+        if not service.supports_batch_transfer:
+            print("⚠️ Artifact sem batchTransfer: rode `npx hardhat compile` para medir o lote")
+
+        ids = create_withdrawals(user, args.withdrawals, offset=args.withdrawals)
+        start = time.perf_counter()
+        tx_hashes = process_withdrawal_batch()
+        elapsed = time.perf_counter() - start
+        report(f"lote (até {services.MAX_BATCH_SIZE} por transação)", len(ids), elapsed, unit="saques")
+        print(f"{'':<45} gas/saque: {gas_used(service, tx_hashes) / len(ids):,.0f} em {len(tx_hashes)} transações")
+        patcher.stop()
+
+
+if __name__ == "__main__":
+    main()
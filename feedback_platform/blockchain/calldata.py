@@ -0,0 +1,123 @@
+# feedback_platform/blockchain/calldata.py
+"""
+Calldata de batchMint/batchTransfer montado direto em palavras de 32 bytes.
+
+contract.functions.batchMint(recipients, amounts) passa pelo encoder genérico
+do web3, que procura a função no ABI e revalida cada endereço e valor, o que
+para lotes de 100 destinatários pesa no tempo da tarefa. Os endereços já
+chegam validados (process_reward_batch / process_withdrawal_batch) e os dois
+argumentos são arrays dinâmicos de tipos estáticos, então o layout é fixo:
+
+    seletor | offset(recipients) | offset(amounts) | n | endereços | n | valores
+"""
+
+from eth_utils import function_signature_to_4byte_selector
+
+BATCH_MINT_SELECTOR = function_signature_to_4byte_selector("batchMint(address[],uint256[])")
+BATCH_TRANSFER_SELECTOR = function_signature_to_4byte_selector("batchTransfer(address[],uint256[])")
+TRANSFER_SELECTOR = function_signature_to_4byte_selector("transfer(address,uint256)")
+
+_WORD = 32
+_ADDRESS_PADDING = bytes(_WORD - 20)
+# Os dois offsets do cabeçalho: o primeiro array começa logo depois deles
+_HEAD_SIZE = 2 * _WORD
+
+
+def _uint_word(value):
+    # to_bytes rejeita negativos e valores acima de 2**256 - 1 (OverflowError)
+    return value.to_bytes(_WORD, "big")
+
+
+def _address_word(address):
+    raw = bytes.fromhex(address[2:])
+    if len(raw) != 20:
+        raise ValueError(f"Endereço inválido: {address!r}")
+    return _ADDRESS_PADDING + raw
+
+
+def encode_address_amount_batch(selector, recipients, amounts):
+    """Calldata (bytes) de `selector`(address[] recipients, uint256[] amounts)."""
+    count = len(recipients)
+    if len(amounts) != count:
+        raise ValueError("recipients e amounts com tamanhos diferentes")
+    parts = [
+        selector,
+        _uint_word(_HEAD_SIZE),
+        _uint_word(_HEAD_SIZE + _WORD * (count + 1)),
+        _uint_word(count),
+    ]
+    parts.extend(_address_word(address) for address in recipients)
+    parts.append(_uint_word(count))
+    parts.extend(_uint_word(amount) for amount in amounts)
+    return b"".join(parts)
+
+
+def _read_word(data, offset):
+    word = data[offset:offset + _WORD]
+    if len(word) != _WORD:
+        raise ValueError("Calldata truncado")
+    return int.from_bytes(word, "big")
+
+
+def _read_address(data, offset):
+    return "0x" + data[offset + _WORD - 20:offset + _WORD].hex()
+
+
+def decode_payouts(data):
+    """
+    Pagamentos de um calldata (hex com 0x) de transfer, batchMint ou
+    batchTransfer: (seletor, [(endereço em minúsculas, valor em wei)]).
+    Levanta ValueError se o calldata estiver malformado.
+    """
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    selector, args = raw[:4], raw[4:]
+    if selector == TRANSFER_SELECTOR:
+        return selector, [(_read_address(args, 0), _read_word(args, _WORD))]
+    if selector not in (BATCH_MINT_SELECTOR, BATCH_TRANSFER_SELECTOR):
+        raise ValueError(f"Seletor desconhecido: 0x{selector.hex()}")
+
+    recipients_at, amounts_at = _read_word(args, 0), _read_word(args, _WORD)
+    count = _read_word(args, recipients_at)
+    if _read_word(args, amounts_at) != count:
+        raise ValueError("recipients e amounts com tamanhos diferentes")
+    return selector, [
+        (
+            _read_address(args, recipients_at + _WORD * (i + 1)),
+            _read_word(args, amounts_at + _WORD * (i + 1)),
+        )
+        for i in range(count)
+    ]
+
+
+class EncodedCall:
+    """
+    Chamada a `address` com o calldata já montado. Expõe o que o envio usa
+    de um ContractFunction (fn_name, address, build_transaction e
+    estimate_gas), sem passar pelo encoder do web3.
+    """
+
+    def __init__(self, w3, address, fn_name, data):
+        self.w3 = w3
+        self.address = address
+        self.fn_name = fn_name
+        self.data = "0x" + data.hex()
+
+    def build_transaction(self, transaction):
+        return {"value": 0, **transaction, "to": self.address, "data": self.data}
+
+    def estimate_gas(self, transaction=None):
+        return self.w3.eth.estimate_gas({**(transaction or {}), "to": self.address, "data": self.data})
+
+
+def batch_mint_call(contract, recipients, amounts):
+    return EncodedCall(
+        contract.w3, contract.address, "batchMint",
+        encode_address_amount_batch(BATCH_MINT_SELECTOR, recipients, amounts),
+    )
+
+
+def batch_transfer_call(contract, recipients, amounts):
+    return EncodedCall(
+        contract.w3, contract.address, "batchTransfer",
+        encode_address_amount_batch(BATCH_TRANSFER_SELECTOR, recipients, amounts),
+    )
@@ -28,6 +28,19 @@ contract FeedbackToken is ERC20, AccessControl {
         }
         emit BatchMinted(recipients, amounts);
     }
+
+    function batchTransfer(address[] calldata recipients, uint256[] calldata amounts)
+        external
+        returns (bool)
+    {
+        require(recipients.length == amounts.length, "Invalid input");
+        require(recipients.length <= MAX_BATCH_SIZE, "Batch too large");
+
+        for(uint256 i = 0; i < recipients.length; i++) {
+            _transfer(msg.sender, recipients[i], amounts[i]);
+        }
+        return true;
+    }
     function grantMinterRole(address account) external onlyRole(DEFAULT_ADMIN_ROLE) {
         grantRole(MINTER_ROLE, account);
     }
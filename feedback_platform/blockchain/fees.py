@@ -0,0 +1,70 @@
+# feedback_platform/blockchain/fees.py
+"""
+Oráculo de taxas (EIP-1559) compartilhado pelos envios da conta admin.
+
+Em vez de um get_block('latest') por transação e gorjeta fixa de 2 gwei, as
+taxas vêm de um único eth_feeHistory, guardado por FEE_CACHE_TTL segundos
+(~um bloco): a gorjeta é a mediana do percentil FEE_PRIORITY_PERCENTILE dos
+últimos FEE_HISTORY_BLOCKS blocos e o maxFeePerGas dá folga
+(FEE_BASE_FEE_MULTIPLIER × base fee do próximo bloco), para a transação
+continuar válida se o base fee subir por alguns blocos seguidos.
+"""
+
+import logging
+import statistics
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FeeOracle:
+    def __init__(self, w3):
+        self.w3 = w3
+        self._params = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def _priority_fee(self, rewards):
+        # Blocos vazios reportam gorjeta 0; não entram na mediana
+        tips = [reward[0] for reward in rewards if reward and reward[0] > 0]
+        tip = int(statistics.median(tips)) if tips else 0
+        return max(tip, settings.FEE_MIN_PRIORITY_FEE)
+
+    def _fetch(self):
+        history = self.w3.eth.fee_history(
+            settings.FEE_HISTORY_BLOCKS, "latest", [settings.FEE_PRIORITY_PERCENTILE]
+        )
+        # O último base fee do histórico já é o do próximo bloco
+        base_fee = history["baseFeePerGas"][-1] if history.get("baseFeePerGas") else None
+        if base_fee is None:
+            # Nós sem histórico (eth-tester) ou chains pré-London
+            base_fee = self.w3.eth.get_block("latest").get("baseFeePerGas")
+        if base_fee is None:
+            gas_price = self.w3.eth.gas_price
+            logger.info(f"⛽ Taxas atualizadas (legacy) | gasPrice: {gas_price}")
+            return {"gasPrice": gas_price}
+
+        tip = self._priority_fee(history.get("reward") or [])
+        max_fee = int(base_fee * settings.FEE_BASE_FEE_MULTIPLIER) + tip
+        logger.info(f"⛽ Taxas atualizadas | Base Fee: {base_fee} | Tip: {tip} | Max Fee: {max_fee}")
+        return {"type": 2, "maxPriorityFeePerGas": tip, "maxFeePerGas": max_fee}
+
+    def fee_params(self):
+        """
+        Campos de taxa para build_transaction ({type, maxPriorityFeePerGas,
+        maxFeePerGas} ou {gasPrice}), sem RPC enquanto o cache for válido.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._params is None or now - self._fetched_at >= settings.FEE_CACHE_TTL:
+                self._params = self._fetch()
+                self._fetched_at = now
+            return dict(self._params)
+
+    def invalidate(self):
+        """Descarta o cache (ex.: após um erro de transação subprecificada)."""
+        with self._lock:
+            self._params = None
@@ -0,0 +1,86 @@
+# feedback_platform/blockchain/gas.py
+"""
+Limites de gas em cache por tipo de chamada e faixa de tamanho do lote.
+
+O custo de batchMint/batchTransfer cresce linearmente com o número de
+destinatários e é maior para carteiras que ainda não têm saldo (o SSTORE de
+zero para não zero custa ~4x mais). Por isso cada faixa é estimada uma vez,
+com uma chamada de sondagem do tamanho máximo da faixa para endereços nunca
+usados (o pior caso), e o resultado × GAS_LIMIT_MARGIN vale por
+GAS_ESTIMATE_TTL segundos para qualquer lote da faixa, sem um estimate_gas
+por envio.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# Até 16 destinatários as faixas dobram; acima, crescem de 16 em 16
+BUCKET_STEP = 16
+
+
+def gas_bucket(size, max_size):
+    """Maior tamanho de lote da faixa de `size` (1, 2, 4, 8, 16, 32, 48, ...)."""
+    if size <= BUCKET_STEP:
+        bucket = 1 << max(size - 1, 0).bit_length()
+    else:
+        bucket = -(-size // BUCKET_STEP) * BUCKET_STEP
+    return min(bucket, max_size)
+
+
+def probe_addresses(count):
+    """Endereços determinísticos sem saldo, para estimar o custo do pior caso."""
+    return [
+        Web3.to_checksum_address(Web3.keccak(text=f"feedback-gas-probe-{i}")[-20:])
+        for i in range(count)
+    ]
+
+
+class GasEstimator:
+    def __init__(self, sender):
+        self.sender = sender
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def _estimate(self, tx_function):
+        return int(tx_function.estimate_gas({"from": self.sender}) * settings.GAS_LIMIT_MARGIN)
+
+    def limit(self, key, probe):
+        """
+        Limite de gas em cache para `key` ((nome da função, faixa)). Quando o
+        cache expira, `probe()` monta a chamada de sondagem a estimar.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._limits.get(key)
+        if cached is not None and now - cached[1] < settings.GAS_ESTIMATE_TTL:
+            return cached[0]
+
+        gas = self._estimate(probe())
+        with self._lock:
+            self._limits[key] = (gas, now)
+        logger.info(f"⛽ Limite de gas de {key[0]} (faixa {key[1]}): {gas}")
+        return gas
+
+    def limit_for(self, tx_function, probe, size=1, max_size=1):
+        """
+        Limite de gas para `tx_function` com `size` itens, a partir da
+        sondagem `probe(tamanho da faixa)`. Se a sondagem reverter (ex.: sem
+        saldo para o batchTransfer de sondagem), estima a própria chamada,
+        sem cache.
+        """
+        bucket = gas_bucket(size, max_size)
+        try:
+            return self.limit((tx_function.fn_name, bucket), lambda: probe(bucket))
+        except Exception as e:
+            logger.warning(f"⚠️ Sondagem de gas de {tx_function.fn_name} falhou ({e}); estimando a chamada")
+            return self._estimate(tx_function)
+
+    def invalidate(self):
+        with self._lock:
+            self._limits.clear()
@@ -0,0 +1,204 @@
+# feedback_platform/blockchain/ledger.py
+"""
+Ledger write-behind das recompensas por feedback (REWARD_LEDGER_BACKEND = 'redis').
+
+Em picos de campanha, cada feedback é um UPDATE na linha do perfil e um
+INSERT em RewardTransaction. Neste modo o submit grava o feedback e uma
+LedgerOutbox (só INSERTs, sem disputar a linha do perfil) na mesma
+transação e acrescenta o evento de recompensa a um stream do Redis (XADD);
+a tarefa flush_reward_ledger lê os eventos em lote, soma por usuário e
+aplica com um bulk_create e um UPDATE com F() por lote.
+
+A LedgerOutbox é a recompensa em si: a transação que a aplica também a
+apaga, e um evento cuja linha não existe (já aplicada, creditada direto no
+banco ou de um feedback que não foi commitado) é ignorado. Se o processo
+cair entre o commit do feedback e o XADD, ou o Redis perder o evento, a
+linha continua lá e queue_outbox a põe de novo no stream depois de
+REWARD_LEDGER_OUTBOX_GRACE segundos.
+
+Garantia em caso de queda do worker: um evento só recebe XACK depois que a
+transação que o aplicou foi commitada, e essa transação grava o último ID
+aplicado (LedgerCursor). Eventos entregues e não confirmados voltam na
+próxima execução (lidos da lista de pendentes do consumidor) e os que já
+estavam no banco são pulados, então cada recompensa é creditada exatamente
+uma vez. Um lock no Redis garante um único consumidor por vez, o que mantém
+os eventos em ordem. Eventos de antes da LedgerOutbox (sem outbox_id) são
+aplicados só pelo LedgerCursor.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from blockchain.balances import apply_balance_deltas
+from blockchain.models import LedgerCursor, LedgerOutbox, RewardTransaction, UserProfile
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "reward-ledger"
+# Um consumidor por vez (ver o lock em flush): o nome fixo faz a execução
+# seguinte reler os pendentes de uma execução que caiu
+CONSUMER_NAME = "flush"
+
+
+def parse_entry_id(entry_id):
+    """'1718000000000-3' → (1718000000000, 3), para comparar IDs do stream."""
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class RewardLedger:
+    def __init__(self, client, stream=None):
+        self.client = client
+        self.stream = stream or settings.REWARD_LEDGER_STREAM
+        self._group_ready = False
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def append(self, user_id, amount, feedback_id=None, outbox_id=None):
+        """Acrescenta uma recompensa ao stream. Retorna o ID do evento."""
+        fields = {"user_id": user_id, "amount": str(amount)}
+        if feedback_id is not None:
+            fields["feedback_id"] = feedback_id
+        if outbox_id is not None:
+            fields["outbox_id"] = outbox_id
+        return self.client.xadd(self.stream, fields).decode()
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def read(self, count):
+        """
+        Até `count` eventos [(id, user_id, amount, outbox_id)]: primeiro os
+        entregues a uma execução anterior e não confirmados, depois os novos.
+        """
+        self._ensure_group()
+        entries = []
+        for start in ("0", ">"):
+            response = self.client.xreadgroup(
+                CONSUMER_GROUP, CONSUMER_NAME, {self.stream: start}, count=count - len(entries)
+            )
+            for _, messages in response or ():
+                for entry_id, fields in messages:
+                    # Pendente apagado do stream (XDEL/trim): só confirma
+                    user_id = fields.get(b"user_id") if fields else None
+                    amount = Decimal(fields[b"amount"].decode()) if user_id else None
+                    outbox_id = fields.get(b"outbox_id") if user_id else None
+                    entries.append((
+                        entry_id.decode(),
+                        int(user_id) if user_id else None,
+                        amount,
+                        int(outbox_id) if outbox_id else None,
+                    ))
+            if entries:
+                break
+        return entries
+
+    def ack(self, entry_ids):
+        """Confirma os eventos e tira do stream tudo que veio antes deles."""
+        pipe = self.client.pipeline()
+        pipe.xack(self.stream, CONSUMER_GROUP, *entry_ids)
+        pipe.xtrim(self.stream, minid=max(entry_ids, key=parse_entry_id))
+        pipe.execute()
+
+    def lock(self):
+        return self.client.lock(f"{self.stream}:flush", timeout=settings.REWARD_LEDGER_LOCK_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def get_reward_ledger():
+    """RewardLedger do processo (o cliente Redis mantém um pool de conexões)."""
+    return RewardLedger.from_url(settings.REWARD_LEDGER_REDIS_URL)
+
+
+def queue_outbox(ledger, limit):
+    """
+    Põe de novo no stream até `limit` LedgerOutbox sem aplicar há mais de
+    REWARD_LEDGER_OUTBOX_GRACE segundos (o XADD do submit não aconteceu ou
+    se perdeu). Um evento repetido é ignorado na aplicação. Retorna quantas
+    linhas foram enfileiradas.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.REWARD_LEDGER_OUTBOX_GRACE)
+    rows = list(
+        LedgerOutbox.objects.filter(queued_at__lt=cutoff)
+        .order_by("id")
+        .values_list("id", "user_id", "amount", "feedback_id")[:limit]
+    )
+    for outbox_id, user_id, amount, feedback_id in rows:
+        ledger.append(user_id, amount, feedback_id, outbox_id=outbox_id)
+    if rows:
+        LedgerOutbox.objects.filter(id__in=[row[0] for row in rows]).update(queued_at=now)
+        logger.warning(f"⚠️ {len(rows)} recompensas da outbox enviadas de novo ao stream")
+    return len(rows)
+
+
+def apply_entries(stream, entries):
+    """
+    Aplica os eventos ainda não aplicados de `entries` em uma transação: uma
+    RewardTransaction PENDING e um incremento de virtual_balance por
+    usuário, e o LedgerCursor avança para o último ID. Eventos com
+    outbox_id só contam se a LedgerOutbox ainda existir, e ela é apagada
+    aqui. Retorna quantos eventos foram aplicados.
+    """
+    with transaction.atomic():
+        cursor, _ = LedgerCursor.objects.select_for_update().get_or_create(
+            stream=stream, defaults={"last_id": "0-0"}
+        )
+        applied = parse_entry_id(cursor.last_id)
+        fresh = [entry for entry in entries if entry[1] is not None and parse_entry_id(entry[0]) > applied]
+        if not fresh:
+            return 0
+
+        outbox_ids = [entry[3] for entry in fresh if entry[3] is not None]
+        claimed = {}
+        if outbox_ids:
+            claimed = dict(
+                LedgerOutbox.objects.select_for_update().filter(id__in=outbox_ids).values_list("id", "amount")
+            )
+            LedgerOutbox.objects.filter(id__in=claimed).delete()
+
+        totals = defaultdict(Decimal)
+        count = 0
+        for _, user_id, amount, outbox_id in fresh:
+            if outbox_id is not None:
+                # Sem a linha: já aplicada, creditada direto ou ainda não commitada
+                if outbox_id not in claimed:
+                    continue
+                amount = claimed.pop(outbox_id)
+            totals[user_id] += amount
+            count += 1
+
+        cursor.last_id = max((entry[0] for entry in fresh), key=parse_entry_id)
+        cursor.save(update_fields=["last_id", "updated_at"])
+        if not totals:
+            return 0
+
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in totals], ignore_conflicts=True
+        )
+        profile_ids = dict(UserProfile.objects.filter(user_id__in=totals).values_list("user_id", "id"))
+        apply_balance_deltas(
+            virtual_balance={profile_ids[user_id]: total for user_id, total in totals.items()}
+        )
+        RewardTransaction.objects.bulk_create(
+            RewardTransaction(user_id=user_id, amount=total, tx_type="REWARD", status="PENDING")
+            for user_id, total in totals.items()
+        )
+    return count
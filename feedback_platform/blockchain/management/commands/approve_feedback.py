@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.moderation import APPROVE_CHUNK_SIZE, bulk_approve_feedback, select_pending
+
+class Command(BaseCommand):
+    help = 'Aprova em massa os feedbacks pendentes de uma lista de ids e/ou de um filtro, recompensando os autores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+', help='Ids dos feedbacks')
+        parser.add_argument('--company', type=int, help='Só feedbacks desta empresa')
+        parser.add_argument('--user', type=int, help='Só feedbacks deste usuário')
+        parser.add_argument('--before', help='Só feedbacks criados antes desta data (ISO 8601)')
+        parser.add_argument('--after', help='Só feedbacks criados a partir desta data (ISO 8601)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=APPROVE_CHUNK_SIZE, help='Feedbacks por transação'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Só conta os feedbacks que seriam aprovados')
+
+    def handle(self, *args, **options):
+        try:
+            queryset = select_pending(
+                ids=options['ids'],
+                company_id=options['company'],
+                user_id=options['user'],
+                created_before=options['before'],
+                created_after=options['after'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            self.stdout.write(f"🔎 {queryset.count()} feedbacks pendentes seriam aprovados")
+            return
+
+        approved = bulk_approve_feedback(queryset, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {approved} feedbacks aprovados e recompensados"))
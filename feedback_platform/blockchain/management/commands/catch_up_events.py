@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.models import ChainCursor
+from blockchain.services import get_blockchain_service
+from blockchain.tasks.events import BATCH_MINTED, backfill_events, listen_for_batch_mint_events
+
+class Command(BaseCommand):
+    help = 'Processa eventos BatchMinted até o bloco atual, sem pausas, e sai'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-block', type=int,
+            help='Bloco inicial (sem --to-block, só quando ainda não existe cursor salvo)'
+        )
+        parser.add_argument(
+            '--to-block', type=int,
+            help='Processa só [from-block, to-block] sem mexer no cursor; '
+                 'várias instâncias podem rodar em paralelo em partições do histórico'
+        )
+
+    def handle(self, *args, **options):
+        from_block = options['from_block']
+        to_block = options['to_block']
+        service = get_blockchain_service()
+
+        if to_block is not None:
+            if from_block is None or from_block > to_block:
+                raise CommandError("--to-block exige --from-block <= --to-block")
+            # Logs repetidos são descartados pelo ProcessedLog
+            events = backfill_events(service, from_block, to_block)
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {events} eventos lidos nos blocos {from_block}-{to_block}"
+            ))
+            return
+
+        cursor = ChainCursor.objects.filter(
+            contract_address=service.contract.address.lower(),
+            event_name=BATCH_MINTED,
+        ).first()
+
+        # Mover o cursor pularia blocos; para reprocessar um trecho use --to-block
+        if cursor and from_block is not None and from_block != cursor.last_block + 1:
+            raise CommandError(
+                f"Cursor já está no bloco {cursor.last_block}; --from-block {from_block} "
+                f"pularia ou repetiria blocos. Rode sem --from-block para continuar, "
+                f"ou com --to-block para reprocessar um intervalo."
+            )
+
+        last_block = listen_for_batch_mint_events(from_block=from_block, catch_up=True)
+        self.stdout.write(self.style.SUCCESS(f"✅ Eventos processados até o bloco {last_block}"))
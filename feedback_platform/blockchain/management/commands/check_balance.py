@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from blockchain.services import BlockchainService
+from blockchain.services import get_blockchain_service
 
 class Command(BaseCommand):
     help = 'Verifica o saldo de tokens de um endereço'
@@ -8,7 +8,7 @@ class Command(BaseCommand):
         parser.add_argument('address', type=str, help='Endereço para verificar')
 
     def handle(self, *args, **options):
-        service = BlockchainService()
+        service = get_blockchain_service()
         address = options['address']
         
         try:
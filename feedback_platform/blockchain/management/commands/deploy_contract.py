@@ -1,12 +1,12 @@
 from django.core.management.base import BaseCommand
-from blockchain.services import BlockchainService
+from blockchain.services import get_blockchain_service
 from django.conf import settings
 
 class Command(BaseCommand):
     help = 'Deploy do contrato na rede configurada'
     
     def handle(self, *args, **options):
-        service = BlockchainService()
+        service = get_blockchain_service()
         contract_address = service.deploy_contract()
         
         if contract_address:
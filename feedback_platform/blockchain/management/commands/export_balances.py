@@ -0,0 +1,59 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from web3 import Web3
+from blockchain.models import UserProfile
+from blockchain.services import get_blockchain_service
+
+class Command(BaseCommand):
+    help = 'Lê saldos de tokens em massa (JSON-RPC em lote/Multicall3) e escreve "endereço,saldo" por linha'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--file', help='Arquivo com um endereço por linha ("-" para stdin)')
+        source.add_argument('--from-db', action='store_true', help='Carteiras de todos os UserProfile')
+        parser.add_argument('--block', type=int, help='Lê todos os saldos neste bloco (padrão: bloco atual)')
+        parser.add_argument('--chunk-size', type=int, help='Endereços por requisição (BALANCE_READ_CHUNK_SIZE)')
+        parser.add_argument('--concurrency', type=int, help='Lotes em paralelo (BALANCE_READ_CONCURRENCY)')
+
+    def read_file(self, path):
+        stream = sys.stdin if path == '-' else open(path)
+        with stream:
+            for line in stream:
+                address = line.strip()
+                if not address:
+                    continue
+                if not Web3.is_address(address):
+                    self.stderr.write(f"⚠️ Endereço inválido ignorado: {address}")
+                    continue
+                yield address
+
+    def read_profiles(self):
+        wallets = (
+            UserProfile.objects.filter(wallet_address__isnull=False)
+            .exclude(wallet_address='')
+            .order_by('id')
+            .values_list('wallet_address', flat=True)
+            .iterator(chunk_size=2000)
+        )
+        for address in wallets:
+            if Web3.is_address(address):
+                yield address
+            else:
+                self.stderr.write(f"⚠️ Carteira inválida ignorada: {address}")
+
+    def handle(self, *args, **options):
+        service = get_blockchain_service()
+        if not service.contract:
+            raise CommandError("Contrato não carregado")
+
+        addresses = self.read_profiles() if options['from_db'] else self.read_file(options['file'])
+        # Fixa o bloco para que todos os lotes vejam o mesmo estado da chain
+        block = options['block'] if options['block'] is not None else service.w3.eth.block_number
+
+        count = 0
+        for address, balance in service.iter_balances(
+            addresses, block=block, chunk_size=options['chunk_size'], concurrency=options['concurrency']
+        ):
+            self.stdout.write(f"{address},{balance.normalize():f}")
+            count += 1
+        self.stderr.write(self.style.SUCCESS(f"✅ {count} saldos lidos no bloco {block}"))
@@ -1,10 +1,10 @@
 from django.core.management.base import BaseCommand
-from blockchain.services import BlockchainService
+from blockchain.services import get_blockchain_service
 
 class Command(BaseCommand):
     help = 'Minta tokens para múltiplos endereços'
     def handle(self, *args, **kwargs):
-        service = BlockchainService()
+        service = get_blockchain_service()
         recipients = ["0x6D68105c0947bF1BfeB8594D5A771387Eac66E0c"]
         amounts = [100]
         tx_hash = service.batch_mint(recipients, amounts)
@@ -0,0 +1,50 @@
+import csv
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.reconciliation import Drift, apply_corrections, needs_review, reconcile_balances
+from blockchain.services import get_blockchain_service
+
+class Command(BaseCommand):
+    help = 'Compara blockchain_balance com balanceOf de cada carteira e gera um relatório CSV das divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Arquivo CSV do relatório (padrão: stdout)')
+        parser.add_argument('--block', type=int, help='Bloco da leitura on-chain (padrão: bloco atual)')
+        parser.add_argument('--chunk-size', type=int, help='Perfis por partição (RECONCILIATION_CHUNK_SIZE)')
+        parser.add_argument('--workers', type=int, help='Processos em paralelo (RECONCILIATION_WORKERS)')
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Baixa blockchain_balance nas divergências negativas (exceto perfis com saldo em trânsito); '
+                 'as positivas ficam para revisão manual'
+        )
+
+    def handle(self, *args, **options):
+        service = get_blockchain_service()
+        if not service.contract:
+            raise CommandError("Contrato não carregado")
+        block = options['block'] if options['block'] is not None else service.w3.eth.block_number
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output, lineterminator='\n')
+            writer.writerow(Drift._fields)
+            scanned = drifted = fixed = review = 0
+            total_drift = Decimal(0)
+            for count, drifts in reconcile_balances(block, options['chunk_size'], options['workers']):
+                scanned += count
+                drifted += len(drifts)
+                for drift in drifts:
+                    total_drift += abs(drift.drift)
+                    review += needs_review(drift) and not drift.in_flight
+                    writer.writerow([f"{value:f}" if isinstance(value, Decimal) else value for value in drift])
+                if options['fix']:
+                    fixed += apply_corrections(drifts)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            f"✅ {scanned} carteiras comparadas no bloco {block}: {drifted} divergentes "
+            f"(soma |diferença| = {total_drift.normalize():f} FBTK), {fixed} corrigidas, "
+            f"{review} positivas para revisão manual"
+        ))
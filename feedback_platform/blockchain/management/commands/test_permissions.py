@@ -1,11 +1,11 @@
 from django.core.management.base import BaseCommand
-from blockchain.services import BlockchainService
+from blockchain.services import get_blockchain_service
 
 class Command(BaseCommand):
     help = 'Testa se um endereço sem MINTER_ROLE pode mintar tokens'
 
     def handle(self, *args, **kwargs):
-        service = BlockchainService()
+        service = get_blockchain_service()
         test_address = "0xaC72AF89c28B198492f242d9225817D5391f328C"
         recipients = [test_address]
         amounts = [100]
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from blockchain.services import BlockchainService
+from blockchain.services import get_blockchain_service
 
 class Command(BaseCommand):
     help = 'Transfere tokens para um endereço'
@@ -9,7 +9,7 @@ class Command(BaseCommand):
         parser.add_argument('amount', type=float, help='Quantidade de tokens')
 
     def handle(self, *args, **options):
-        service = BlockchainService()
+        service = get_blockchain_service()
         to_address = options['to_address']
         amount = options['amount']
         
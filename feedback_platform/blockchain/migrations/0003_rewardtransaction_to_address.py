@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0002_alter_userprofile_wallet_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rewardtransaction',
+            name='to_address',
+            field=models.CharField(blank=True, max_length=42, null=True),
+        ),
+    ]
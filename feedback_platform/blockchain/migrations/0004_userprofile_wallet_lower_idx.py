@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:48
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0003_rewardtransaction_to_address'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(django.db.models.functions.text.Lower('wallet_address'), name='userprofile_wallet_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0004_userprofile_wallet_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42)),
+                ('event_name', models.CharField(max_length=100)),
+                ('last_block', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('contract_address', 'event_name'), name='unique_chain_cursor')],
+            },
+        ),
+    ]
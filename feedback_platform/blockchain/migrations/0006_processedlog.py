@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0005_chaincursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_name', models.CharField(max_length=100)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+                ('block_number', models.BigIntegerField()),
+                ('processed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='unique_processed_log')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0006_processedlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rewardtransaction',
+            name='block_hash',
+            field=models.CharField(blank=True, max_length=66, null=True),
+        ),
+        migrations.AddField(
+            model_name='rewardtransaction',
+            name='block_number',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='rewardtransaction',
+            index=models.Index(fields=['status', 'tx_hash'], name='rewardtx_status_hash_idx'),
+        ),
+    ]
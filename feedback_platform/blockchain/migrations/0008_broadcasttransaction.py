@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0007_rewardtransaction_block'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender', models.CharField(max_length=42)),
+                ('nonce', models.BigIntegerField()),
+                ('chain_id', models.BigIntegerField()),
+                ('to_address', models.CharField(blank=True, max_length=42, null=True)),
+                ('data', models.TextField(blank=True, default='')),
+                ('gas', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('MINED', 'Minerada'), ('DROPPED', 'Descartada')], default='PENDING', max_length=20)),
+                ('mined_hash', models.CharField(blank=True, max_length=66, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'nonce'], name='broadcast_status_nonce_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sender', 'nonce'), name='unique_broadcast_nonce')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tx_hash', models.CharField(max_length=66, unique=True)),
+                ('max_fee_per_gas', models.BigIntegerField(blank=True, null=True)),
+                ('max_priority_fee_per_gas', models.BigIntegerField(blank=True, null=True)),
+                ('gas_price', models.BigIntegerField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='blockchain.broadcasttransaction')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0008_broadcasttransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.CharField(max_length=41)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
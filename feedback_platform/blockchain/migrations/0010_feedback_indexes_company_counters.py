@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_company_counters(apps, schema_editor):
+    """Contadores iniciais a partir dos feedbacks existentes; daí em diante são incrementais."""
+    Company = apps.get_model('blockchain', 'Company')
+    Feedback = apps.get_model('blockchain', 'Feedback')
+    counts = Feedback.objects.values('company_id').annotate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(is_approved=True)),
+        useful=Count('id', filter=Q(is_useful=True)),
+    )
+    for row in counts:
+        Company.objects.filter(id=row['company_id']).update(
+            feedback_count=row['total'], approved_count=row['approved'], useful_count=row['useful']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0009_ledgercursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='approved_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='feedback_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='useful_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['company', '-created_at', '-id'], name='feedback_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='feedback_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['-created_at', '-id'], name='feedback_pending_idx'),
+        ),
+        migrations.RunPython(backfill_company_counters, migrations.RunPython.noop),
+    ]
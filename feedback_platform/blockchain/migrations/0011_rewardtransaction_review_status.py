@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0010_feedback_indexes_company_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rewardtransaction',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pendente'), ('PROCESSING', 'Processando'), ('CONFIRMED', 'Confirmado'), ('FAILED', 'Falhou'), ('REVIEW', 'Revisão manual')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0011_rewardtransaction_review_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcasttransaction',
+            name='reward_mint',
+            field=models.BooleanField(default=False),
+        ),
+    ]
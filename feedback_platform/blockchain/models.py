@@ -1,9 +1,15 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
 from decimal import Decimal
 
 class Company(models.Model):
     name = models.CharField(max_length=255)
+    # Contadores mantidos por blockchain.accrual (UPDATE com F()), sem COUNT(*)
+    feedback_count = models.PositiveIntegerField(default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    useful_count = models.PositiveIntegerField(default=0)
 
 class Feedback(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -14,12 +20,26 @@ class Feedback(models.Model):
     is_useful = models.BooleanField(default=False)
     class Meta:
         ordering = ['-created_at']
+        # Listagens paginadas por (created_at, id) (blockchain.pagination):
+        # por empresa, por autor e a fila de moderação (índice parcial)
+        indexes = [
+            models.Index(fields=['company', '-created_at', '-id'], name='feedback_company_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='feedback_user_created_idx'),
+            models.Index(
+                fields=['-created_at', '-id'], condition=models.Q(is_approved=False), name='feedback_pending_idx'
+            ),
+        ]
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     wallet_address = models.CharField(max_length=42, blank=True, null=True, unique=True)
     virtual_balance = models.DecimalField(max_digits=36, decimal_places=18, default=0)
     blockchain_balance = models.DecimalField(max_digits=36, decimal_places=18, default=0)
+    class Meta:
+        # Busca por carteira sem diferenciar maiúsculas (eventos trazem checksum)
+        indexes = [
+            models.Index(Lower('wallet_address'), name='userprofile_wallet_lower_idx'),
+        ]
 
 class RewardTransaction(models.Model):
     STATUS_CHOICES = (
@@ -27,6 +47,8 @@ class RewardTransaction(models.Model):
         ('PROCESSING', 'Processando'),
         ('CONFIRMED', 'Confirmado'),
         ('FAILED', 'Falhou'),
+        # Presa sem tx_hash, mas um envio registrado pode tê-la pago: conferir na chain
+        ('REVIEW', 'Revisão manual'),
     )
     
     TX_TYPE_CHOICES = (
@@ -38,6 +60,98 @@ class RewardTransaction(models.Model):
     amount = models.DecimalField(max_digits=36, decimal_places=18)
     tx_type = models.CharField(max_length=20, choices=TX_TYPE_CHOICES)
     tx_hash = models.CharField(max_length=66, blank=True, null=True)
+    to_address = models.CharField(max_length=42, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
-    processed_at = models.DateTimeField(null=True, blank=True)
\ No newline at end of file
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Bloco em que o recibo foi visto pela última vez (reorg troca o block_hash)
+    block_number = models.BigIntegerField(null=True, blank=True)
+    block_hash = models.CharField(max_length=66, blank=True, null=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'tx_hash'], name='rewardtx_status_hash_idx'),
+        ]
+
+class BroadcastTransaction(models.Model):
+    """Transação da conta admin por nonce, com o necessário para re-assiná-la com taxas maiores."""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pendente'),
+        ('MINED', 'Minerada'),
+        ('DROPPED', 'Descartada'),
+    )
+    sender = models.CharField(max_length=42)
+    nonce = models.BigIntegerField()
+    chain_id = models.BigIntegerField()
+    to_address = models.CharField(max_length=42, blank=True, null=True)
+    data = models.TextField(blank=True, default='')
+    gas = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    mined_hash = models.CharField(max_length=66, blank=True, null=True)
+    # batchMint de process_reward_batch: o saldo é movido na liquidação do lote, não pelo listener
+    reward_mint = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sender', 'nonce'], name='unique_broadcast_nonce'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'nonce'], name='broadcast_status_nonce_idx'),
+        ]
+
+
+class TransactionAttempt(models.Model):
+    """Cada envio (original ou substituição) de uma BroadcastTransaction."""
+    broadcast = models.ForeignKey(BroadcastTransaction, on_delete=models.CASCADE, related_name='attempts')
+    # Mesmo formato gravado em RewardTransaction.tx_hash (sem 0x)
+    tx_hash = models.CharField(max_length=66, unique=True)
+    # Taxas em wei
+    max_fee_per_gas = models.BigIntegerField(null=True, blank=True)
+    max_priority_fee_per_gas = models.BigIntegerField(null=True, blank=True)
+    gas_price = models.BigIntegerField(null=True, blank=True)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+
+class ChainCursor(models.Model):
+    """Último bloco totalmente processado por contrato e evento."""
+    contract_address = models.CharField(max_length=42)
+    event_name = models.CharField(max_length=100)
+    last_block = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['contract_address', 'event_name'], name='unique_chain_cursor'),
+        ]
+
+
+class ProcessedLog(models.Model):
+    """Logs de eventos já aplicados: a constraint única garante crédito exatamente uma vez."""
+    event_name = models.CharField(max_length=100)
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.PositiveIntegerField()
+    block_number = models.BigIntegerField()
+    processed_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tx_hash', 'log_index'], name='unique_processed_log'),
+        ]
+
+
+class LedgerCursor(models.Model):
+    """Último evento de um stream do Redis já aplicado ao banco (flush_reward_ledger)."""
+    stream = models.CharField(max_length=100, unique=True)
+    # ID do stream ("<ms>-<seq>") gravado na mesma transação que os créditos
+    last_id = models.CharField(max_length=41)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class LedgerOutbox(models.Model):
+    """
+    Recompensa do modo 'redis' ainda não aplicada ao banco. Gravada na mesma
+    transação que o feedback e apagada pela transação que a aplica
+    (blockchain/ledger.py): o evento no stream só avisa que ela existe.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    feedback = models.ForeignKey(Feedback, on_delete=models.SET_NULL, null=True, blank=True)
+    amount = models.DecimalField(max_digits=36, decimal_places=18)
+    # Último XADD; linhas sem aplicar há mais de REWARD_LEDGER_OUTBOX_GRACE s vão de novo para o stream
+    queued_at = models.DateTimeField(default=timezone.now, db_index=True)
@@ -0,0 +1,119 @@
+# feedback_platform/blockchain/moderation.py
+"""
+Aprovação de feedbacks em massa. Em vez de aprovar um feedback por vez
+(UPDATE, saldo e RewardTransaction por item), cada lote de até
+APPROVE_CHUNK_SIZE feedbacks é aprovado em uma transação com um
+UPDATE ... WHERE is_approved = false RETURNING (blockchain/returning.py;
+nos bancos sem RETURNING em UPDATE, SELECT ... FOR UPDATE e UPDATE), um
+bulk_create das recompensas, um UPDATE com F() para os saldos dos autores
+e outro para os contadores das empresas.
+
+Só os feedbacks que o próprio UPDATE mudou são recompensados, então um
+feedback já aprovado (antes ou por uma aprovação concorrente) nunca é
+recompensado de novo.
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from blockchain.accrual import reward_amount
+from blockchain.balances import apply_balance_deltas
+from blockchain.models import Company, Feedback, RewardTransaction, UserProfile
+from blockchain.returning import update_returning
+
+# Feedbacks por transação: mantém o IN (...) e o lock de escrita curtos
+APPROVE_CHUNK_SIZE = 1000
+
+
+def _parse_datetime(value):
+    value = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def select_pending(ids=None, company_id=None, user_id=None, created_before=None, created_after=None):
+    """
+    Feedbacks não aprovados da lista `ids` e/ou do filtro. Exige ao menos um
+    critério, para uma seleção vazia não aprovar tudo; ValueError se algum
+    valor for inválido.
+    """
+    criteria = (ids, company_id, user_id, created_before, created_after)
+    if all(value is None for value in criteria):
+        raise ValueError("Informe ids ou um filtro (company_id, user_id, created_before, created_after)")
+
+    queryset = Feedback.objects.filter(is_approved=False)
+    if ids is not None:
+        if isinstance(ids, (str, bytes)):
+            raise ValueError("ids deve ser uma lista")
+        queryset = queryset.filter(id__in=[int(feedback_id) for feedback_id in ids])
+    if company_id is not None:
+        queryset = queryset.filter(company_id=int(company_id))
+    if user_id is not None:
+        queryset = queryset.filter(user_id=int(user_id))
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=_parse_datetime(created_before))
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=_parse_datetime(created_after))
+    return queryset
+
+
+def _flip_approved(ids):
+    """is_approved = true nos feedbacks de `ids` ainda não aprovados; [(id, user_id, company_id)] dos que mudaram."""
+    return update_returning(
+        Feedback.objects.filter(id__in=ids, is_approved=False),
+        {'is_approved': True},
+        ['id', 'user', 'company'],
+    )
+
+
+def approve_chunk(ids):
+    """
+    Aprova e recompensa, em uma transação, os feedbacks de `ids` que ainda
+    não estavam aprovados. Retorna [(id, user_id, company_id)] dos aprovados.
+    """
+    with transaction.atomic():
+        rows = _flip_approved(list(ids))
+        if not rows:
+            return []
+
+        amount = reward_amount()
+        per_user = Counter(user_id for _, user_id, _ in rows)
+        per_company = Counter(company_id for _, _, company_id in rows)
+
+        UserProfile.objects.bulk_create([UserProfile(user_id=user_id) for user_id in per_user], ignore_conflicts=True)
+        profile_ids = dict(UserProfile.objects.filter(user_id__in=per_user).values_list('user_id', 'id'))
+        apply_balance_deltas(
+            virtual_balance={profile_ids[user_id]: amount * count for user_id, count in per_user.items()}
+        )
+        # Uma recompensa por feedback, como na aprovação individual
+        RewardTransaction.objects.bulk_create(
+            RewardTransaction(user_id=user_id, amount=amount, tx_type='REWARD', status='PENDING')
+            for _, user_id, _ in rows
+        )
+        Company.objects.filter(id__in=per_company).update(approved_count=F('approved_count') + Case(
+            *[When(id=company_id, then=Value(count)) for company_id, count in per_company.items()],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        ))
+    return rows
+
+
+def bulk_approve_feedback(queryset, chunk_size=APPROVE_CHUNK_SIZE):
+    """
+    Aprova os feedbacks não aprovados de `queryset` (ver select_pending) em
+    lotes de `chunk_size`, percorridos por id (keyset). Retorna quantos
+    foram aprovados.
+    """
+    approved, after_id = 0, 0
+    while True:
+        ids = list(
+            queryset.filter(is_approved=False, id__gt=after_id)
+            .order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return approved
+        approved += len(approve_chunk(ids))
+        after_id = ids[-1]
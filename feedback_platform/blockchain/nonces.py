@@ -0,0 +1,212 @@
+# feedback_platform/blockchain/nonces.py
+"""
+Alocação local de nonces para a conta admin.
+
+Em vez de chamar get_transaction_count() antes de cada envio, os nonces são
+distribuídos por um contador compartilhado (Redis, o mesmo do Celery), o que
+permite que vários workers/processos enviem transações em sequência sem
+esperar a mineração e sem colidir no mesmo nonce. O contador é
+sincronizado com a chain (contagem 'pending') na primeira alocação e em
+erros de nonce, e só avança: voltar o contador entregaria de novo nonces
+que outros processos alocaram e ainda não transmitiram.
+
+Um nonce alocado e não transmitido (gap) entra numa lista de livres e é o
+próximo a ser alocado. Gaps que ninguém preenche (processo que caiu com o
+nonce) são ocupados por replace_stuck_transactions com uma transferência
+de 0 ETH para a própria conta admin.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Trechos de mensagens de erro (geth, erigon, Alchemy, eth-tester) que indicam
+# que o contador local está fora de sincronia com a chain. "already known" e
+# "replacement transaction underpriced" não entram: a transação (ou outra com o
+# mesmo nonce) está no mempool, e re-assinar com outro nonce a enviaria duas vezes.
+NONCE_ERROR_MARKERS = (
+    "nonce too low",
+    "nonce too high",
+    "invalid transaction nonce",
+)
+
+
+def is_nonce_error(exc):
+    message = str(exc).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+class LocalNonceStore:
+    """Contador em memória: serve para um único processo (testes, scripts)."""
+
+    def __init__(self):
+        self._values = {}
+        self._free = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def allocate(self, key):
+        with self._lock:
+            if key not in self._values:
+                return None
+            free = self._free[key]
+            if free:
+                nonce = min(free)
+                free.discard(nonce)
+                return nonce
+            nonce = self._values[key]
+            self._values[key] = nonce + 1
+            return nonce
+
+    def sync(self, key, chain_nonce):
+        with self._lock:
+            # Livres abaixo da contagem da chain já foram usados
+            self._free[key] = {nonce for nonce in self._free[key] if nonce >= chain_nonce}
+            current = self._values.get(key, -1)
+            if chain_nonce > current:
+                self._values[key] = chain_nonce
+                return chain_nonce
+            return current
+
+    def release(self, key, nonce):
+        with self._lock:
+            if self._values.get(key) == nonce + 1:
+                self._values[key] = nonce
+                return True
+            self._free[key].add(nonce)
+            return False
+
+    def claim(self, key, nonce):
+        with self._lock:
+            if nonce in self._free[key]:
+                self._free[key].discard(nonce)
+                return True
+            return False
+
+    def peek(self, key):
+        with self._lock:
+            return self._values.get(key)
+
+
+class RedisNonceStore:
+    """
+    Contador compartilhado entre processos; cada operação é um script Lua
+    atômico. Os nonces livres ficam num sorted set ao lado do contador.
+    """
+
+    ALLOCATE_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+        local free = redis.call('ZRANGE', KEYS[2], 0, 0)
+        if free[1] then
+            redis.call('ZREM', KEYS[2], free[1])
+            return tonumber(free[1])
+        end
+        return redis.call('INCR', KEYS[1]) - 1
+    """
+    SYNC_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[1])
+        local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+        local chain_nonce = tonumber(ARGV[1])
+        if chain_nonce > current then
+            redis.call('SET', KEYS[1], chain_nonce)
+            return chain_nonce
+        end
+        return current
+    """
+    RELEASE_SCRIPT = """
+        if tonumber(redis.call('GET', KEYS[1]) or '-1') == tonumber(ARGV[1]) + 1 then
+            redis.call('SET', KEYS[1], ARGV[1])
+            return 1
+        end
+        redis.call('ZADD', KEYS[2], ARGV[1], ARGV[1])
+        return 0
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._allocate = client.register_script(self.ALLOCATE_SCRIPT)
+        self._sync = client.register_script(self.SYNC_SCRIPT)
+        self._release = client.register_script(self.RELEASE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    @staticmethod
+    def _keys(key):
+        return [key, f"{key}:free"]
+
+    def allocate(self, key):
+        nonce = self._allocate(keys=self._keys(key))
+        return None if nonce is None else int(nonce)
+
+    def sync(self, key, chain_nonce):
+        return int(self._sync(keys=self._keys(key), args=[chain_nonce]))
+
+    def release(self, key, nonce):
+        return bool(self._release(keys=self._keys(key), args=[nonce]))
+
+    def claim(self, key, nonce):
+        return bool(self.client.zrem(f"{key}:free", nonce))
+
+    def peek(self, key):
+        value = self.client.get(key)
+        return None if value is None else int(value)
+
+
+def get_nonce_store():
+    """Cria o store configurado em settings.NONCE_BACKEND ('redis' ou 'local')."""
+    if settings.NONCE_BACKEND == "redis":
+        return RedisNonceStore.from_url(settings.NONCE_REDIS_URL)
+    return LocalNonceStore()
+
+
+class NonceManager:
+    def __init__(self, w3, address, store=None, chain_id=None):
+        self.w3 = w3
+        self.address = address
+        self.store = store if store is not None else get_nonce_store()
+        chain_id = chain_id if chain_id is not None else settings.CHAIN_ID
+        self.key = f"nonce:{chain_id}:{address.lower()}"
+
+    def chain_nonce(self):
+        return self.w3.eth.get_transaction_count(self.address, "pending")
+
+    def allocate(self):
+        """Retorna o próximo nonce livre, sem round trip RPC no caso comum."""
+        nonce = self.store.allocate(self.key)
+        if nonce is None:
+            self.sync()
+            nonce = self.store.allocate(self.key)
+        return nonce
+
+    def sync(self):
+        """
+        Alinha o contador com a chain. Só avança: nunca devolve nonces já
+        distribuídos a outros processos.
+        """
+        chain_nonce = self.chain_nonce()
+        nonce = self.store.sync(self.key, chain_nonce)
+        logger.info(f"🔢 Nonce sincronizado com a chain: {nonce} (chain={chain_nonce})")
+        return nonce
+
+    def release(self, nonce):
+        """
+        Devolve um nonce que não foi transmitido. Se outro nonce já foi
+        alocado depois dele, o buraco vai para a lista de livres e é o
+        próximo a ser alocado.
+        """
+        if not self.store.release(self.key, nonce):
+            logger.warning(f"⚠️ Gap no nonce {nonce}; será reutilizado pela próxima alocação")
+
+    def claim(self, nonce):
+        """Tira `nonce` da lista de livres (para ocupá-lo fora do contador). True se estava livre."""
+        return self.store.claim(self.key, nonce)
+
+    def peek(self):
+        """Próximo nonce do contador (sem alocar), ou None antes da primeira sincronização."""
+        return self.store.peek(self.key)
@@ -0,0 +1,62 @@
+# feedback_platform/blockchain/pagination.py
+"""
+Paginação por keyset das listagens de feedback, do mais novo para o mais
+antigo em (created_at, id). O cursor é a posição do último item da página
+(não um OFFSET), então cada página é uma busca no índice composto do filtro
+(ver Feedback.Meta.indexes) e custa o mesmo na primeira ou na milésima
+página; itens novos não deslocam as páginas seguintes.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(item):
+    raw = f"{item.created_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Cursor → (created_at, id). ValueError se o cursor não for válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, item_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+
+
+def page_size(value):
+    """Tamanho de página pedido (?limit=), limitado a MAX_PAGE_SIZE."""
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    size = int(value)
+    if size < 1:
+        raise ValueError(f"limit inválido: {value!r}")
+    return min(size, MAX_PAGE_SIZE)
+
+
+def keyset_queryset(queryset, cursor=None):
+    """`queryset` em ordem (-created_at, -id), a partir do item depois de `cursor`."""
+    queryset = queryset.order_by("-created_at", "-id")
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        # (created_at, id) < cursor; o created_at <= redundante vira o limite
+        # da busca no índice, em vez de um filtro linha a linha
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(id__lt=item_id), created_at__lte=created_at)
+    return queryset
+
+
+async def akeyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Uma página de até `limit` itens e o cursor da próxima (None na última).
+    Busca limit + 1 linhas para saber se há próxima página sem um COUNT.
+    """
+    items = [item async for item in keyset_queryset(queryset, cursor)[:limit + 1]]
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
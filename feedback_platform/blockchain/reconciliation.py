@@ -0,0 +1,168 @@
+# feedback_platform/blockchain/reconciliation.py
+"""
+Reconciliação do UserProfile.blockchain_balance com FeedbackToken.balanceOf.
+
+Os perfis são divididos em partições por id (keyset, sem OFFSET); cada
+partição lê os saldos on-chain em lote (balances_of, JSON-RPC em lote ou
+Multicall3) num bloco fixo e compara com Decimal exato. As partições podem
+rodar em paralelo num pool de processos, cada um com o próprio serviço e
+conexão com o banco.
+
+Saldo on-chain esperado de uma carteira: o blockchain_balance mais os
+saques confirmados do usuário (o saque debita o blockchain_balance, mas os
+tokens mintados continuam na carteira; quem paga é a conta admin) mais os
+saques confirmados pagos a essa mesma carteira.
+"""
+
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Q, Sum
+from web3 import Web3
+
+from blockchain.balances import apply_balance_deltas
+from blockchain.models import RewardTransaction, UserProfile
+from blockchain.services import get_blockchain_service
+
+Drift = namedtuple(
+    'Drift', 'profile_id wallet_address blockchain_balance withdrawn onchain_balance drift in_flight'
+)
+
+
+def profile_partitions(chunk_size):
+    """Gera (after_id, last_id] de até `chunk_size` perfis com carteira, em ordem de id."""
+    after_id = 0
+    with_wallet = UserProfile.objects.filter(wallet_address__isnull=False)
+    while True:
+        last_id = (
+            with_wallet.filter(id__gt=after_id).order_by('id').values('id')[:chunk_size]
+            .aggregate(last_id=Max('id'))['last_id']
+        )
+        if last_id is None:
+            return
+        yield after_id, last_id
+        after_id = last_id
+
+
+def in_flight_profile_ids(after_id, last_id):
+    """
+    Perfis da partição com saldo em trânsito: saques ainda não confirmados
+    (já debitados do blockchain_balance) e recompensas liquidadas cujo mint
+    ainda está em PROCESSING. Nesses a diferença é esperada.
+    """
+    in_flight = Q(user__rewardtransaction__status='PROCESSING') | Q(
+        user__rewardtransaction__tx_type='WITHDRAWAL',
+        user__rewardtransaction__status='PENDING',
+    )
+    return set(
+        UserProfile.objects.filter(in_flight, id__gt=after_id, id__lte=last_id)
+        .values_list('id', flat=True).distinct()
+    )
+
+
+def confirmed_withdrawals(profiles):
+    """
+    Soma dos saques confirmados por perfil de `profiles` [(id, carteira)],
+    contando duas vezes os pagos à própria carteira (ver o docstring do
+    módulo). Retorna {id do perfil: Decimal}.
+    """
+    wallets = dict(profiles)
+    by_user = dict(UserProfile.objects.filter(id__in=wallets).values_list('user_id', 'id'))
+    rows = (
+        RewardTransaction.objects.filter(user_id__in=by_user, tx_type='WITHDRAWAL', status='CONFIRMED')
+        .values_list('user_id', 'to_address').annotate(total=Sum('amount'))
+    )
+    withdrawn = defaultdict(Decimal)
+    for user_id, to_address, total in rows:
+        profile_id = by_user[user_id]
+        withdrawn[profile_id] += total
+        if to_address and to_address.lower() == wallets[profile_id].lower():
+            withdrawn[profile_id] += total
+    return withdrawn
+
+
+def reconcile_partition(after_id, last_id, block):
+    """
+    Compara os perfis da partição com os saldos on-chain em `block`.
+    Retorna (perfis comparados, lista de Drift só com as divergências).
+    """
+    profiles = [
+        (profile_id, wallet, balance)
+        for profile_id, wallet, balance in UserProfile.objects.filter(
+            id__gt=after_id, id__lte=last_id, wallet_address__isnull=False
+        ).order_by('id').values_list('id', 'wallet_address', 'blockchain_balance')
+        if Web3.is_address(wallet)
+    ]
+    if not profiles:
+        return 0, []
+
+    onchain = get_blockchain_service().balances_of([wallet for _, wallet, _ in profiles], block=block)
+    busy = in_flight_profile_ids(after_id, last_id)
+    withdrawn = confirmed_withdrawals((profile_id, wallet) for profile_id, wallet, _ in profiles)
+    drifts = []
+    for profile_id, wallet, balance in profiles:
+        expected = balance + withdrawn[profile_id]
+        if onchain[wallet] != expected:
+            drifts.append(Drift(
+                profile_id, wallet, balance, withdrawn[profile_id], onchain[wallet],
+                onchain[wallet] - expected, profile_id in busy,
+            ))
+    return len(profiles), drifts
+
+
+def _reconcile_partition(args):
+    return reconcile_partition(*args)
+
+
+def _init_worker():
+    # Com spawn/forkserver o processo filho ainda não configurou o Django
+    import django
+    django.setup()
+
+
+def reconcile_balances(block, chunk_size=None, workers=None):
+    """
+    Gera (perfis comparados, divergências) por partição, na ordem dos ids.
+    Com workers > 1 as partições rodam num ProcessPoolExecutor.
+    """
+    chunk_size = chunk_size or settings.RECONCILIATION_CHUNK_SIZE
+    workers = workers or settings.RECONCILIATION_WORKERS
+    partitions = ((after_id, last_id, block) for after_id, last_id in profile_partitions(chunk_size))
+
+    if workers <= 1:
+        yield from map(_reconcile_partition, partitions)
+        return
+
+    partitions = list(partitions)
+    # Conexões não podem ser herdadas pelos processos filhos
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        yield from executor.map(_reconcile_partition, partitions)
+
+
+def needs_review(drift):
+    """
+    Divergência positiva (mais tokens na carteira que o esperado): pode ser
+    uma transferência recebida on-chain. Creditar no blockchain_balance
+    deixaria sacar os mesmos tokens de novo, então só é relatada.
+    """
+    return drift.drift > 0
+
+
+def apply_corrections(drifts):
+    """
+    Baixa o blockchain_balance nas divergências negativas (UPDATE com F(),
+    então movimentos feitos depois da leitura são preservados). Perfis com
+    saldo em trânsito e divergências positivas (needs_review) são ignorados.
+    Retorna o número de perfis corrigidos.
+    """
+    deltas = {
+        drift.profile_id: drift.drift for drift in drifts if not drift.in_flight and not needs_review(drift)
+    }
+    if not deltas:
+        return 0
+    with transaction.atomic():
+        return apply_balance_deltas(blockchain_balance=deltas)
@@ -0,0 +1,63 @@
+# feedback_platform/blockchain/returning.py
+"""
+UPDATE ... RETURNING a partir de um queryset do ORM.
+
+Só PostgreSQL e SQLite >= 3.35 têm UPDATE ... RETURNING. O Django não
+expõe isso para UPDATE, e connection.features.can_return_columns_from_insert
+só vale para INSERT (é True no MariaDB >= 10.5, que não aceita RETURNING em
+UPDATE). Nos outros bancos update_returning trava as linhas, atualiza pelo
+ORM e as relê na mesma transação.
+"""
+
+from django.db import connections, transaction
+from django.db.models import sql
+
+
+def supports_update_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _converters(connection, field):
+    col = field.get_col(field.model._meta.db_table)
+    return col, connection.ops.get_db_converters(col) + col.get_db_converters(connection)
+
+
+def update_returning(queryset, values, fields):
+    """
+    queryset.update(**values) que devolve, para cada linha alterada, a tupla
+    dos `fields` já com os valores gravados (convertidos como o ORM faria).
+    Um único UPDATE onde o banco suporta RETURNING.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if not supports_update_returning(connection):
+        with transaction.atomic(using=queryset.db):
+            ids = list(queryset.select_for_update().values_list('pk', flat=True))
+            if not ids:
+                return []
+            model._default_manager.using(queryset.db).filter(pk__in=ids).update(**values)
+            return list(model._default_manager.using(queryset.db).filter(pk__in=ids).values_list(*fields))
+
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    update_sql, params = query.get_compiler(queryset.db).as_sql()
+    model_fields = [model._meta.get_field(name) for name in fields]
+    returning = ', '.join(connection.ops.quote_name(field.column) for field in model_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{update_sql} RETURNING {returning}", params)
+        rows = cursor.fetchall()
+
+    converters = [_converters(connection, field) for field in model_fields]
+    converted = []
+    for row in rows:
+        values_out = []
+        for value, (col, field_converters) in zip(row, converters):
+            for converter in field_converters:
+                value = converter(value, col, connection)
+            values_out.append(value)
+        converted.append(tuple(values_out))
+    return converted
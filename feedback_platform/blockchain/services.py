@@ -3,31 +3,95 @@
 import os
 import json
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from eth_abi import decode, encode
+from hexbytes import HexBytes
 from web3 import Web3, WebSocketProvider
 from web3.exceptions import ContractLogicError, InvalidAddress
 
+from blockchain.calldata import EncodedCall, batch_mint_call, batch_transfer_call
+from blockchain.fees import FeeOracle
+from blockchain.gas import GasEstimator, probe_addresses
+from blockchain.models import BroadcastTransaction, TransactionAttempt
+from blockchain.nonces import NonceManager, is_nonce_error
+from blockchain.signing import SigningPool
+
 # Inicializa o logger
 logger = logging.getLogger(__name__)
 
+# Espelha FeedbackToken.MAX_BATCH_SIZE: batchMint/batchTransfer revertem acima disso
+MAX_BATCH_SIZE = 100
+# Campos de taxa: se o chamador passar algum, o FeeOracle não é consultado
+FEE_FIELDS = ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas")
+
+# Seletores: balanceOf(address) e Multicall3.aggregate3((address,bool,bytes)[])
+BALANCE_OF_SELECTOR = "0x70a08231"
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+
+CONTRACT_ARTIFACT_PATH = (
+    Path(__file__).resolve().parent / "artifacts" / "contracts" / "FeedbackToken.sol" / "FeedbackToken.json"
+)
+
+
+@lru_cache(maxsize=None)
+def load_contract_artifact():
+    """
+    Lê o artifact do FeedbackToken (ABI + bytecode) uma única vez por processo.
+    O dicionário retornado é compartilhado: não modifique.
+    """
+    with open(CONTRACT_ARTIFACT_PATH, "r") as f:
+        contract_data = json.load(f)
+    return {"abi": contract_data["abi"], "bytecode": contract_data["bytecode"]}
+
 
 class BlockchainService:
-    def __init__(self, use_ws=False):
+    def __init__(self, use_ws=False, provider=None, lazy=False):
+        """
+        - use_ws: usa WebSocketProvider em vez de HTTPProvider
+        - provider: provider já construído (ex.: EthereumTesterProvider em testes)
+        - lazy: não faz o round trip de is_connected() agora; a checagem fica
+          para ensure_connected(), chamada pelo registro de serviços
+        """
         provider_url = settings.WEB3_WS_PROVIDER_URL if use_ws else settings.WEB3_HTTP_PROVIDER_URL
-        
-        if use_ws:
+        self._last_health_check = None
+        self._nonces = None
+        self._fees = None
+        self._gas = None
+        self._signer = None
+        self._signer_disabled = False
+        # Threads de process_reward_batch usam o mesmo serviço: os
+        # componentes preguiçosos são criados uma vez só, sob este lock
+        self._lazy_lock = threading.Lock()
+        self.contract = None
+
+        if provider is not None:
+            self.w3 = Web3(provider)
+        elif use_ws:
             self.w3 = Web3(WebSocketProvider(provider_url))  # ✅ Novo uso de WebSocketProvider
             logger.info("[BlockchainService] ✅ Usando WebSocketProvider")
         else:
-            self.w3 = Web3(Web3.HTTPProvider(provider_url))
+            # O HTTPProvider mantém uma requests.Session keep-alive por thread
+            # enquanto a instância viver; por isso o serviço deve ser reutilizado.
+            self.w3 = Web3(Web3.HTTPProvider(
+                provider_url,
+                request_kwargs={"timeout": settings.WEB3_HTTP_TIMEOUT},
+            ))
             logger.info("[BlockchainService] 🚫 Usando HTTPProvider")
 
         # Confere conexão
-        if not self.w3.is_connected():
-            logger.error("❌ Falha ao conectar com o provider Ethereum")
-            raise ConnectionError("Não foi possível conectar ao provider Ethereum")
-        
+        if not lazy:
+            self.ensure_connected(force=True)
+
         # Inicializa conta
         self.account = self.w3.eth.account.from_key(settings.PRIVATE_KEY)
         self.admin_address = self.account.address
@@ -39,17 +103,265 @@ class BlockchainService:
         else:
             logger.warning("⚠️ CONTRACT_ADDRESS não definido ou inválido")
 
+    def ensure_connected(self, force=False):
+        """
+        Faz o health-check do provider no máximo uma vez a cada
+        WEB3_HEALTHCHECK_INTERVAL segundos (ou sempre, com force=True).
+        """
+        now = time.monotonic()
+        if (
+            not force
+            and self._last_health_check is not None
+            and now - self._last_health_check < settings.WEB3_HEALTHCHECK_INTERVAL
+        ):
+            return
+
+        if not self.w3.is_connected():
+            self._last_health_check = None
+            logger.error("❌ Falha ao conectar com o provider Ethereum")
+            raise ConnectionError("Não foi possível conectar ao provider Ethereum")
+        self._last_health_check = now
+
+    @property
+    def nonces(self):
+        """NonceManager da conta admin, criado no primeiro envio."""
+        if self._nonces is None:
+            with self._lazy_lock:
+                if self._nonces is None:
+                    self._nonces = NonceManager(self.w3, self.admin_address)
+        return self._nonces
+
+    @property
+    def fees(self):
+        """FeeOracle compartilhado pelos envios deste serviço."""
+        if self._fees is None:
+            with self._lazy_lock:
+                if self._fees is None:
+                    self._fees = FeeOracle(self.w3)
+        return self._fees
+
+    @property
+    def gas(self):
+        """GasEstimator com os limites de gas em cache por função e faixa de lote."""
+        if self._gas is None:
+            with self._lazy_lock:
+                if self._gas is None:
+                    self._gas = GasEstimator(self.admin_address)
+        return self._gas
+
+    @property
+    def signer(self):
+        """
+        SigningPool com SIGNING_WORKERS processos, criado no primeiro envio;
+        None quando a assinatura é inline (SIGNING_WORKERS = 0 ou pool
+        indisponível, ex.: dentro de um worker prefork do Celery).
+        """
+        if self._signer is None and not self._signer_disabled:
+            with self._lazy_lock:
+                if self._signer is None and not self._signer_disabled:
+                    if settings.SIGNING_WORKERS > 0:
+                        self._signer = SigningPool(settings.PRIVATE_KEY, settings.SIGNING_WORKERS)
+                    else:
+                        self._signer_disabled = True
+        return self._signer
+
+    def _disable_signer(self, error):
+        logger.warning(f"⚠️ Pool de assinatura indisponível ({error!r}); assinando inline")
+        with self._lazy_lock:
+            signer, self._signer, self._signer_disabled = self._signer, None, True
+        if signer is not None:
+            signer.shutdown(wait=False)
+
+    def batch_rpc(self, calls):
+        """
+        Envia `calls` ([(método, params), ...]) em uma única requisição
+        JSON-RPC em lote e retorna os `result` crus, na mesma ordem (None para
+        recibos/blocos inexistentes). Providers sem suporte a lote (ex.:
+        EthereumTesterProvider) recebem as chamadas em sequência.
+        """
+        provider = self.w3.provider
+        if hasattr(provider, "make_batch_request"):
+            responses = provider.make_batch_request(list(calls))
+            if isinstance(responses, dict):
+                # Erro no lote inteiro (ex.: provider sem suporte a lote)
+                raise ValueError(f"Erro no lote JSON-RPC: {responses.get('error')}")
+        else:
+            responses = [provider.make_request(method, params) for method, params in calls]
+
+        results = []
+        for (method, _), response in zip(calls, responses):
+            if response.get("error"):
+                raise ValueError(f"Erro em {method}: {response['error']}")
+            results.append(response.get("result"))
+        return results
+
+    def _send_transaction(self, tx_function, params, reward_mint=False):
+        """
+        Constrói, assina e envia `tx_function` com um nonce do NonceManager e
+        as taxas do FeeOracle (a menos que `params` já traga taxas). O envio
+        é registrado antes de ser transmitido e o registro é apagado se o nó
+        recusá-lo. "already known" (esta mesma transação assinada já está no
+        mempool) conta como envio bem-sucedido. Em erro de nonce, ressincroniza
+        com a chain e tenta mais uma vez. "replacement transaction underpriced"
+        quer dizer que outra transação pendente ocupa o nonce: o nonce não é
+        devolvido nem trocado, e o erro sobe (o watchdog cuida da pendente).
+        Se o envio falhar por outro motivo, o nonce é devolvido.
+        `reward_mint` marca o registro como mint de process_reward_batch.
+        Retorna o tx_hash.
+        """
+        if not any(field in params for field in FEE_FIELDS):
+            params = {**self.fees.fee_params(), **params}
+        for attempt in range(2):
+            nonce = self.nonces.allocate()
+            recorded = None
+            try:
+                tx, raw_tx = self._sign(tx_function, {**params, "nonce": nonce})
+                tx_hash = Web3.keccak(raw_tx)
+                recorded = self._record_broadcast(tx, tx_hash, reward_mint=reward_mint)
+                self.w3.eth.send_raw_transaction(raw_tx)
+                return tx_hash
+            except Exception as e:
+                message = str(e).lower()
+                if recorded is not None and "already known" in message:
+                    logger.info(f"ℹ️ Transação {tx_hash.hex()} já estava no mempool")
+                    return tx_hash
+                if recorded is not None:
+                    self._forget_broadcast(recorded)
+                if "underpriced" in message:
+                    self.fees.invalidate()
+                if "replacement transaction underpriced" in message:
+                    logger.warning(f"⚠️ Nonce {nonce} ocupado por outra transação pendente: {e}")
+                    raise
+                if not is_nonce_error(e):
+                    self.nonces.release(nonce)
+                    raise
+                logger.warning(f"⚠️ Erro de nonce ({nonce}): {e}")
+                if "nonce too high" in message:
+                    # Recusada sem ser transmitida: o nonce fica livre
+                    self.nonces.release(nonce)
+                self.nonces.sync()
+                if attempt:
+                    raise
+
+    def _sign(self, tx_function, params):
+        """
+        Codifica e assina `tx_function` com `params` (nonce, gas e taxas já
+        definidos). Chamadas a contrato (ou EncodedCall) vão para o
+        SigningPool, se houver; o deploy (sem endereço de destino) e o modo
+        inline usam build_transaction. Retorna (transação, transação assinada em bytes).
+        """
+        signer = self.signer
+        if signer is not None and getattr(tx_function, "address", None):
+            try:
+                if isinstance(tx_function, EncodedCall):
+                    # Calldata já montado: o pool só assina
+                    return signer.sign(tx_function.build_transaction(params))
+                tx = {"to": tx_function.address, "value": 0, **params}
+                return signer.sign(tx, tx_function.abi, tx_function.args)
+            except (BrokenProcessPool, AssertionError, OSError) as e:
+                # Processos daemon não podem criar filhos; o pool quebra no primeiro uso
+                self._disable_signer(e)
+        tx = tx_function.build_transaction(params)
+        signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
+        return tx, signed_tx.raw_transaction
+
+    def _record_broadcast(self, tx, tx_hash, reward_mint=False):
+        """
+        Guarda nonce, destino, calldata, gas e taxas do envio antes de
+        transmiti-lo: replace_stuck_transactions o re-assina com taxas
+        maiores (ou o transmite, se o processo caiu antes) e as varreduras de
+        linhas presas sabem que ele pode ter saído. Um nonce já registrado
+        por outro envio é tratado como erro de nonce. Retorna a tentativa.
+        """
+        try:
+            with transaction.atomic():
+                broadcast = BroadcastTransaction.objects.create(
+                    sender=self.admin_address,
+                    nonce=tx["nonce"],
+                    chain_id=tx["chainId"],
+                    to_address=tx.get("to"),
+                    data=tx.get("data", ""),
+                    gas=tx["gas"],
+                    reward_mint=reward_mint,
+                )
+                return TransactionAttempt.objects.create(
+                    broadcast=broadcast,
+                    tx_hash=tx_hash.hex(),
+                    max_fee_per_gas=tx.get("maxFeePerGas"),
+                    max_priority_fee_per_gas=tx.get("maxPriorityFeePerGas"),
+                    gas_price=tx.get("gasPrice"),
+                )
+        except IntegrityError:
+            raise ValueError(f"nonce too low: nonce {tx['nonce']} já registrado para outro envio")
+
+    def _forget_broadcast(self, attempt):
+        """Apaga o registro de um envio recusado pelo nó (nada foi transmitido)."""
+        BroadcastTransaction.objects.filter(id=attempt.broadcast_id).delete()
+
+    def fill_nonce_gap(self, nonce):
+        """
+        Ocupa um nonce abandonado (alocado e nunca transmitido) com uma
+        transferência de 0 ETH da conta admin para ela mesma, para destravar
+        as transações com nonces maiores. Retorna o tx_hash (sem 0x).
+        """
+        fees = self.fees.fee_params()
+        tx = {
+            "chainId": settings.CHAIN_ID,
+            "nonce": nonce,
+            "to": self.admin_address,
+            "value": 0,
+            "gas": 21000,
+            **fees,
+        }
+        if "maxFeePerGas" in fees:
+            tx["type"] = 2
+        signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
+        recorded = self._record_broadcast(tx, signed_tx.hash)
+        try:
+            self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception:
+            self._forget_broadcast(recorded)
+            raise
+        return signed_tx.hash.hex()
+
+    def replace_transaction(self, broadcast, fees):
+        """
+        Re-assina `broadcast` com o mesmo nonce, destino e calldata e as
+        taxas de `fees` ({maxFeePerGas, maxPriorityFeePerGas} ou {gasPrice}),
+        transmite e registra a tentativa. Retorna o novo tx_hash (sem 0x).
+        """
+        tx = {
+            "chainId": broadcast.chain_id,
+            "nonce": broadcast.nonce,
+            "gas": broadcast.gas,
+            "value": 0,
+            "data": broadcast.data,
+            **fees,
+        }
+        if broadcast.to_address:
+            tx["to"] = broadcast.to_address
+        if "maxFeePerGas" in fees:
+            tx["type"] = 2
+        signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
+        # Registrada antes do envio, como em _record_broadcast
+        attempt = TransactionAttempt.objects.create(
+            broadcast=broadcast,
+            tx_hash=signed_tx.hash.hex(),
+            max_fee_per_gas=fees.get("maxFeePerGas"),
+            max_priority_fee_per_gas=fees.get("maxPriorityFeePerGas"),
+            gas_price=fees.get("gasPrice"),
+        )
+        try:
+            self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception:
+            attempt.delete()
+            raise
+        return signed_tx.hash.hex()
+
     def _load_contract(self):
         """Carrega o contrato deployado a partir do ABI gerado pelo Hardhat/Truffle/etc."""
         try:
-            current_dir = Path(__file__).resolve().parent
-            contract_json_path = (
-                current_dir / "artifacts" / "contracts" / "FeedbackToken.sol" / "FeedbackToken.json"
-            )
-
-            with open(contract_json_path, "r") as f:
-                contract_data = json.load(f)
-                abi = contract_data["abi"]
+            abi = load_contract_artifact()["abi"]
 
             self.contract = self.w3.eth.contract(
                 address=settings.CONTRACT_ADDRESS,
@@ -72,28 +384,21 @@ class BlockchainService:
     def deploy_contract(self):
         """Faz deploy do contrato na rede, retorna o endereço do novo contrato ou None em caso de falha."""
         try:
-            current_dir = Path(__file__).resolve().parent
-            contract_json_path = (
-                current_dir / "artifacts" / "contracts" / "FeedbackToken.sol" / "FeedbackToken.json"
-            )
-            with open(contract_json_path, "r") as f:
-                contract_data = json.load(f)
-                abi = contract_data["abi"]
-                bytecode = contract_data["bytecode"]
+            contract_data = load_contract_artifact()
+            abi = contract_data["abi"]
+            bytecode = contract_data["bytecode"]
 
             FeedbackToken = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+            constructor = FeedbackToken.constructor()
 
-            tx = FeedbackToken.constructor().build_transaction(
+            # Deploy é raro: estimado na hora, sem cache
+            tx_hash = self._send_transaction(
+                constructor,
                 {
                     "chainId": settings.CHAIN_ID,
-                    "gas": 3000000,
-                    "gasPrice": self.w3.eth.generate_gas_price({"maxPriorityFeePerGas": 2_000_000_000}),
-                    "nonce": self.w3.eth.get_transaction_count(self.admin_address),
-                }
+                    "gas": int(constructor.estimate_gas({"from": self.admin_address}) * settings.GAS_LIMIT_MARGIN),
+                },
             )
-
-            signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
             receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
 
             # Atualiza CONTRACT_ADDRESS em settings e recarrega o contrato
@@ -105,52 +410,31 @@ class BlockchainService:
             logger.error(f"Erro no deploy: {e}")
             return None
 
-    def batch_mint(self, recipients, amounts):
+    def batch_mint(self, recipients, amounts, reward_mint=False):
         """
         Recebe:
-          - recipients: lista de endereços (strings “0x…” já no checksum)
-          - amounts: lista de floats (valores em token, ex: 1.5 significa 1.5 FBTK)
-        Constrói a transação batchMint(recipients, amountsEmWei).
+          - recipients: lista de endereços (strings “0x…” já no checksum),
+            no máximo MAX_BATCH_SIZE
+          - amounts: lista de floats/Decimals (valores em token, ex: 1.5 significa 1.5 FBTK)
+          - reward_mint: mint de process_reward_batch, que liquida o saldo
+            (o listener de BatchMinted não credita esse envio)
+        Constrói a transação batchMint(recipients, amountsEmWei), com gas
+        estimado para o tamanho do lote.
         """
         try:
-            # 1) Pega o último bloco e tenta usar EIP-1559
-            latest_block = self.w3.eth.get_block("latest")
-            base_fee = latest_block.get("baseFeePerGas")
-
-            if base_fee is not None:
-                max_priority_fee = int(2e9)  # 2 Gwei
-                max_fee_per_gas = base_fee + max_priority_fee
-
-                transaction_params = {
-                    "type": 2,  # EIP-1559
-                    "maxPriorityFeePerGas": max_priority_fee,
-                    "maxFeePerGas": max_fee_per_gas,
-                    "gas": 5_000_000,
-                    "chainId": settings.CHAIN_ID,
-                    "nonce": self.w3.eth.get_transaction_count(self.admin_address),
-                }
-                logger.info(
-                    f"✅ batch_mint usando EIP-1559 | Base Fee: {base_fee} | Max Fee: {max_fee_per_gas}"
-                )
+            if len(recipients) > MAX_BATCH_SIZE:
+                raise ValueError(f"Lote com {len(recipients)} destinatários excede MAX_BATCH_SIZE={MAX_BATCH_SIZE}")
 
-            else:
-                # 2) Fallback para legacy
-                gas_price = int(2e9)  # 2 Gwei fixo
-                transaction_params = {
-                    "gas": 5_000_000,
-                    "gasPrice": gas_price,
-                    "chainId": settings.CHAIN_ID,
-                    "nonce": self.w3.eth.get_transaction_count(self.admin_address),
-                }
-                logger.info(f"⚠️ batch_mint fallback legacy | gasPrice: {gas_price}")
+            # 1) Taxas (EIP-1559 ou legacy) ficam a cargo do FeeOracle no envio
+            transaction_params = {"chainId": settings.CHAIN_ID}
 
-            # 3) Verifica se existe algum None em recipients
+            # 2) Verifica se existe algum None em recipients
             for idx, r in enumerate(recipients):
                 if r is None or not isinstance(r, str) or not r.startswith("0x") or len(r) != 42:
                     logger.error(f"[ERROR] batch_mint recebeu recipients[{idx}] = {r!r}")
                     raise ValueError(f"batch_mint recebeu recipients[{idx}] inválido: {r!r}")
 
-            # 4) Converte amounts → wei e verifica se não há None
+            # 3) Converte amounts → wei e verifica se não há None
             wei_amounts = []
             for amt in amounts:
                 if amt is None:
@@ -161,14 +445,19 @@ class BlockchainService:
                     raise ValueError(f"Falha ao converter amount='{amt}' em int wei: {e}")
             logger.debug(f"[DEBUG batch_mint] raw amounts = {amounts}")
 
-            # 5) Constroi a transação corretamente usando transaction_params
-            tx = self.contract.functions.batchMint(recipients, wei_amounts).build_transaction(
-                transaction_params
+            # 4) Calldata montado direto (blockchain/calldata.py), sem o encoder
+            #    do web3; limite de gas em cache pela faixa de tamanho do lote
+            #    (batchMint reverte acima de MAX_BATCH_SIZE)
+            tx_function = batch_mint_call(self.contract, recipients, wei_amounts)
+            transaction_params["gas"] = self.gas.limit_for(
+                tx_function,
+                lambda size: self.contract.functions.batchMint(probe_addresses(size), [1] * size),
+                size=len(recipients),
+                max_size=MAX_BATCH_SIZE,
             )
 
-            # 6) Assina e envia
-            signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            # 5) Constroi, assina e envia usando transaction_params + nonce local
+            tx_hash = self._send_transaction(tx_function, transaction_params, reward_mint=reward_mint)
             logger.info(f"🔗 Transação batchMint enviada: {tx_hash.hex()}")
             return tx_hash.hex()
 
@@ -181,31 +470,70 @@ class BlockchainService:
         Transfere `amount` tokens (float) para `to_address` (string “0x…”).
         """
         try:
-            latest_block = self.w3.eth.get_block("latest")
-            base_fee = latest_block["baseFeePerGas"]
-            max_priority_fee_per_gas = int(2e9)
-            max_fee_per_gas = base_fee + max_priority_fee_per_gas
             amount_wei = int(amount * 10 ** 18)
+            tx_function = self.contract.functions.transfer(to_address, amount_wei)
 
-            tx = self.contract.functions.transfer(to_address, amount_wei).build_transaction(
+            tx_hash = self._send_transaction(
+                tx_function,
                 {
                     "chainId": settings.CHAIN_ID,
-                    "gas": 200_000,
-                    "maxPriorityFeePerGas": max_priority_fee_per_gas,
-                    "maxFeePerGas": max_fee_per_gas,
-                    "nonce": self.w3.eth.get_transaction_count(self.admin_address),
-                    "type": 2,
-                }
+                    "gas": self.gas.limit_for(
+                        tx_function, lambda size: self.contract.functions.transfer(probe_addresses(1)[0], 1)
+                    ),
+                },
             )
-
-            signed_tx = self.w3.eth.account.sign_transaction(tx, settings.PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
             return tx_hash.hex()
 
         except Exception as e:
             logger.error(f"Erro na transferência: {e}")
             return None
 
+    @property
+    def supports_batch_transfer(self):
+        """
+        True se o ABI carregado expõe batchTransfer, ou seja, se o artifact foi
+        recompilado (npx hardhat compile) depois da inclusão da função no contrato.
+        """
+        return self.contract is not None and any(
+            item.get("type") == "function" and item.get("name") == "batchTransfer"
+            for item in self.contract.abi
+        )
+
+    def batch_transfer(self, recipients, amounts):
+        """
+        Transfere amounts[i] tokens (Decimal/float) para recipients[i] em uma
+        única transação batchTransfer, com no máximo MAX_BATCH_SIZE destinatários.
+        """
+        try:
+            if len(recipients) != len(amounts):
+                raise ValueError("recipients e amounts com tamanhos diferentes")
+            if len(recipients) > MAX_BATCH_SIZE:
+                raise ValueError(f"Lote com {len(recipients)} destinatários excede MAX_BATCH_SIZE={MAX_BATCH_SIZE}")
+
+            wei_amounts = [int(amount * 10 ** 18) for amount in amounts]
+
+            tx_function = batch_transfer_call(self.contract, recipients, wei_amounts)
+            gas = self.gas.limit_for(
+                tx_function,
+                lambda size: self.contract.functions.batchTransfer(probe_addresses(size), [1] * size),
+                size=len(recipients),
+                max_size=MAX_BATCH_SIZE,
+            )
+
+            tx_hash = self._send_transaction(
+                tx_function,
+                {
+                    "chainId": settings.CHAIN_ID,
+                    "gas": gas,
+                },
+            )
+            logger.info(f"🔗 Transação batchTransfer enviada ({len(recipients)} destinatários): {tx_hash.hex()}")
+            return tx_hash.hex()
+
+        except Exception as e:
+            logger.error(f"❌ Erro no batchTransfer: {e}")
+            return None
+
     def check_balance(self, address):
         """
         Retorna o saldo de tokens de `address` (float, já em unidades normais de token).
@@ -215,3 +543,100 @@ class BlockchainService:
 
         balance = self.contract.functions.balanceOf(address).call()
         return balance / 10 ** 18
+
+    def _balance_call_data(self, address):
+        # balanceOf(address): seletor + endereço com padding de 32 bytes
+        return BALANCE_OF_SELECTOR + "0" * 24 + address[2:].lower()
+
+    def _read_balances_batch(self, addresses, block):
+        """Um eth_call balanceOf por endereço, todos numa requisição JSON-RPC em lote."""
+        token = self.contract.address
+        results = self.batch_rpc([
+            ("eth_call", [{"to": token, "data": self._balance_call_data(address)}, block])
+            for address in addresses
+        ])
+        return [int.from_bytes(HexBytes(result), "big") for result in results]
+
+    def _read_balances_multicall(self, addresses, block):
+        """Todos os balanceOf do lote em um único eth_call ao Multicall3.aggregate3."""
+        token = self.contract.address
+        calls = [(token, False, bytes.fromhex(self._balance_call_data(address)[2:])) for address in addresses]
+        data = AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"], [calls])
+        result = self.w3.eth.call({"to": settings.MULTICALL3_ADDRESS, "data": data}, block)
+        (returned,) = decode(["(bool,bytes)[]"], bytes(result))
+        return [int.from_bytes(return_data, "big") for _, return_data in returned]
+
+    def iter_balances(self, addresses, block="latest", chunk_size=None, concurrency=None):
+        """
+        Gera (endereço, saldo em Decimal exato) na ordem de `addresses`, que
+        pode ser um iterador longo (arquivo, queryset.iterator()). Os
+        endereços são lidos em lotes de BALANCE_READ_CHUNK_SIZE: um lote é uma
+        requisição JSON-RPC em lote ou, com MULTICALL3_ADDRESS, um único
+        eth_call ao Multicall3. Até BALANCE_READ_CONCURRENCY lotes ficam em
+        voo ao mesmo tempo. Use um número de bloco em `block` para ler todos
+        os lotes no mesmo estado da chain.
+        """
+        if not self.contract:
+            raise Exception("Contrato não carregado")
+
+        chunk_size = chunk_size or settings.BALANCE_READ_CHUNK_SIZE
+        concurrency = concurrency or settings.BALANCE_READ_CONCURRENCY
+        if isinstance(block, int):
+            block = hex(block)
+        read = self._read_balances_multicall if settings.MULTICALL3_ADDRESS else self._read_balances_batch
+
+        addresses = iter(addresses)
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                while len(in_flight) < concurrency:
+                    chunk = list(islice(addresses, chunk_size))
+                    if not chunk:
+                        break
+                    in_flight.append((chunk, executor.submit(read, chunk, block)))
+                if not in_flight:
+                    return
+
+                chunk, future = in_flight.popleft()
+                for address, raw in zip(chunk, future.result()):
+                    yield address, Decimal(f"{raw}e-18")
+
+    def balances_of(self, addresses, block="latest", chunk_size=None, concurrency=None):
+        """Saldos (Decimal, em tokens) de vários endereços: {endereço: saldo}."""
+        return dict(self.iter_balances(addresses, block, chunk_size, concurrency))
+
+
+
+# Registro de serviços por processo. Cada worker (gunicorn/Celery prefork)
+# mantém a própria instância; após um fork o registro herdado é descartado,
+# porque sockets HTTP/WS não podem ser compartilhados entre processos.
+_services = {}
+_services_pid = None
+_services_lock = threading.Lock()
+
+
+def get_blockchain_service(use_ws=False):
+    """
+    Retorna o BlockchainService compartilhado do processo atual, criando-o
+    na primeira chamada. O provider é checado de forma preguiçosa.
+    """
+    global _services_pid
+
+    with _services_lock:
+        if _services_pid != os.getpid():
+            _services.clear()
+            _services_pid = os.getpid()
+
+        service = _services.get(use_ws)
+        if service is None:
+            service = BlockchainService(use_ws=use_ws, lazy=True)
+            _services[use_ws] = service
+
+    service.ensure_connected()
+    return service
+
+
+def reset_blockchain_services():
+    """Descarta os serviços em cache (ex.: após trocar CONTRACT_ADDRESS)."""
+    with _services_lock:
+        _services.clear()
@@ -0,0 +1,22 @@
+# feedback_platform/blockchain/signals.py
+"""
+Os contadores de feedback da empresa também descem quando um Feedback é
+apagado (admin, queryset.delete() ou cascata do usuário), na mesma
+transação da exclusão.
+"""
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from blockchain.accrual import bump_company_counters
+from blockchain.models import Feedback
+
+
+@receiver(post_delete, sender=Feedback)
+def decrement_company_counters(sender, instance, **kwargs):
+    deltas = {'feedback_count': -1}
+    if instance.is_approved:
+        deltas['approved_count'] = -1
+    if instance.is_useful:
+        deltas['useful_count'] = -1
+    bump_company_counters(instance.company_id, **deltas)
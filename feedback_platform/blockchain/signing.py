@@ -0,0 +1,72 @@
+# feedback_platform/blockchain/signing.py
+"""
+Assinatura de transações fora da thread que envia.
+
+A codificação ABI do calldata e a assinatura secp256k1 são trabalho de CPU
+puro; feitas inline elas disputam o GIL com as threads que enviam lotes em
+paralelo (process_reward_batch). Com SIGNING_WORKERS > 0 esse trabalho vai
+para um pool de processos: o processo principal só monta os campos da
+transação (nonce, gas, taxas), espera a transação assinada e transmite.
+
+Processos daemon (workers prefork do Celery) não podem criar filhos; nesse
+caso, ou com SIGNING_WORKERS = 0, a assinatura continua inline. Os filhos
+são criados com spawn: o serviço envia a partir de várias threads, e um fork
+no meio delas pode herdar locks travados.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_abi import encode
+from eth_account import Account
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types
+from hexbytes import HexBytes
+
+logger = logging.getLogger(__name__)
+
+# Chave da conta admin dentro de cada processo do pool
+_private_key = None
+
+
+def _init_signer(private_key):
+    global _private_key
+    _private_key = private_key
+
+
+def encode_call(fn_abi, args):
+    """Calldata de uma chamada: seletor + argumentos codificados (hex com 0x)."""
+    selector = function_abi_to_4byte_selector(fn_abi)
+    return HexBytes(selector + encode(get_abi_input_types(fn_abi), args)).to_0x_hex()
+
+
+def encode_and_sign(tx, fn_abi=None, args=()):
+    """
+    Executado no pool: completa `tx` com o calldata (se `fn_abi` vier; senão
+    `tx` já traz data) e assina. Retorna (tx, raw).
+    """
+    if fn_abi is not None:
+        tx = {**tx, "data": encode_call(fn_abi, args)}
+    signed = Account.sign_transaction(tx, _private_key)
+    return tx, bytes(signed.raw_transaction)
+
+
+class SigningPool:
+    def __init__(self, private_key, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_signer,
+            initargs=(private_key,),
+        )
+
+    def submit(self, tx, fn_abi=None, args=()):
+        """Future de (transação com data, transação assinada em bytes)."""
+        return self._executor.submit(encode_and_sign, tx, fn_abi, list(args))
+
+    def sign(self, tx, fn_abi=None, args=()):
+        return self.submit(tx, fn_abi, args).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -1,2 +1,6 @@
 from .rewards import *
-from .events import *
\ No newline at end of file
+from .events import *
+from .withdrawals import *
+from .confirmations import *
+from .replacements import *
+from .ledger import *
\ No newline at end of file
@@ -0,0 +1,196 @@
+# blockchain/tasks/confirmations.py
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from blockchain.balances import apply_balance_deltas
+from blockchain.models import RewardTransaction, UserProfile
+from blockchain.services import get_blockchain_service
+
+logger = logging.getLogger(__name__)
+
+
+def to_int(value):
+    """Números JSON-RPC chegam em hex ('0x1a'); alguns providers já devolvem int."""
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def normalize_hash(tx_hash):
+    """batch_mint/transfer gravam o hash sem 0x; o JSON-RPC usa com 0x e minúsculo."""
+    tx_hash = tx_hash.lower()
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+def next_processing_hashes(after, limit):
+    """
+    Próximos `limit` hashes distintos de transações PROCESSING, em ordem
+    (paginação por keyset sobre o índice (status, tx_hash)). Retorna
+    {hash normalizado: [valores gravados]}, já que o mesmo hash pode estar
+    gravado com e sem 0x.
+    """
+    stored = (
+        RewardTransaction.objects.filter(status='PROCESSING', tx_hash__isnull=False, tx_hash__gt=after)
+        .order_by('tx_hash')
+        .values_list('tx_hash', flat=True)
+        .distinct()[:limit]
+    )
+    by_hash = defaultdict(list)
+    for tx_hash in stored:
+        by_hash[normalize_hash(tx_hash)].append(tx_hash)
+    return by_hash
+
+
+def fetch_receipts(service, tx_hashes):
+    """Bloco atual e recibos de todos os hashes em uma única requisição em lote."""
+    results = service.batch_rpc(
+        [('eth_blockNumber', [])] + [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in tx_hashes]
+    )
+    return to_int(results[0]), dict(zip(tx_hashes, results[1:]))
+
+
+def canonical_block_hashes(service, block_numbers):
+    """Hash canônico de cada bloco, também em uma única requisição em lote."""
+    block_numbers = sorted(block_numbers)
+    if not block_numbers:
+        return {}
+    blocks = service.batch_rpc([('eth_getBlockByNumber', [hex(n), False]) for n in block_numbers])
+    return {n: block['hash'].lower() for n, block in zip(block_numbers, blocks) if block}
+
+
+def classify_receipts(head, receipts, canonical, depth):
+    """
+    Separa os hashes por destino:
+      - confirmed/failed: recibo com `depth` confirmações num bloco canônico
+      - seen: recibo minerado, ainda sem profundidade (ou bloco órfão)
+      - dropped: sem recibo (na mempool ou removido por reorg)
+    Cada item de confirmed/failed/seen é (hash, número do bloco, hash do bloco).
+    """
+    outcome = {'confirmed': [], 'failed': [], 'seen': [], 'dropped': []}
+    for tx_hash, receipt in receipts.items():
+        if not receipt or receipt.get('blockHash') is None:
+            outcome['dropped'].append(tx_hash)
+            continue
+        block_number = to_int(receipt['blockNumber'])
+        block_hash = receipt['blockHash'].lower()
+        mature = head - block_number + 1 >= depth
+        if mature and canonical.get(block_number) == block_hash:
+            key = 'confirmed' if to_int(receipt['status']) == 1 else 'failed'
+        else:
+            key = 'seen'
+        outcome[key].append((tx_hash, block_number, block_hash))
+    return outcome
+
+
+def group_by_block(items, stored_by_hash):
+    """{(bloco, hash do bloco): [valores de tx_hash gravados]} para um UPDATE por bloco."""
+    groups = defaultdict(list)
+    for tx_hash, block_number, block_hash in items:
+        groups[(block_number, block_hash)].extend(stored_by_hash[tx_hash])
+    return groups
+
+
+def reverse_failed_balances(rows):
+    """
+    Desfaz o movimento de saldo feito no envio de transações que reverteram:
+    recompensas voltam de blockchain_balance para virtual_balance e saques
+    devolvem o valor reservado em blockchain_balance. Cada recompensa
+    revertida ganha uma nova RewardTransaction PENDING, para ser mintada de
+    novo pelo process_reward_batch (a FAILED fica como histórico).
+    """
+    virtual, blockchain = defaultdict(Decimal), defaultdict(Decimal)
+    remint = []
+    for user_id, tx_type, amount in rows:
+        if tx_type == 'REWARD':
+            virtual[user_id] += amount
+            blockchain[user_id] -= amount
+            remint.append(RewardTransaction(user_id=user_id, amount=amount, tx_type='REWARD', status='PENDING'))
+        else:
+            blockchain[user_id] += amount
+    RewardTransaction.objects.bulk_create(remint)
+
+    profile_ids = dict(
+        UserProfile.objects.filter(user_id__in=set(virtual) | set(blockchain)).values_list('user_id', 'id')
+    )
+    apply_balance_deltas(
+        virtual_balance={profile_ids[u]: v for u, v in virtual.items() if u in profile_ids},
+        blockchain_balance={profile_ids[u]: v for u, v in blockchain.items() if u in profile_ids},
+    )
+
+
+def apply_outcome(outcome, stored_by_hash):
+    """Aplica as transições do lote com um UPDATE por bloco, numa transação."""
+    counts = defaultdict(int)
+    now = timezone.now()
+    processing = RewardTransaction.objects.filter(status='PROCESSING')
+
+    with transaction.atomic():
+        for (block_number, block_hash), stored in group_by_block(outcome['seen'], stored_by_hash).items():
+            # Só grava quando o bloco muda (primeira vez ou reorg)
+            counts['seen'] += processing.filter(tx_hash__in=stored).exclude(
+                block_hash=block_hash
+            ).update(block_number=block_number, block_hash=block_hash)
+
+        dropped = [tx for tx_hash in outcome['dropped'] for tx in stored_by_hash[tx_hash]]
+        counts['reorged'] = processing.filter(tx_hash__in=dropped, block_hash__isnull=False).update(
+            block_number=None, block_hash=None
+        )
+
+        for status, key in (('CONFIRMED', 'confirmed'), ('FAILED', 'failed')):
+            for (block_number, block_hash), stored in group_by_block(outcome[key], stored_by_hash).items():
+                counts[key] += processing.filter(tx_hash__in=stored).update(
+                    status=status, block_number=block_number, block_hash=block_hash, processed_at=now
+                )
+
+        if counts['failed']:
+            # processed_at marca as linhas que este tracker passou para FAILED
+            failed = [tx for tx_hash, _, _ in outcome['failed'] for tx in stored_by_hash[tx_hash]]
+            reverse_failed_balances(
+                RewardTransaction.objects.filter(status='FAILED', processed_at=now, tx_hash__in=failed)
+                .values_list('user_id', 'tx_type', 'amount')
+            )
+
+    if counts['reorged']:
+        logger.warning(f"⚠️ {counts['reorged']} transações saíram da chain por reorg; aguardando nova inclusão")
+    return counts
+
+
+@shared_task(name="track_confirmations")
+def track_confirmations():
+    """
+    Acompanha as transações PROCESSING (mints e saques já transmitidos) até
+    CONFIRMATION_DEPTH confirmações: a cada CONFIRMATION_BATCH_SIZE hashes faz
+    uma requisição JSON-RPC em lote com os recibos e outra com os blocos
+    maduros, para conferir pelo hash se o bloco ainda é canônico. Recibos com
+    status 1 viram CONFIRMED e com status 0 viram FAILED (saldo desfeito).
+    """
+    service = get_blockchain_service()
+    depth = settings.CONFIRMATION_DEPTH
+    totals = defaultdict(int)
+
+    after = ''
+    while True:
+        stored_by_hash = next_processing_hashes(after, settings.CONFIRMATION_BATCH_SIZE)
+        if not stored_by_hash:
+            break
+        after = max(tx for stored in stored_by_hash.values() for tx in stored)
+
+        head, receipts = fetch_receipts(service, list(stored_by_hash))
+        mature_blocks = {
+            to_int(receipt['blockNumber'])
+            for receipt in receipts.values()
+            if receipt and receipt.get('blockNumber') is not None
+            and head - to_int(receipt['blockNumber']) + 1 >= depth
+        }
+        canonical = canonical_block_hashes(service, mature_blocks)
+        outcome = classify_receipts(head, receipts, canonical, depth)
+        for key, count in apply_outcome(outcome, stored_by_hash).items():
+            totals[key] += count
+
+    logger.info(
+        f"✅ Confirmações: {totals['confirmed']} confirmadas, {totals['failed']} falharam, "
+        f"{totals['reorged']} reorgs"
+    )
+    return dict(totals)
@@ -1,60 +1,430 @@
 # blockchain/tasks/events.py
+import asyncio
 import logging
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+import requests
 from celery import shared_task
 from django.conf import settings
-from blockchain.services import BlockchainService
-from blockchain.models import UserProfile
-from django.db import transaction
+from web3 import AsyncWeb3, Web3, WebSocketProvider
+from blockchain.balances import apply_balance_deltas, profile_ids_by_wallet
+from blockchain.services import get_blockchain_service
+from blockchain.models import ChainCursor, ProcessedLog, RewardTransaction, TransactionAttempt
+from blockchain.tasks.replacements import sibling_hashes
+from django.db import IntegrityError, transaction
 
 logger = logging.getLogger(__name__)
 
+BATCH_MINTED = 'BatchMinted'
+# Hashes por consulta ao ProcessedLog / linhas por INSERT
+LEDGER_CHUNK_SIZE = 500
+
+
+def get_event_cursor(contract_address, event_name, start_block):
+    """
+    Carrega o cursor persistido do evento; na primeira execução ele é criado
+    para começar em start_block.
+    """
+    cursor, created = ChainCursor.objects.get_or_create(
+        contract_address=contract_address.lower(),
+        event_name=event_name,
+        defaults={'last_block': start_block - 1},
+    )
+    if created:
+        logger.info(f"📍 Cursor de {event_name} criado a partir do bloco {start_block}")
+    else:
+        logger.info(f"📍 Retomando {event_name} a partir do bloco {cursor.last_block + 1}")
+    return cursor
+
+
+def log_key(event):
+    return Web3.to_hex(event.transactionHash), event.logIndex
+
+
+def processed_log_keys(tx_hashes):
+    """(tx_hash, log_index) já registrados no ProcessedLog para esses hashes."""
+    keys = set()
+    tx_hashes = list(tx_hashes)
+    for i in range(0, len(tx_hashes), LEDGER_CHUNK_SIZE):
+        keys.update(
+            ProcessedLog.objects.filter(tx_hash__in=tx_hashes[i:i + LEDGER_CHUNK_SIZE])
+            .values_list('tx_hash', 'log_index')
+        )
+    return keys
+
+
+def claim_logs(events, event_name):
+    """
+    Registra os logs no ProcessedLog e devolve só os que ainda não tinham
+    sido aplicados. Se outra réplica registrar o mesmo log ao mesmo tempo, a
+    constraint única levanta IntegrityError e a transação inteira volta.
+    """
+    by_key = {log_key(event): event for event in events}
+    seen = processed_log_keys({tx_hash for tx_hash, _ in by_key})
+    new_events = [event for key, event in by_key.items() if key not in seen]
+    ProcessedLog.objects.bulk_create(
+        [
+            ProcessedLog(
+                event_name=event_name,
+                tx_hash=tx_hash,
+                log_index=log_index,
+                block_number=by_key[(tx_hash, log_index)].blockNumber,
+            )
+            for tx_hash, log_index in by_key
+            if (tx_hash, log_index) not in seen
+        ],
+        batch_size=LEDGER_CHUNK_SIZE,
+    )
+    if len(new_events) < len(events):
+        logger.info(f"♻️ {len(events) - len(new_events)} logs já processados ignorados")
+    return new_events
+
+
+def settled_reward_mints(events):
+    """
+    Hashes dos mints enviados por process_reward_batch: o saldo desses é
+    movido para blockchain_balance na liquidação do lote. O envio é
+    registrado como reward_mint antes de ser transmitido, então o mint é
+    reconhecido mesmo que o log chegue antes da liquidação; linhas com o
+    tx_hash cobrem mints anteriores a esse registro.
+    """
+    tx_hashes = {Web3.to_hex(event.transactionHash) for event in events}
+    # batch_mint grava o hash sem o prefixo 0x; se o mint foi substituído
+    # (replace_stuck_transactions), a linha pode apontar para outro envio
+    groups = {tx_hash: {tx_hash, tx_hash[2:]} for tx_hash in tx_hashes}
+    siblings = sibling_hashes(set().union(*groups.values()))
+    for group in groups.values():
+        group.update(*(siblings.get(tx_hash, ()) for tx_hash in list(group)))
+
+    hashes = set().union(*groups.values())
+    settled = set(TransactionAttempt.objects.filter(
+        tx_hash__in=hashes, broadcast__reward_mint=True
+    ).values_list('tx_hash', flat=True))
+    settled.update(RewardTransaction.objects.filter(
+        tx_type='REWARD', tx_hash__in=hashes
+    ).values_list('tx_hash', flat=True).distinct())
+    return {tx_hash for tx_hash, group in groups.items() if group & settled}
+
+
+def credit_batch_minted(events):
+    """
+    Credita no blockchain_balance os valores de uma lista de eventos
+    BatchMinted: soma por carteira, resolve todas as carteiras em uma query
+    (índice em LOWER(wallet_address)) e aplica os créditos com UPDATE/F().
+    Logs já registrados no ProcessedLog e mints de recompensas já liquidadas
+    não são creditados. Deve rodar dentro da transação que avança o cursor.
+    """
+    events = claim_logs(events, BATCH_MINTED)
+    settled = settled_reward_mints(events) if events else set()
+
+    totals = defaultdict(int)
+    for event in events:
+        if Web3.to_hex(event.transactionHash) in settled:
+            continue
+        logger.info(f"🎉 Evento BatchMinted detectado no bloco {event.blockNumber}")
+        for recipient, amount in zip(event.args.recipients, event.args.amounts):
+            totals[recipient.lower()] += amount
+    if not totals:
+        return 0
+
+    profile_ids = profile_ids_by_wallet(totals)
+    credits = defaultdict(Decimal)
+    for wallet, amount in totals.items():
+        profile_id = profile_ids.get(wallet)
+        if profile_id is None:
+            logger.warning(f"❌ Perfil não encontrado para {wallet}")
+            continue
+        credits[profile_id] += Decimal(amount) / Decimal(10**18)
+
+    apply_balance_deltas(blockchain_balance=credits)
+    logger.info(f"✅ Saldos atualizados para {len(credits)} carteiras ({len(events)} eventos)")
+    return len(credits)
+
+
+class ScanWindow:
+    """
+    Tamanho adaptativo (em blocos) de cada get_logs: dobra enquanto as
+    respostas vêm pequenas e cai pela metade quando o provider recusa o
+    intervalo (muitos resultados, timeout). Depois de uma recusa, não volta
+    a crescer até o tamanho recusado por CEILING_RESET_AFTER janelas, para
+    não alternar entre acerto e erro.
+    """
+
+    CEILING_RESET_AFTER = 100
+
+    def __init__(self, size, max_size, target_logs):
+        self.size = max(1, size)
+        self.max_size = max(self.size, max_size)
+        self.target_logs = target_logs
+        self.ceiling = None
+        self._since_failure = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            settings.EVENT_SCAN_BLOCK_RANGE,
+            settings.EVENT_SCAN_MAX_BLOCK_RANGE,
+            settings.EVENT_SCAN_TARGET_LOGS,
+        )
+
+    def observe(self, log_count):
+        if self.ceiling is not None:
+            self._since_failure += 1
+            if self._since_failure >= self.CEILING_RESET_AFTER:
+                self.ceiling = None
+        if log_count >= self.target_logs // 2:
+            return
+        grown = min(self.size * 2, self.max_size)
+        if self.ceiling is None or grown < self.ceiling:
+            self.size = grown
+
+    def shrink(self):
+        """Reduz a janela; retorna False se ela já está em um bloco."""
+        if self.size == 1:
+            return False
+        self.ceiling = self.size
+        self._since_failure = 0
+        self.size //= 2
+        return True
+
+
+# Trechos de erros de get_logs (geth, Alchemy, Infura, QuickNode) que indicam
+# intervalo grande demais, não falha do nó
+RANGE_ERROR_MARKERS = (
+    "query returned more than",
+    "too many results",
+    "log response size exceeded",
+    "block range",
+    "range is too large",
+    "limit exceeded",
+    "timeout",
+    "timed out",
+)
+
+
+def is_range_error(exc):
+    if isinstance(exc, (requests.exceptions.Timeout, TimeoutError)):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+def fetch_batch_minted_logs(service, from_block, to_block):
+    return service.contract.events.BatchMinted.get_logs(from_block=from_block, to_block=to_block)
+
+
+def apply_block_range(cursor, from_block, to_block, events):
+    """
+    Aplica os eventos de [from_block, to_block] e avança o cursor na mesma
+    transação: ou o intervalo inteiro é creditado e registrado, ou nada.
+    Retorna o número de eventos recebidos, ou None se outro listener já
+    tinha avançado o cursor. Com um cursor não salvo (backfill_events), só o
+    ProcessedLog protege contra crédito duplicado.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                if cursor.pk is not None:
+                    # Relê o cursor travado: outro listener pode ter processado
+                    # o intervalo enquanto os logs eram buscados
+                    current = ChainCursor.objects.select_for_update().get(pk=cursor.pk)
+                    if current.last_block != from_block - 1:
+                        logger.warning(
+                            f"⚠️ Cursor de {cursor.event_name} movido por outro processo "
+                            f"({current.last_block}); ignorando blocos {from_block}-{to_block}"
+                        )
+                        cursor.last_block = current.last_block
+                        return None
+
+                credit_batch_minted(events)
+
+                if cursor.pk is not None:
+                    current.last_block = to_block
+                    current.save(update_fields=['last_block', 'updated_at'])
+            break
+        except IntegrityError:
+            # Outra réplica registrou os mesmos logs; na segunda tentativa
+            # eles aparecem como já processados
+            if attempt:
+                raise
+            logger.warning(f"⚠️ Logs dos blocos {from_block}-{to_block} registrados em paralelo; repetindo")
+
+    cursor.last_block = to_block
+    return len(events)
+
+
+def process_block_range(service, cursor, from_block, to_block):
+    return apply_block_range(
+        cursor, from_block, to_block, fetch_batch_minted_logs(service, from_block, to_block)
+    )
+
+
+def scan_events(service, cursor, to_block, window=None):
+    """
+    Processa do bloco seguinte ao cursor até to_block. Busca até
+    EVENT_SCAN_CONCURRENCY janelas consecutivas em paralelo, mas aplica e
+    commita em ordem de bloco, então o cursor nunca pula um intervalo.
+    """
+    window = window or ScanWindow.from_settings()
+    concurrency = max(1, settings.EVENT_SCAN_CONCURRENCY)
+    applied = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while cursor.last_block < to_block:
+            ranges = []
+            start = cursor.last_block + 1
+            while len(ranges) < concurrency and start <= to_block:
+                end = min(start + window.size - 1, to_block)
+                ranges.append((start, end))
+                start = end + 1
+
+            futures = [pool.submit(fetch_batch_minted_logs, service, a, b) for a, b in ranges]
+            for (from_block, range_end), future in zip(ranges, futures):
+                try:
+                    events = future.result()
+                except Exception as e:
+                    if not is_range_error(e) or not window.shrink():
+                        raise
+                    logger.warning(
+                        f"⚠️ get_logs {from_block}-{range_end} recusado ({e}); "
+                        f"janela reduzida para {window.size} blocos"
+                    )
+                    break
+
+                result = apply_block_range(cursor, from_block, range_end, events)
+                if result is None:
+                    break
+                applied += result
+                window.observe(len(events))
+
+    return applied
+
+
+def poll_events(service, cursor, window, deadline=None, stop=None):
+    """
+    Polling HTTP: varre até o bloco atual a cada EVENT_POLL_INTERVAL
+    segundos, até `deadline` (time.monotonic()) ou para sempre.
+    """
+    while not (stop and stop.is_set()):
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+        try:
+            scan_events(service, cursor, service.w3.eth.block_number, window)
+            pause = settings.EVENT_POLL_INTERVAL
+        except Exception as e:
+            logger.error(f"❌ Erro durante a escuta: {e}")
+            pause = 10
+            try:
+                service.ensure_connected(force=True)
+            except ConnectionError as conn_error:
+                logger.error(f"❌ {conn_error}")
+        if deadline is not None:
+            pause = min(pause, max(0, deadline - time.monotonic()))
+        time.sleep(pause)
+
+
+async def subscribe_events(service, cursor, window, ws_url):
+    """
+    Uma sessão WebSocket: assina os logs BatchMinted do contrato via
+    eth_subscribe e aplica cada bloco notificado assim que chega. Retorna
+    (ou levanta) quando a conexão cai.
+
+    As notificações só disparam a varredura pelo cursor (scan_events), então
+    todos os logs do bloco, e qualquer bloco perdido antes, entram na mesma
+    transação do cursor. Sem eventos, nenhuma chamada RPC é feita.
+    """
+    # Sem timeout, um provider que fecha a conexão no meio do handshake deixa
+    # o eth_subscribe esperando para sempre
+    provider = WebSocketProvider(ws_url, request_timeout=settings.WEB3_HTTP_TIMEOUT)
+    async with AsyncWeb3(provider) as w3:
+        await w3.eth.subscribe("logs", {
+            "address": service.contract.address,
+            "topics": [service.contract.events.BatchMinted.topic],
+        })
+        logger.info("🔌 Assinatura WebSocket de BatchMinted ativa")
+
+        # Reconcilia o que foi minerado enquanto estava desconectado. A
+        # assinatura vem antes, então nada cai entre a varredura e ela.
+        head = await w3.eth.block_number
+        await asyncio.to_thread(scan_events, service, cursor, head, window)
+
+        async for message in w3.socket.process_subscriptions():
+            block_number = message["result"]["blockNumber"]
+            if block_number > cursor.last_block:
+                await asyncio.to_thread(scan_events, service, cursor, block_number, window)
+
+
+def listen_with_subscription(service, cursor, window, ws_url, stop=None):
+    """
+    Mantém a assinatura WebSocket; se ela cair (ou não conectar), volta ao
+    polling HTTP por EVENT_WS_RETRY_INTERVAL segundos e tenta de novo.
+    """
+    while not (stop and stop.is_set()):
+        try:
+            asyncio.run(subscribe_events(service, cursor, window, ws_url))
+            logger.warning("⚠️ Assinatura WebSocket encerrada pelo provider")
+        except Exception as e:
+            logger.warning(f"⚠️ WebSocket indisponível ({e!r}); usando polling HTTP")
+        poll_events(
+            service, cursor, window,
+            deadline=time.monotonic() + settings.EVENT_WS_RETRY_INTERVAL,
+            stop=stop,
+        )
+
+
+def backfill_events(service, from_block, to_block, window=None):
+    """
+    Aplica os BatchMinted de [from_block, to_block] sem mexer no cursor do
+    listener. Intervalos sobrepostos (ou já vistos pelo listener) são
+    seguros: o ProcessedLog descarta logs repetidos, então várias réplicas
+    podem dividir um histórico longo em partições.
+    """
+    cursor = ChainCursor(
+        contract_address=service.contract.address.lower(),
+        event_name=BATCH_MINTED,
+        last_block=from_block - 1,
+    )
+    return scan_events(service, cursor, to_block, window)
+
+
 @shared_task(name="listen_for_batch_mint_events", queue='event_queue')
-def listen_for_batch_mint_events():
-    """Escuta eventos BatchMinted e atualiza o sistema via HTTPProvider"""
+def listen_for_batch_mint_events(from_block=None, catch_up=False):
+    """
+    Escuta eventos BatchMinted e atualiza o sistema: por assinatura
+    WebSocket quando WEB3_WS_PROVIDER_URL está definido (com polling HTTP
+    enquanto o WS estiver fora), senão por polling HTTP.
+
+    O progresso fica em ChainCursor, então um restart retoma do último bloco
+    processado. from_block (ou EVENT_LISTENER_START_BLOCK) só vale quando
+    ainda não existe cursor; sem nenhum dos dois, começa no bloco atual.
+    Com catch_up=True, processa até o bloco atual sem pausas e retorna o
+    último bloco processado.
+    """
     try:
         logger.info("🎧 Iniciando escuta de eventos BatchMinted")
-        service = BlockchainService(use_ws=False)
+        service = get_blockchain_service(use_ws=False)
         logger.info("✅ Conectado à blockchain via HTTP")
-        
-        last_block = getattr(settings, 'LAST_PROCESSED_BLOCK', 'latest')
 
-        while True:
-            try:
-                events = service.contract.events.BatchMinted.get_logs(
-                    fromBlock=last_block,
-                    toBlock='latest'
-                )
-
-                for event in events:
-                    logger.info(f"🎉 Evento BatchMinted detectado no bloco {event.blockNumber}")
-                    recipients = event.args.recipients
-                    amounts = event.args.amounts
-
-                    for recipient, amount in zip(recipients, amounts):
-                        try:
-                            with transaction.atomic():
-                                profile = UserProfile.objects.get(wallet_address__iexact=recipient)
-                                token_amount = Decimal(str(amount / 10**18))
-                                
-                                profile.blockchain_balance += token_amount
-                                profile.save(update_fields=['blockchain_balance'])
-                                logger.info(f"✅ Saldo atualizado para {recipient}: {profile.blockchain_balance} FBTK")
-                        except UserProfile.DoesNotExist:
-                            logger.warning(f"❌ Perfil não encontrado para {recipient}")
-                        except Exception as e:
-                            logger.error(f"🚨 Erro ao atualizar perfil {recipient}: {e}")
-                    last_block = event.blockNumber + 1
-                    settings.LAST_PROCESSED_BLOCK = last_block
-
-                time.sleep(5)
-
-            except Exception as e:
-                logger.error(f"❌ Erro durante a escuta: {e}")
-                time.sleep(10)
-                service = BlockchainService(use_ws=False)
+        if from_block is None:
+            from_block = settings.EVENT_LISTENER_START_BLOCK
+        if from_block is None:
+            from_block = service.w3.eth.block_number
+        cursor = get_event_cursor(service.contract.address, BATCH_MINTED, from_block)
+        # A janela aprendida vale para as próximas varreduras
+        window = ScanWindow.from_settings()
+
+        if catch_up:
+            scan_events(service, cursor, service.w3.eth.block_number, window)
+            logger.info(f"✅ Catch-up concluído no bloco {cursor.last_block}")
+            return cursor.last_block
+
+        if settings.WEB3_WS_PROVIDER_URL:
+            listen_with_subscription(service, cursor, window, settings.WEB3_WS_PROVIDER_URL)
+        else:
+            poll_events(service, cursor, window)
 
     except Exception as e:
         logger.exception(f"❌ ERRO CRÍTICO ao iniciar escuta de eventos: {e}")
-        raise
\ No newline at end of file
+        raise
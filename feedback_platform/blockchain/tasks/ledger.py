@@ -0,0 +1,68 @@
+# blockchain/tasks/ledger.py
+import logging
+from celery import shared_task
+from django.conf import settings
+from blockchain.ledger import apply_entries, get_reward_ledger, queue_outbox
+
+logger = logging.getLogger(__name__)
+
+
+def renew_lock(lock):
+    """
+    Renova o TTL do lock do flush. Retorna False se ele já expirou (outro
+    flush pode estar rodando), caso em que este deve parar.
+    """
+    from redis.exceptions import LockError
+
+    try:
+        lock.reacquire()
+    except LockError:
+        return False
+    return True
+
+
+@shared_task(name="flush_reward_ledger")
+def flush_reward_ledger():
+    """
+    Aplica ao banco as recompensas acumuladas no stream do Redis
+    (REWARD_LEDGER_BACKEND = 'redis'), REWARD_LEDGER_BATCH_SIZE eventos por
+    transação, somados por usuário. Só confirma (XACK) depois do commit.
+    Antes, põe de novo no stream as LedgerOutbox que ficaram sem evento.
+    O lock é renovado a cada lote; se expirar (um lote mais longo que
+    REWARD_LEDGER_LOCK_TIMEOUT), o flush para sem confirmar e os eventos
+    voltam como pendentes na próxima execução. Retorna quantos eventos foram
+    aplicados.
+    """
+    if settings.REWARD_LEDGER_BACKEND != "redis":
+        return 0
+
+    ledger = get_reward_ledger()
+    lock = ledger.lock()
+    if not lock.acquire(blocking=False):
+        logger.info("Flush do ledger de recompensas já em andamento")
+        return 0
+
+    applied = 0
+    try:
+        queue_outbox(ledger, settings.REWARD_LEDGER_BATCH_SIZE)
+        while True:
+            entries = ledger.read(settings.REWARD_LEDGER_BATCH_SIZE)
+            if not entries or not lock.owned():
+                break
+            applied += apply_entries(ledger.stream, entries)
+            # Lote mais longo que o lock: outro flush pode ter lido os mesmos eventos
+            if not lock.owned():
+                break
+            ledger.ack([entry[0] for entry in entries])
+            if not renew_lock(lock):
+                break
+    finally:
+        lost = not lock.owned()
+        if not lost:
+            lock.release()
+
+    if lost:
+        logger.error("❌ Lock do flush do ledger expirou; eventos não confirmados ficam para a próxima execução")
+    if applied:
+        logger.info(f"📒 {applied} recompensas do ledger aplicadas ao banco")
+    return applied
@@ -0,0 +1,219 @@
+# blockchain/tasks/replacements.py
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from blockchain.calldata import decode_payouts
+from blockchain.models import BroadcastTransaction, RewardTransaction, TransactionAttempt
+from blockchain.services import get_blockchain_service
+from blockchain.tasks.confirmations import normalize_hash
+
+logger = logging.getLogger(__name__)
+
+# Mensagens de erro que indicam que o nonce já foi usado (a original foi minerada)
+NONCE_USED_MARKERS = ("nonce too low", "already known", "invalid transaction nonce")
+
+
+def sibling_hashes(tx_hashes):
+    """
+    {hash: hashes de todos os envios da mesma transação (original e
+    substituições)} para os hashes de `tx_hashes` que foram registrados.
+    """
+    broadcast_by_hash = dict(
+        TransactionAttempt.objects.filter(tx_hash__in=tx_hashes).values_list('tx_hash', 'broadcast_id')
+    )
+    if not broadcast_by_hash:
+        return {}
+    attempts = defaultdict(set)
+    for broadcast_id, tx_hash in TransactionAttempt.objects.filter(
+        broadcast_id__in=set(broadcast_by_hash.values())
+    ).values_list('broadcast_id', 'tx_hash'):
+        attempts[broadcast_id].add(tx_hash)
+    return {tx_hash: attempts[broadcast_id] for tx_hash, broadcast_id in broadcast_by_hash.items()}
+
+
+def recorded_payouts(selectors, since):
+    """
+    Envios da conta admin registrados a partir de `since` que chamam uma das
+    funções de `selectors` (transfer, batchMint, batchTransfer):
+    [(registrado em, {carteira em minúsculas: [valores em wei]})]. O envio é
+    registrado antes de ser transmitido, então um pagamento sem registro
+    nunca saiu. Calldata ilegível vira None: pode ter pago qualquer carteira.
+    """
+    prefixes = Q()
+    for selector in selectors:
+        prefixes |= Q(data__istartswith="0x" + selector.hex())
+    payouts = []
+    for created_at, data in BroadcastTransaction.objects.filter(prefixes, created_at__gte=since).values_list(
+        'created_at', 'data'
+    ):
+        try:
+            _, pairs = decode_payouts(data)
+        except ValueError as e:
+            logger.error(f"❌ Calldata de envio registrado ilegível ({e})")
+            payouts.append((created_at, None))
+            continue
+        wallets = defaultdict(list)
+        for address, amount in pairs:
+            wallets[address].append(amount)
+        payouts.append((created_at, wallets))
+    return payouts
+
+
+def retarget_rows(old_hashes, new_hash):
+    """Aponta as linhas PROCESSING de qualquer envio anterior para o novo hash."""
+    return RewardTransaction.objects.filter(status='PROCESSING', tx_hash__in=old_hashes).update(tx_hash=new_hash)
+
+
+def bump(value):
+    # Nós exigem +10% em maxFee e tip para aceitar a substituição
+    return int(math.ceil(value * settings.REPLACEMENT_FEE_BUMP))
+
+
+def replacement_fees(attempt, current):
+    """
+    Taxas da substituição: o maior entre o envio anterior com o acréscimo
+    REPLACEMENT_FEE_BUMP e as taxas atuais do FeeOracle.
+    """
+    if attempt.gas_price is not None:
+        return {"gasPrice": max(bump(attempt.gas_price), current.get("gasPrice", 0))}
+    tip = max(bump(attempt.max_priority_fee_per_gas), current.get("maxPriorityFeePerGas", 0))
+    max_fee = max(bump(attempt.max_fee_per_gas), current.get("maxFeePerGas", 0), tip)
+    return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": tip}
+
+
+def settle_mined(service, broadcasts):
+    """
+    Marca como MINED as transações cujo nonce já foi consumido. Com
+    substituições, um lote de recibos diz qual envio foi minerado, e as
+    linhas de RewardTransaction passam a apontar para ele.
+    """
+    resolved = []
+    replaced = [b for b in broadcasts if len(b.attempts.all()) > 1]
+    for broadcast in broadcasts:
+        if len(broadcast.attempts.all()) == 1:
+            broadcast.status, broadcast.mined_hash = 'MINED', broadcast.attempts.all()[0].tx_hash
+            resolved.append(broadcast)
+
+    if replaced:
+        hashes = [attempt.tx_hash for b in replaced for attempt in b.attempts.all()]
+        receipts = dict(zip(hashes, service.batch_rpc(
+            [('eth_getTransactionReceipt', [normalize_hash(tx_hash)]) for tx_hash in hashes]
+        )))
+        for broadcast in replaced:
+            attempt_hashes = [attempt.tx_hash for attempt in broadcast.attempts.all()]
+            mined = next((tx_hash for tx_hash in attempt_hashes if receipts.get(tx_hash)), None)
+            if mined is None:
+                # Nonce consumido por uma transação que não é nossa
+                logger.error(f"❌ Nonce {broadcast.nonce} consumido sem nenhum dos envios {attempt_hashes}")
+                broadcast.status = 'DROPPED'
+            else:
+                broadcast.status, broadcast.mined_hash = 'MINED', mined
+                moved = retarget_rows(attempt_hashes, mined)
+                if moved:
+                    logger.info(f"⛏️ Nonce {broadcast.nonce} minerado pelo envio {mined} ({moved} linhas)")
+            resolved.append(broadcast)
+
+    BroadcastTransaction.objects.bulk_update(resolved, ['status', 'mined_hash'], batch_size=500)
+    return len(resolved)
+
+
+def replace_stuck(service, broadcasts):
+    """Re-envia com taxas maiores as transações pendentes há mais de STUCK_TX_TIMEOUT."""
+    cutoff = timezone.now() - timedelta(seconds=settings.STUCK_TX_TIMEOUT)
+    current = service.fees.fee_params()
+    replaced = 0
+    for broadcast in broadcasts:
+        attempts = list(broadcast.attempts.all())
+        last = max(attempts, key=lambda attempt: (attempt.sent_at, attempt.id))
+        if last.sent_at > cutoff:
+            continue
+
+        fees = replacement_fees(last, current)
+        price = fees.get("maxFeePerGas", fees.get("gasPrice"))
+        if settings.REPLACEMENT_MAX_FEE_PER_GAS and price > settings.REPLACEMENT_MAX_FEE_PER_GAS:
+            logger.warning(f"⚠️ Nonce {broadcast.nonce} preso, mas a nova taxa ({price}) passa do teto")
+            continue
+
+        try:
+            with transaction.atomic():
+                new_hash = service.replace_transaction(broadcast, fees)
+                retarget_rows([attempt.tx_hash for attempt in attempts], new_hash)
+        except Exception as e:
+            if any(marker in str(e).lower() for marker in NONCE_USED_MARKERS):
+                logger.info(f"Nonce {broadcast.nonce} já minerado; nada a substituir")
+            else:
+                logger.error(f"❌ Erro ao substituir a transação do nonce {broadcast.nonce}: {e}")
+            continue
+
+        replaced += 1
+        logger.warning(
+            f"🚀 Nonce {broadcast.nonce} re-enviado com taxas maiores ({fees}): {last.tx_hash} → {new_hash}"
+        )
+    return replaced
+
+
+def fill_nonce_gaps(service):
+    """
+    Ocupa com transferências de 0 ETH (BlockchainService.fill_nonce_gap) os
+    nonces entre a contagem 'pending' da chain e o contador que nunca foram
+    transmitidos, e que travam os envios seguintes. Um nonce é ocupado se
+    estiver na lista de livres do NonceManager (devolvido e ainda não
+    realocado) ou se há um envio com nonce maior há mais de
+    STUCK_TX_TIMEOUT segundos (quem alocou o nonce menor caiu antes de
+    transmitir). Retorna quantos foram ocupados.
+    """
+    counter = service.nonces.peek()
+    chain_pending = service.w3.eth.get_transaction_count(service.admin_address, 'pending')
+    if counter is None or counter <= chain_pending:
+        return 0
+
+    broadcasts = BroadcastTransaction.objects.filter(
+        sender=service.admin_address, nonce__gte=chain_pending, nonce__lt=counter
+    )
+    recorded = set(broadcasts.values_list('nonce', flat=True))
+    cutoff = timezone.now() - timedelta(seconds=settings.STUCK_TX_TIMEOUT)
+    stale_above = broadcasts.filter(created_at__lte=cutoff).aggregate(nonce=Max('nonce'))['nonce']
+
+    filled = 0
+    for nonce in range(chain_pending, counter):
+        if nonce in recorded:
+            continue
+        if not service.nonces.claim(nonce) and (stale_above is None or nonce > stale_above):
+            continue
+        try:
+            tx_hash = service.fill_nonce_gap(nonce)
+        except Exception as e:
+            logger.error(f"❌ Erro ao ocupar o nonce {nonce}: {e}")
+            continue
+        filled += 1
+        logger.warning(f"🕳️ Nonce {nonce} abandonado ocupado com transferência vazia: {tx_hash}")
+    return filled
+
+
+@shared_task(name="replace_stuck_transactions")
+def replace_stuck_transactions():
+    """
+    Watchdog dos envios da conta admin: transações cujo nonce já foi
+    consumido são marcadas como mineradas (apontando as RewardTransaction
+    para o envio que de fato entrou na chain), e as que estão pendentes há
+    mais de STUCK_TX_TIMEOUT segundos são re-assinadas com o mesmo nonce e
+    taxas maiores, para não travar os envios seguintes. Nonces alocados e
+    nunca transmitidos são ocupados (fill_nonce_gaps).
+    """
+    service = get_blockchain_service()
+    chain_nonce = service.w3.eth.get_transaction_count(service.admin_address, 'latest')
+    pending = BroadcastTransaction.objects.filter(
+        sender=service.admin_address, status='PENDING'
+    ).prefetch_related('attempts').order_by('nonce')
+
+    mined = settle_mined(service, [b for b in pending if b.nonce < chain_nonce])
+    replaced = replace_stuck(service, [b for b in pending if b.nonce >= chain_nonce])
+    filled = fill_nonce_gaps(service)
+    logger.info(f"Watchdog de transações: {mined} mineradas, {replaced} substituídas, {filled} gaps ocupados")
+    return {'mined': mined, 'replaced': replaced, 'filled': filled}
@@ -1,13 +1,123 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from decimal import Decimal
 import logging
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Sum
 from django.utils import timezone
-from blockchain.models import RewardTransaction, UserProfile
-from blockchain.services import BlockchainService
+from blockchain.balances import apply_balance_deltas, profile_ids_by_wallet
+from blockchain.calldata import BATCH_MINT_SELECTOR
+from blockchain.models import RewardTransaction
+from blockchain.services import MAX_BATCH_SIZE, get_blockchain_service
+from blockchain.tasks.replacements import recorded_payouts
 from web3 import Web3
 
 logger = logging.getLogger(__name__)
 
+
+def claim_reward_chunk(after_id, limit):
+    """
+    Reivindica (PENDING → PROCESSING) as próximas `limit` recompensas com
+    id > after_id, em ordem de id (paginação por keyset, sem OFFSET).
+    Retorna (último id do intervalo, queryset das linhas reivindicadas) ou
+    None quando não há mais recompensas pendentes.
+    """
+    pending = RewardTransaction.objects.filter(
+        status='PENDING',
+        tx_type='REWARD',
+        user__userprofile__wallet_address__isnull=False,
+        id__gt=after_id,
+    )
+    # Só o id de fronteira volta para o Python, nunca a lista de ids
+    last_id = pending.order_by('id').values('id')[:limit].aggregate(last_id=Max('id'))['last_id']
+    if last_id is None:
+        return None
+
+    claimed_at = timezone.now()
+    pending.filter(id__lte=last_id).update(status='PROCESSING', processed_at=claimed_at)
+    claimed = RewardTransaction.objects.filter(
+        id__gt=after_id,
+        id__lte=last_id,
+        status='PROCESSING',
+        processed_at=claimed_at,
+        tx_hash__isnull=True,
+    )
+    return last_id, claimed
+
+
+def release_rewards(claimed, raw_wallets=None):
+    """
+    Devolve para PENDING as recompensas reivindicadas e ainda sem tx_hash
+    (de `raw_wallets`, ou todas). Retorna quantas voltaram.
+    """
+    if raw_wallets is not None:
+        claimed = claimed.filter(user__userprofile__wallet_address__in=raw_wallets)
+    return claimed.update(status='PENDING', processed_at=None)
+
+
+def aggregate_rewards(claimed):
+    """
+    Soma as recompensas reivindicadas por carteira no banco (GROUP BY) e
+    devolve (carteira como está no perfil, endereço checksum, total em tokens).
+    Carteiras inválidas voltam para PENDING.
+    """
+    totals = (
+        claimed.values('user__userprofile__wallet_address')
+        .annotate(total=Sum('amount'))
+        .order_by('user__userprofile__wallet_address')
+    )
+
+    valid_rewards = []
+    invalid_wallets = []
+    for row in totals:
+        raw_wallet = row['user__userprofile__wallet_address']
+        wallet = raw_wallet.strip()
+        if not Web3.is_address(wallet):
+            logger.warning(f"[WARNING] Endereço inválido: {raw_wallet!r}. Pulando.")
+            invalid_wallets.append(raw_wallet)
+            continue
+        valid_rewards.append((raw_wallet, Web3.to_checksum_address(wallet), row['total']))
+
+    if invalid_wallets:
+        claimed.filter(user__userprofile__wallet_address__in=invalid_wallets).update(
+            status='PENDING', processed_at=None
+        )
+    return valid_rewards
+
+
+def settle_reward_chunk(claimed, chunk, tx_hash):
+    """
+    Grava o tx_hash nas recompensas do lote e move os totais para o saldo
+    on-chain, tudo em uma transação. O número de queries não depende do
+    tamanho do lote: um UPDATE nas recompensas, um SELECT carteira → perfil
+    e um UPDATE nos perfis.
+    """
+    raw_wallets = [raw_wallet for raw_wallet, _, _ in chunk]
+    with transaction.atomic():
+        claimed.filter(user__userprofile__wallet_address__in=raw_wallets).update(
+            tx_hash=tx_hash,
+            processed_at=timezone.now()
+        )
+
+        profile_ids = profile_ids_by_wallet(raw_wallets)
+        totals = defaultdict(Decimal)
+        for raw_wallet, checksum_addr, total in chunk:
+            profile_id = profile_ids.get(raw_wallet.lower())
+            if profile_id is None:
+                logger.warning(f"❌ Perfil não encontrado para {checksum_addr}")
+                continue
+            totals[profile_id] += total
+
+        apply_balance_deltas(
+            virtual_balance={profile_id: -total for profile_id, total in totals.items()},
+            blockchain_balance=totals,
+        )
+    logger.info(f"✅ Saldos atualizados para {len(totals)} carteiras")
+
+
 @shared_task(
     name="process_reward_batch",
     autoretry_for=(Exception,),
@@ -16,92 +126,137 @@ logger = logging.getLogger(__name__)
     bind=True
 )
 def process_reward_batch(self):
-    from django.conf import settings
+    """
+    Minta as recompensas PENDING. Cada lote é liquidado assim que o seu
+    batch_mint volta, sem esperar os outros lotes do pool. Lotes cujo
+    batch_mint falha (None ou exceção) voltam para PENDING; exceções
+    propagam depois disso, para o autoretry da tarefa. Linhas que ficarem
+    em PROCESSING sem tx_hash (o worker caiu no meio) são tratadas por
+    release_stale_reward_claims.
+    """
     logger.debug(f"WEB3_PROVIDER_URL: {getattr(settings, 'WEB3_PROVIDER_URL', None)}")
     logger.debug(f"PRIVATE_KEY: {getattr(settings, 'PRIVATE_KEY', None)}")
     logger.debug(f"CONTRACT_ADDRESS: {getattr(settings, 'CONTRACT_ADDRESS', None)}")
-    try:
-        service = BlockchainService()
-        logger.debug("[STEP] Instanciou BlockchainService")
-        if not service.contract:
-            logger.error("❌ Contrato não carregado. Não é possível mintar tokens.")
-            return None
-        pending_rewards = RewardTransaction.objects.filter(
-            status='PENDING',
-            tx_type='REWARD',
-            user__userprofile__wallet_address__isnull=False
-        ).select_related('user__userprofile')
-
-        if not pending_rewards.exists():
-            logger.info("Nenhuma recompensa pendente")
-            return None
-
-        logger.info(f"Processando {pending_rewards.count()} recompensas pendentes")
-
-        rewards_by_wallet = {}
-        tx_ids = []
-        for reward in pending_rewards:
-            raw_wallet = reward.user.userprofile.wallet_address
-            if raw_wallet is None:
-                logger.warning(f"[WARNING] reward.id={reward.id} → wallet_address None. Pulando.")
-                continue
+    service = get_blockchain_service()
+    logger.debug("[STEP] Instanciou BlockchainService")
+    if not service.contract:
+        logger.error("❌ Contrato não carregado. Não é possível mintar tokens.")
+        return None
 
-            wallet = raw_wallet.strip()
-            if wallet == "":
-                logger.warning(f"[WARNING] reward.id={reward.id} → wallet_address vazio após strip. Pulando.")
-                continue
+    def mint_chunk(chunk):
+        try:
+            return service.batch_mint(
+                [checksum_addr for _, checksum_addr, _ in chunk],
+                [total for _, _, total in chunk],
+                reward_mint=True,
+            )
+        finally:
+            # O envio é registrado no banco pela thread do pool; a conexão
+            # dela não é reaproveitada depois que o pool termina
+            connection.close()
 
-            if wallet not in rewards_by_wallet:
-                rewards_by_wallet[wallet] = Decimal(0)
-            rewards_by_wallet[wallet] += reward.amount
-            tx_ids.append(reward.id)
-
-        logger.debug(f"[STEP] rewards_by_wallet (raw): {rewards_by_wallet}")
-
-        if not rewards_by_wallet:
-            logger.info("Nenhum endereço válido depois de agrupar.")
-            return None
-        valid_wallets = []
-        valid_amounts = []
-        for wallet, total in rewards_by_wallet.items():
-            if not Web3.is_address(wallet):
-                logger.warning(f"[WARNING] Endereço inválido: {wallet!r}. Pulando.")
-                continue
+    # Processa o backlog em blocos de REWARD_CLAIM_CHUNK_SIZE linhas: a
+    # memória do worker depende do tamanho do bloco, não do backlog.
+    # Linhas devolvidas para PENDING ficam atrás do cursor e só voltam na
+    # próxima execução.
+    tx_hashes = []
+    after_id = 0
+    while True:
+        claim = claim_reward_chunk(after_id, settings.REWARD_CLAIM_CHUNK_SIZE)
+        if claim is None:
+            break
+        after_id, claimed = claim
 
-            checksum_addr = Web3.to_checksum_address(wallet)
-            valid_wallets.append(checksum_addr)
-            valid_amounts.append(int(total * 10**18))
+        try:
+            valid_rewards = aggregate_rewards(claimed)
+        except Exception:
+            release_rewards(claimed)
+            raise
+        if not valid_rewards:
+            continue
 
-        logger.debug(f"[STEP] valid_wallets = {valid_wallets}")
-        logger.debug(f"[STEP] valid_amounts = {valid_amounts}")
+        # batchMint reverte acima de MAX_BATCH_SIZE destinatários: um lote
+        # por transação, enviados em paralelo com nonces consecutivos
+        chunks = [
+            valid_rewards[i:i + MAX_BATCH_SIZE]
+            for i in range(0, len(valid_rewards), MAX_BATCH_SIZE)
+        ]
+        error = None
+        with ThreadPoolExecutor(max_workers=settings.REWARD_MINT_CONCURRENCY) as pool:
+            futures = {pool.submit(mint_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                raw_wallets = [raw_wallet for raw_wallet, _, _ in chunk]
+                try:
+                    tx_hash = future.result()
+                except Exception as e:
+                    logger.error(f"❌ batch_mint falhou para um lote de {len(chunk)} carteiras ({e}); "
+                                 "as recompensas voltam para PENDING.")
+                    release_rewards(claimed, raw_wallets)
+                    error = error or e
+                    continue
+                if not tx_hash:
+                    logger.error(
+                        f"❌ batch_mint retornou None para um lote de {len(chunk)} carteiras; "
+                        "as recompensas voltam para PENDING."
+                    )
+                    release_rewards(claimed, raw_wallets)
+                    continue
 
-        if not valid_wallets:
-            logger.info("Nenhuma carteira válida após validação final. Abortando.")
-            return None
-        tx_hash = service.batch_mint(valid_wallets, valid_amounts)
+                try:
+                    settle_reward_chunk(claimed, chunk, tx_hash)
+                except Exception as e:
+                    # O mint já foi enviado: devolver para PENDING mintaria de
+                    # novo; a varredura manda as linhas para revisão manual
+                    logger.error(f"❌ Mint {tx_hash} enviado, mas a liquidação falhou ({e})")
+                    error = error or e
+                    continue
+                logger.info(f"Transação de mint enviada: {tx_hash}")
+                tx_hashes.append(tx_hash)
 
-        if not tx_hash:
-            logger.error("❌ batch_mint retornou None. Verifique os logs de batch_mint.")
-            return None
-        RewardTransaction.objects.filter(id__in=tx_ids).update(
-            status='PROCESSING',
-            tx_hash=tx_hash,
-            processed_at=timezone.now()
-        )
+        if error is not None:
+            raise error
 
-        for checksum_addr, amt in zip(valid_wallets, valid_amounts):
-            profile = UserProfile.objects.filter(wallet_address=checksum_addr).first()
-            if profile:
-                profile.virtual_balance -= Decimal(str(amt))
-                profile.blockchain_balance += Decimal(str(amt))
-                profile.save()
-                logger.info(f"✅ Saldo atualizado para {checksum_addr}: {profile.blockchain_balance}")
-            else:
-                logger.warning(f"❌ Perfil não encontrado para {checksum_addr}")
+    if not tx_hashes:
+        logger.info("Nenhuma recompensa pendente")
+    return tx_hashes
 
-        logger.info(f"Transação de mint enviada: {tx_hash}")
-        return tx_hash
 
-    except Exception as e:
-        logger.error(f"❌ Erro ao processar recompensas: {e}")
-        return None
\ No newline at end of file
+@shared_task(name="release_stale_reward_claims")
+def release_stale_reward_claims():
+    """
+    Trata as recompensas em PROCESSING sem tx_hash há mais de
+    REWARD_CLAIM_TIMEOUT segundos (o worker que as reivindicou caiu, ou a
+    liquidação falhou). Se um batchMint registrado depois da reivindicação
+    inclui a carteira (ou tem calldata ilegível), o mint pode ter saído e a
+    linha vai para REVIEW, para conferência manual; as demais voltam para
+    PENDING. O timeout precisa ser bem maior que uma execução de
+    process_reward_batch. Retorna quantas voltaram para PENDING.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.REWARD_CLAIM_TIMEOUT)
+    stale = RewardTransaction.objects.filter(
+        tx_type='REWARD', status='PROCESSING', tx_hash__isnull=True, processed_at__lt=cutoff,
+    )
+    rows = list(stale.values_list('id', 'processed_at', 'user__userprofile__wallet_address'))
+    if not rows:
+        return 0
+
+    payouts = recorded_payouts([BATCH_MINT_SELECTOR], since=min(claimed_at for _, claimed_at, _ in rows))
+    review = [
+        reward_id
+        for reward_id, claimed_at, wallet in rows
+        if any(
+            created_at >= claimed_at and (wallets is None or (wallet or '').strip().lower() in wallets)
+            for created_at, wallets in payouts
+        )
+    ]
+    if review:
+        stale.filter(id__in=review).update(status='REVIEW')
+        logger.error(
+            f"❌ {len(review)} recompensas presas em PROCESSING podem ter sido mintadas; "
+            "marcadas como REVIEW para conferência manual"
+        )
+    released = stale.exclude(id__in=review).update(status='PENDING', processed_at=None)
+    if released:
+        logger.warning(f"⚠️ {released} recompensas presas em PROCESSING voltaram para PENDING")
+    return released
@@ -0,0 +1,229 @@
+# blockchain/tasks/withdrawals.py
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from blockchain.calldata import BATCH_TRANSFER_SELECTOR, TRANSFER_SELECTOR
+from blockchain.models import RewardTransaction, UserProfile
+from blockchain.services import MAX_BATCH_SIZE, get_blockchain_service
+from blockchain.tasks.replacements import recorded_payouts
+
+logger = logging.getLogger(__name__)
+
+WITHDRAWAL_BATCH_CACHE_KEY = "withdrawal-batch-scheduled"
+
+
+def schedule_withdrawal(transaction_id):
+    """
+    Enfileira o processamento de um saque recém-criado. Com
+    WITHDRAWAL_BATCH_WINDOW > 0 o beat já roda process_withdrawal_batch a cada
+    janela; aqui só se adianta um lote para o fim da janela atual, no máximo
+    um por janela graças à chave no cache 'withdrawals', compartilhado entre
+    processos (execuções extras não encontram nada para fazer).
+    """
+    window = settings.WITHDRAWAL_BATCH_WINDOW
+    if window <= 0:
+        process_withdrawal.delay(transaction_id)
+        return
+
+    if caches['withdrawals'].add(WITHDRAWAL_BATCH_CACHE_KEY, True, timeout=window):
+        process_withdrawal_batch.apply_async(countdown=window)
+
+
+def refund_withdrawal(withdrawal, unsent_only=False):
+    """
+    Marca o saque como FAILED e devolve o saldo reservado pela view. Com
+    unsent_only, só se ainda não houver tx_hash gravado.
+    """
+    pending = RewardTransaction.objects.filter(id=withdrawal.id, status__in=['PENDING', 'PROCESSING'])
+    if unsent_only:
+        pending = pending.filter(tx_hash__isnull=True)
+    with transaction.atomic():
+        updated = pending.update(status='FAILED', processed_at=timezone.now())
+        if updated:
+            UserProfile.objects.filter(user_id=withdrawal.user_id).update(
+                blockchain_balance=F('blockchain_balance') + withdrawal.amount
+            )
+    return bool(updated)
+
+
+def claim_pending_withdrawals(limit):
+    """
+    Passa até `limit` saques PENDING para PROCESSING e retorna os que este
+    worker reivindicou. O processed_at gravado serve de marca do claim, o que
+    funciona mesmo em bancos sem SELECT ... FOR UPDATE SKIP LOCKED (SQLite).
+    """
+    ids = list(
+        RewardTransaction.objects.filter(tx_type='WITHDRAWAL', status='PENDING')
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    claimed_at = timezone.now()
+    RewardTransaction.objects.filter(id__in=ids, status='PENDING').update(
+        status='PROCESSING', processed_at=claimed_at
+    )
+    return list(
+        RewardTransaction.objects.filter(
+            id__in=ids, status='PROCESSING', processed_at=claimed_at, tx_hash__isnull=True
+        ).order_by('id')
+    )
+
+
+def broadcast_withdrawal(service, withdrawal):
+    """Envia um saque já reivindicado; devolve o saldo se o envio falhar."""
+    try:
+        tx_hash = service.transfer(withdrawal.to_address, withdrawal.amount)
+    except Exception as e:
+        logger.error(f"❌ Erro ao enviar saque {withdrawal.id}: {e}")
+        tx_hash = None
+
+    if not tx_hash:
+        refund_withdrawal(withdrawal)
+        logger.error(f"❌ Saque {withdrawal.id} falhou; saldo devolvido")
+        return None
+
+    RewardTransaction.objects.filter(id=withdrawal.id).update(tx_hash=tx_hash)
+    logger.info(f"🔗 Saque {withdrawal.id} enviado: {tx_hash}")
+    return tx_hash
+
+
+def broadcast_withdrawal_batch(service, withdrawals):
+    """Envia os saques em um único batchTransfer, somando saques para o mesmo endereço."""
+    totals = defaultdict(Decimal)
+    for withdrawal in withdrawals:
+        totals[withdrawal.to_address] += withdrawal.amount
+
+    tx_hash = service.batch_transfer(list(totals.keys()), list(totals.values()))
+    if not tx_hash:
+        for withdrawal in withdrawals:
+            refund_withdrawal(withdrawal)
+        logger.error(f"❌ Lote de {len(withdrawals)} saques falhou; saldos devolvidos")
+        return None
+
+    RewardTransaction.objects.filter(id__in=[w.id for w in withdrawals]).update(tx_hash=tx_hash)
+    logger.info(f"🔗 Lote de {len(withdrawals)} saques ({len(totals)} carteiras) enviado: {tx_hash}")
+    return tx_hash
+
+
+@shared_task(name="process_withdrawal", queue='withdrawal_queue')
+def process_withdrawal(transaction_id):
+    """
+    Assina e transmite o saque reservado por withdraw_tokens.
+    O saldo já foi debitado na view; em caso de falha ele é devolvido.
+    """
+    # Reivindica a linha: só um worker passa de PENDING para PROCESSING
+    claimed = RewardTransaction.objects.filter(
+        id=transaction_id,
+        tx_type='WITHDRAWAL',
+        status='PENDING',
+    ).update(status='PROCESSING', processed_at=timezone.now())
+    if not claimed:
+        logger.info(f"Saque {transaction_id} já processado ou inexistente")
+        return None
+
+    withdrawal = RewardTransaction.objects.get(id=transaction_id)
+    try:
+        service = get_blockchain_service()
+    except Exception as e:
+        logger.error(f"❌ Erro ao conectar para o saque {transaction_id}: {e}")
+        refund_withdrawal(withdrawal)
+        return None
+    return broadcast_withdrawal(service, withdrawal)
+
+
+@shared_task(name="process_withdrawal_batch", queue='withdrawal_queue')
+def process_withdrawal_batch():
+    """
+    Drena os saques PENDING em lotes de até MAX_BATCH_SIZE, um batchTransfer
+    por lote. Enquanto o contrato deployado não tiver batchTransfer, cai para
+    transferências individuais enviadas em sequência (nonces locais).
+    """
+    service = get_blockchain_service()
+    if not service.contract:
+        logger.error("❌ Contrato não carregado. Não é possível processar saques.")
+        return []
+
+    if not service.supports_batch_transfer:
+        logger.warning("⚠️ ABI sem batchTransfer; enviando saques individualmente")
+
+    tx_hashes = []
+    while True:
+        withdrawals = claim_pending_withdrawals(MAX_BATCH_SIZE)
+        if not withdrawals:
+            break
+
+        if service.supports_batch_transfer:
+            tx_hash = broadcast_withdrawal_batch(service, withdrawals)
+            if tx_hash:
+                tx_hashes.append(tx_hash)
+        else:
+            for withdrawal in withdrawals:
+                tx_hash = broadcast_withdrawal(service, withdrawal)
+                if tx_hash:
+                    tx_hashes.append(tx_hash)
+
+    logger.info(f"Saques processados em {len(tx_hashes)} transações")
+    return tx_hashes
+
+
+def may_have_been_paid(withdrawal, payouts):
+    """
+    True se um transfer/batchTransfer registrado depois da reivindicação do
+    saque paga ao menos o valor dele ao mesmo endereço (num lote, os saques
+    para um endereço são somados), ou se o calldata de um deles é ilegível.
+    """
+    amount_wei = int(withdrawal.amount * 10 ** 18)
+    address = (withdrawal.to_address or '').lower()
+    return any(
+        created_at >= withdrawal.processed_at
+        and (wallets is None or any(paid >= amount_wei for paid in wallets.get(address, ())))
+        for created_at, wallets in payouts
+    )
+
+
+@shared_task(name="refund_stale_withdrawals")
+def refund_stale_withdrawals():
+    """
+    Trata os saques em PROCESSING sem tx_hash há mais de
+    WITHDRAWAL_CLAIM_TIMEOUT segundos (o worker caiu, ou a gravação falhou,
+    antes de registrar o tx_hash). Todo envio é registrado antes de ser
+    transmitido: se um transfer/batchTransfer registrado pode ter pago o
+    saque, ele vai para REVIEW, para conferência manual; senão o envio
+    nunca saiu, e o saque é marcado como FAILED e o saldo devolvido. O
+    timeout precisa ser bem maior que um envio. Retorna quantos foram
+    devolvidos.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.WITHDRAWAL_CLAIM_TIMEOUT)
+    stale = list(RewardTransaction.objects.filter(
+        tx_type='WITHDRAWAL', status='PROCESSING', tx_hash__isnull=True, processed_at__lt=cutoff,
+    ).only('id', 'user_id', 'amount', 'to_address', 'processed_at'))
+    if not stale:
+        return 0
+
+    payouts = recorded_payouts(
+        [TRANSFER_SELECTOR, BATCH_TRANSFER_SELECTOR], since=min(w.processed_at for w in stale)
+    )
+    review = [withdrawal.id for withdrawal in stale if may_have_been_paid(withdrawal, payouts)]
+    if review:
+        RewardTransaction.objects.filter(id__in=review, status='PROCESSING', tx_hash__isnull=True).update(
+            status='REVIEW'
+        )
+        logger.error(
+            f"❌ {len(review)} saques presos em PROCESSING podem ter sido pagos; "
+            "marcados como REVIEW para conferência manual"
+        )
+    refunded = sum(
+        refund_withdrawal(withdrawal, unsent_only=True) for withdrawal in stale if withdrawal.id not in review
+    )
+    if refunded:
+        logger.warning(f"⚠️ {refunded} saques presos em PROCESSING sem envio; saldos devolvidos")
+    return refunded
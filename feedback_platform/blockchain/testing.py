@@ -0,0 +1,236 @@
+# feedback_platform/blockchain/testing.py
+"""
+Utilitários para testes e benchmarks contra uma chain local (eth-tester).
+
+O eth-tester é opcional (pip install "web3[tester]"); use HAS_ETH_TESTER
+para pular testes quando ele não estiver instalado.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from web3 import EthereumTesterProvider, Web3
+from web3.datastructures import AttributeDict
+
+from blockchain.services import load_contract_artifact
+
+try:
+    import eth_tester  # noqa: F401
+    HAS_ETH_TESTER = True
+except ImportError:
+    HAS_ETH_TESTER = False
+
+# Chave da primeira conta pré-financiada do eth-tester
+TEST_PRIVATE_KEY = "0x" + "0" * 63 + "1"
+
+
+def _to_wire(value):
+    """Converte a resposta formatada do web3 de volta para o formato JSON-RPC."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, (dict, AttributeDict)):
+        return {k: _to_wire(v) for k, v in dict(value).items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(v) for v in value]
+    return value
+
+
+class RPCStubServer:
+    """
+    Nó JSON-RPC HTTP local sobre o eth-tester, com atraso opcional por
+    requisição para simular a latência de um provider remoto (Alchemy/Infura).
+    Aceita requisições em lote (JSON-RPC batch).
+
+        with RPCStubServer(delay=0.05) as stub:
+            w3 = Web3(Web3.HTTPProvider(stub.url))
+
+    Com ws=True também atende WebSocket em stub.ws_url, com
+    eth_subscribe("logs", {address, topics}) notificando os logs de cada
+    transação enviada (por HTTP ou WS). ws_accepting=False e
+    drop_ws_connections() simulam uma queda do provider.
+    """
+
+    def __init__(self, delay=0.0, host="127.0.0.1", port=0, ws=False):
+        self.delay = delay
+        self.w3 = Web3(EthereumTesterProvider())
+        self.request_count = 0
+        self.ws_accepting = True
+        self._lock = threading.Lock()
+        self._request_func = self.w3.provider.request_func(self.w3, self.w3.middleware_onion)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._host = host
+        self._ws = ws
+        self._ws_loop = None
+        self._ws_server = None
+        self._ws_connections = set()
+        self._subscriptions = {}
+        self._subscription_ids = itertools.count(1)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, payload):
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(payload, list):
+            return [self._handle_one(request) for request in payload]
+        return self._handle_one(payload)
+
+    def _handle_one(self, request):
+        # O eth-tester não é thread-safe
+        with self._lock:
+            self.request_count += 1
+            response = self._request_func(request["method"], request.get("params", []))
+            logs = []
+            if request["method"] == "eth_sendRawTransaction" and "result" in response:
+                # Automine: a transação já está num bloco
+                logs = self.w3.eth.get_transaction_receipt(response["result"]).logs
+        out = {"jsonrpc": "2.0", "id": request.get("id")}
+        if "error" in response:
+            out["error"] = response["error"]
+        else:
+            out["result"] = _to_wire(response["result"])
+        if logs:
+            self._notify_logs(logs)
+        return out
+
+    @property
+    def ws_url(self):
+        host, port = self._ws_server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    def _notify_logs(self, logs):
+        for subscription_id, (connection, criteria) in list(self._subscriptions.items()):
+            address = (criteria.get("address") or "").lower()
+            topics = criteria.get("topics") or []
+            for log in logs:
+                if address and log["address"].lower() != address:
+                    continue
+                if topics and topics[0] and _to_wire(log["topics"][0]) != topics[0].lower():
+                    continue
+                message = json.dumps({
+                    "jsonrpc": "2.0",
+                    "method": "eth_subscription",
+                    "params": {"subscription": subscription_id, "result": _to_wire(log)},
+                })
+                asyncio.run_coroutine_threadsafe(connection.send(message), self._ws_loop)
+
+    async def _handle_ws(self, connection):
+        if not self.ws_accepting:
+            await connection.close()
+            return
+        self._ws_connections.add(connection)
+        try:
+            async for raw in connection:
+                request = json.loads(raw)
+                method, params = request["method"], request.get("params", [])
+                if method == "eth_subscribe":
+                    subscription_id = hex(next(self._subscription_ids))
+                    self._subscriptions[subscription_id] = (connection, params[1] if len(params) > 1 else {})
+                    response = {"jsonrpc": "2.0", "id": request["id"], "result": subscription_id}
+                elif method == "eth_unsubscribe":
+                    removed = self._subscriptions.pop(params[0], None) is not None
+                    response = {"jsonrpc": "2.0", "id": request["id"], "result": removed}
+                else:
+                    response = await asyncio.to_thread(self.handle, request)
+                await connection.send(json.dumps(response))
+        except Exception:
+            pass
+        finally:
+            self._ws_connections.discard(connection)
+            for subscription_id, (subscribed, _) in list(self._subscriptions.items()):
+                if subscribed is connection:
+                    del self._subscriptions[subscription_id]
+
+    def drop_ws_connections(self):
+        """Fecha todas as conexões WebSocket abertas (as assinaturas se perdem)."""
+        for connection in list(self._ws_connections):
+            asyncio.run_coroutine_threadsafe(connection.close(), self._ws_loop).result()
+
+    def _start_ws(self):
+        from websockets.asyncio.server import serve
+
+        ready = threading.Event()
+
+        async def run():
+            self._ws_server = await serve(self._handle_ws, self._host, 0)
+            ready.set()
+            await self._ws_server.serve_forever()
+
+        def target():
+            self._ws_loop = asyncio.new_event_loop()
+            try:
+                self._ws_loop.run_until_complete(run())
+            except asyncio.CancelledError:
+                pass
+
+        threading.Thread(target=target, daemon=True).start()
+        ready.wait()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                payload = json.loads(self.rfile.read(length))
+                body = json.dumps(stub.handle(payload)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        if self._ws:
+            self._start_ws()
+        return self
+
+    def stop(self):
+        if self._ws_server is not None:
+            self._ws_loop.call_soon_threadsafe(self._ws_server.close)
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def deploy_feedback_token(w3, private_key=TEST_PRIVATE_KEY):
+    """Faz deploy do FeedbackToken a partir do artifact e retorna o endereço."""
+    account = w3.eth.account.from_key(private_key)
+    artifact = load_contract_artifact()
+    factory = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"])
+    tx = factory.constructor().build_transaction({
+        "from": account.address,
+        "chainId": w3.eth.chain_id,
+        "nonce": w3.eth.get_transaction_count(account.address),
+    })
+    signed = account.sign_transaction(tx)
+    tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
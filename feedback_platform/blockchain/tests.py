@@ -1,13 +1,55 @@
 # feedback_platform/blockchain/tests.py
 
-from django.test import TestCase, Client, override_settings
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from decimal import Decimal
+import asyncio
+import threading
+import time
+import unittest
 from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 
-from .models import Company, Feedback, UserProfile, RewardTransaction
+from .models import (
+    BroadcastTransaction,
+    ChainCursor,
+    Company,
+    Feedback,
+    LedgerOutbox,
+    ProcessedLog,
+    RewardTransaction,
+    TransactionAttempt,
+    UserProfile,
+)
+from . import accrual, services, views
+from .tasks.withdrawals import (
+    WITHDRAWAL_BATCH_CACHE_KEY,
+    process_withdrawal,
+    process_withdrawal_batch,
+    schedule_withdrawal,
+)
+from .tasks.rewards import process_reward_batch
+from .tasks.confirmations import track_confirmations
+from .tasks.replacements import replace_stuck_transactions
+from .tasks.ledger import flush_reward_ledger
+from .tasks.events import (
+    BATCH_MINTED,
+    ScanWindow,
+    credit_batch_minted,
+    get_event_cursor,
+    listen_for_batch_mint_events,
+    listen_with_subscription,
+    scan_events,
+)
+from .fees import FeeOracle
+from .ledger import RewardLedger, apply_entries
+from .nonces import LocalNonceStore, NonceManager, RedisNonceStore
+from .signing import SigningPool
+from .testing import HAS_ETH_TESTER, TEST_PRIVATE_KEY
 
 
 @override_settings(
@@ -15,6 +57,8 @@ from .models import Company, Feedback, UserProfile, RewardTransaction
     CELERY_TASK_EAGER_PROPAGATES=True,
 )
 class BlockchainViewTests(TestCase):
+    DESTINO = "0x2222222222222222222222222222222222222222"
+
     def setUp(self):
         self.client = Client()
 
@@ -90,45 +134,284 @@ class BlockchainViewTests(TestCase):
         self.assertIn("Saldo insuficiente", data["message"])
 
     @override_settings(MIN_WITHDRAWAL="1.0")
-    @mock.patch("blockchain.views.BlockchainService.transfer")
-    def test_withdraw_tokens_valido_chama_blockchainservice_transfer(self, mock_transfer):
+    @mock.patch("blockchain.views.schedule_withdrawal")
+    def test_withdraw_tokens_valido_reserva_saldo_e_enfileira(self, mock_schedule):
         """
         Cenário: usuário tem saldo suficiente E MIN_WITHDRAWAL = 1.0.
-        - Deve chamar BlockchainService.transfer e retornar o tx_hash
-        - Criar RewardTransaction(status="PROCESSING", tx_type="WITHDRAWAL")
-        - Diminuir blockchain_balance do perfil
+        - Responde 202 sem tocar na blockchain
+        - Cria RewardTransaction(status="PENDING", tx_type="WITHDRAWAL")
+        - Reserva (debita) o blockchain_balance e enfileira o saque
         """
         self.profile.blockchain_balance = Decimal("10.0")
         self.profile.save()
 
-        # Simula que transfer() retorna um tx_hash
-        mock_transfer.return_value = "0xFAKEWITHDRAWHASH"
-
         self.client.login(username="regular_user", password="senha123")
         url = reverse("withdraw-tokens")
-        response = self.client.post(
-            url, {"amount": "5.0", "wallet_address": "0xDESTINO"}
-        )
-        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"amount": "5.0", "wallet_address": self.DESTINO})
+        self.assertEqual(response.status_code, 202)
         data = response.json()
         self.assertEqual(data["status"], "success")
-        self.assertEqual(data["tx_hash"], "0xFAKEWITHDRAWHASH")
 
-        # RewardTransaction criada com status=PROCESSING
-        tx = RewardTransaction.objects.filter(
-            user=self.user,
-            tx_type="WITHDRAWAL",
-            status="PROCESSING"
-        ).first()
-        self.assertIsNotNone(tx)
+        tx = RewardTransaction.objects.get(id=data["transaction_id"])
+        self.assertEqual(tx.tx_type, "WITHDRAWAL")
+        self.assertEqual(tx.status, "PENDING")
         self.assertEqual(tx.amount, Decimal("5.0"))
-        self.assertEqual(tx.tx_hash, "0xFAKEWITHDRAWHASH")
+        self.assertEqual(tx.to_address, self.DESTINO)
+        self.assertEqual(data["status_url"], reverse("withdrawal-status", args=[tx.id]))
 
         # blockchain_balance deve ter sido reduzido de 10.0 para 5.0
         self.profile.refresh_from_db()
         self.assertEqual(self.profile.blockchain_balance, Decimal("5.0"))
 
-        mock_transfer.assert_called_once()
+        mock_schedule.assert_called_once_with(tx.id)
+
+    async def test_withdraw_tokens_via_asgi(self):
+        """A view é uma corrotina: via AsyncClient (ASGI) reserva o saldo sem bloquear o loop."""
+        self.assertTrue(asyncio.iscoroutinefunction(views.withdraw_tokens.__wrapped__))
+        await UserProfile.objects.filter(pk=self.profile.pk).aupdate(blockchain_balance=Decimal("10.0"))
+        await self.async_client.alogin(username="regular_user", password="senha123")
+
+        with override_settings(MIN_WITHDRAWAL="1.0"):
+            response = await self.async_client.post(
+                reverse("withdraw-tokens"), {"amount": "4.0", "wallet_address": self.DESTINO}
+            )
+
+        self.assertEqual(response.status_code, 202)
+        tx = await RewardTransaction.objects.aget(id=response.json()["transaction_id"])
+        self.assertEqual((tx.status, tx.amount), ("PENDING", Decimal("4.0")))
+        profile = await UserProfile.objects.aget(pk=self.profile.pk)
+        self.assertEqual(profile.blockchain_balance, Decimal("6.0"))
+
+    @override_settings(MIN_WITHDRAWAL="1.0")
+    def test_withdraw_tokens_endereco_invalido_retorna_400(self):
+        self.profile.blockchain_balance = Decimal("10.0")
+        self.profile.save()
+
+        self.client.login(username="regular_user", password="senha123")
+        response = self.client.post(reverse("withdraw-tokens"), {"amount": "5.0", "wallet_address": "0xDESTINO"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RewardTransaction.objects.filter(tx_type="WITHDRAWAL").exists())
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_transmite_e_atualiza_status(self, mock_get_service):
+        mock_get_service.return_value.transfer.return_value = "0xFAKEWITHDRAWHASH"
+        tx = RewardTransaction.objects.create(
+            user=self.user, amount=Decimal("5.0"), tx_type="WITHDRAWAL", to_address=self.DESTINO
+        )
+
+        self.assertEqual(process_withdrawal(tx.id), "0xFAKEWITHDRAWHASH")
+        # Uma segunda entrega da mesma mensagem não reenvia
+        self.assertIsNone(process_withdrawal(tx.id))
+
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, "PROCESSING")
+        self.assertEqual(tx.tx_hash, "0xFAKEWITHDRAWHASH")
+        mock_get_service.return_value.transfer.assert_called_once_with(self.DESTINO, Decimal("5.0"))
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_falha_devolve_saldo(self, mock_get_service):
+        mock_get_service.return_value.transfer.return_value = None
+        tx = RewardTransaction.objects.create(
+            user=self.user, amount=Decimal("5.0"), tx_type="WITHDRAWAL", to_address=self.DESTINO
+        )
+
+        self.assertIsNone(process_withdrawal(tx.id))
+
+        tx.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertEqual(tx.status, "FAILED")
+        self.assertEqual(self.profile.blockchain_balance, Decimal("5.0"))
+
+    @override_settings(WITHDRAWAL_CLAIM_TIMEOUT=600)
+    def test_saque_preso_sem_envio_e_devolvido(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .tasks.withdrawals import refund_stale_withdrawals
+
+        old = timezone.now() - timedelta(seconds=601)
+        stuck, recent, sent = [
+            RewardTransaction.objects.create(
+                user=self.user, amount=Decimal(amount), tx_type="WITHDRAWAL", status="PROCESSING",
+                to_address=self.DESTINO, tx_hash=tx_hash,
+            )
+            for amount, tx_hash in (("5", None), ("2", None), ("3", "ab" * 32))
+        ]
+        RewardTransaction.objects.filter(id__in=[stuck.id, sent.id]).update(processed_at=old)
+        RewardTransaction.objects.filter(id=recent.id).update(processed_at=timezone.now())
+
+        self.assertEqual(refund_stale_withdrawals(), 1)
+        self.assertEqual(refund_stale_withdrawals(), 0)
+
+        statuses = dict(RewardTransaction.objects.values_list("id", "status"))
+        self.assertEqual(
+            [statuses[stuck.id], statuses[recent.id], statuses[sent.id]], ["FAILED", "PROCESSING", "PROCESSING"]
+        )
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("5"))
+
+    @override_settings(WITHDRAWAL_CLAIM_TIMEOUT=600)
+    def test_saque_enviado_sem_tx_hash_gravado_vai_para_revisao(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .calldata import BATCH_TRANSFER_SELECTOR, TRANSFER_SELECTOR, encode_address_amount_batch
+        from .tasks.withdrawals import refund_stale_withdrawals
+
+        outro = "0x3333333333333333333333333333333333333333"
+        sozinho, no_lote, nunca_enviado = [
+            RewardTransaction.objects.create(
+                user=self.user, amount=Decimal(amount), tx_type="WITHDRAWAL", status="PROCESSING", to_address=address
+            )
+            for amount, address in (("5", self.DESTINO), ("2", outro), ("4", outro))
+        ]
+        RewardTransaction.objects.update(processed_at=timezone.now() - timedelta(seconds=601))
+
+        # transfer e batchTransfer registrados (e transmitidos); o worker caiu antes de gravar o tx_hash
+        word = lambda value: value.to_bytes(32, "big")
+        transfer = TRANSFER_SELECTOR + word(int(self.DESTINO, 16)) + word(5 * 10**18)
+        batch = encode_address_amount_batch(BATCH_TRANSFER_SELECTOR, [outro], [3 * 10**18])
+        for nonce, data in enumerate((transfer, batch)):
+            BroadcastTransaction.objects.create(
+                sender="0x" + "11" * 20, nonce=nonce, chain_id=1, to_address="0x" + "22" * 20,
+                gas=100000, data="0x" + data.hex(),
+            )
+
+        self.assertEqual(refund_stale_withdrawals(), 1)
+
+        statuses = dict(RewardTransaction.objects.values_list("id", "status"))
+        self.assertEqual(
+            [statuses[sozinho.id], statuses[no_lote.id], statuses[nunca_enviado.id]], ["REVIEW", "REVIEW", "FAILED"]
+        )
+        # Só o saque de 4 (nenhum envio paga 4 a esse endereço) foi devolvido
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("4"))
+
+    @override_settings(WITHDRAWAL_BATCH_WINDOW=0)
+    @mock.patch("blockchain.tasks.withdrawals.process_withdrawal.delay")
+    def test_schedule_withdrawal_sem_janela_envia_na_hora(self, mock_delay):
+        schedule_withdrawal(42)
+        mock_delay.assert_called_once_with(42)
+
+    @override_settings(
+        WITHDRAWAL_BATCH_WINDOW=10,
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "withdrawals": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "withdrawals"},
+        },
+    )
+    @mock.patch("blockchain.tasks.withdrawals.process_withdrawal_batch.apply_async")
+    def test_schedule_withdrawal_agenda_um_lote_por_janela(self, mock_apply_async):
+        from django.core.cache import caches
+
+        shared = caches["withdrawals"]
+        shared.delete(WITHDRAWAL_BATCH_CACHE_KEY)
+        self.addCleanup(shared.delete, WITHDRAWAL_BATCH_CACHE_KEY)
+
+        for transaction_id in range(5):
+            schedule_withdrawal(transaction_id)
+
+        mock_apply_async.assert_called_once_with(countdown=10)
+        # A marca fica só no alias compartilhado; o cache padrão não é tocado
+        self.assertIsNone(cache.get(WITHDRAWAL_BATCH_CACHE_KEY))
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_beat_drena_os_saques_a_cada_janela(self, mock_get_service):
+        """Sem o countdown de schedule_withdrawal, a tarefa do beat drena os saques PENDING."""
+        from feedback_platform.celery import app
+
+        service = mock_get_service.return_value
+        service.supports_batch_transfer = True
+        service.batch_transfer.return_value = "0xBEAT"
+        withdrawals = self.create_withdrawals(("5", self.DESTINO), ("2", self.DESTINO))
+
+        entry = settings.CELERY_BEAT_SCHEDULE["process-withdrawal-batch"]
+        self.assertEqual(entry["schedule"], settings.WITHDRAWAL_BATCH_WINDOW)
+        result = app.tasks[entry["task"]].apply()
+
+        self.assertEqual(result.get(), ["0xBEAT"])
+        for tx in withdrawals:
+            tx.refresh_from_db()
+            self.assertEqual((tx.status, tx.tx_hash), ("PROCESSING", "0xBEAT"))
+        self.assertFalse(RewardTransaction.objects.filter(tx_type="WITHDRAWAL", status="PENDING").exists())
+
+    def create_withdrawals(self, *amounts_and_addresses):
+        return [
+            RewardTransaction.objects.create(
+                user=self.user, amount=Decimal(amount), tx_type="WITHDRAWAL", to_address=address
+            )
+            for amount, address in amounts_and_addresses
+        ]
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_batch_agrupa_em_um_batch_transfer(self, mock_get_service):
+        service = mock_get_service.return_value
+        service.supports_batch_transfer = True
+        service.batch_transfer.return_value = "0xBATCH"
+        outro = "0x3333333333333333333333333333333333333333"
+        withdrawals = self.create_withdrawals(("5", self.DESTINO), ("2", outro), ("1.5", self.DESTINO))
+
+        self.assertEqual(process_withdrawal_batch(), ["0xBATCH"])
+
+        service.batch_transfer.assert_called_once_with(
+            [self.DESTINO, outro], [Decimal("6.5"), Decimal("2")]
+        )
+        service.transfer.assert_not_called()
+        for tx in withdrawals:
+            tx.refresh_from_db()
+            self.assertEqual((tx.status, tx.tx_hash), ("PROCESSING", "0xBATCH"))
+
+    @mock.patch("blockchain.tasks.withdrawals.MAX_BATCH_SIZE", 2)
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_batch_respeita_max_batch_size(self, mock_get_service):
+        service = mock_get_service.return_value
+        service.supports_batch_transfer = True
+        service.batch_transfer.side_effect = ["0xA", "0xB"]
+        self.create_withdrawals(*[("1", "0x%040x" % i) for i in range(1, 4)])
+
+        self.assertEqual(process_withdrawal_batch(), ["0xA", "0xB"])
+        self.assertEqual([len(c.args[0]) for c in service.batch_transfer.call_args_list], [2, 1])
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_batch_sem_batch_transfer_envia_individualmente(self, mock_get_service):
+        service = mock_get_service.return_value
+        service.supports_batch_transfer = False
+        service.transfer.side_effect = ["0xA", "0xB"]
+        self.create_withdrawals(("5", self.DESTINO), ("2", self.DESTINO))
+
+        self.assertEqual(process_withdrawal_batch(), ["0xA", "0xB"])
+        service.batch_transfer.assert_not_called()
+
+    @mock.patch("blockchain.tasks.withdrawals.get_blockchain_service")
+    def test_process_withdrawal_batch_falha_devolve_saldos(self, mock_get_service):
+        service = mock_get_service.return_value
+        service.supports_batch_transfer = True
+        service.batch_transfer.return_value = None
+        withdrawals = self.create_withdrawals(("5", self.DESTINO), ("2", self.DESTINO))
+
+        self.assertEqual(process_withdrawal_batch(), [])
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("7"))
+        self.assertEqual(
+            set(RewardTransaction.objects.filter(id__in=[w.id for w in withdrawals]).values_list("status", flat=True)),
+            {"FAILED"},
+        )
+
+    def test_withdrawal_status_so_para_o_dono(self):
+        tx = RewardTransaction.objects.create(
+            user=self.user, amount=Decimal("5.0"), tx_type="WITHDRAWAL",
+            status="PROCESSING", tx_hash="0xabc", to_address=self.DESTINO
+        )
+        url = reverse("withdrawal-status", args=[tx.id])
+
+        self.client.login(username="regular_user", password="senha123")
+        data = self.client.get(url).json()
+        self.assertEqual(data["withdrawal_status"], "PROCESSING")
+        self.assertEqual(data["tx_hash"], "0xabc")
+
+        self.client.login(username="staff_user", password="senha123")
+        self.assertEqual(self.client.get(url).status_code, 404)
 
     def test_approve_feedback_sem_permissao_retorna_302(self):
         """
@@ -191,3 +474,2056 @@ class BlockchainViewTests(TestCase):
             status="PENDING"
         ).first()
         self.assertIsNotNone(tx)
+
+
+class RewardAccrualTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="autor")
+        self.company = Company.objects.create(name="Empresa Teste")
+        UserProfile.objects.create(user=self.user, virtual_balance=Decimal("1.25"))
+
+    def test_feedback_saldo_e_recompensa_em_uma_transacao(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            feedback, balance = accrual.submit_feedback(self.user, self.company.id, "Ótimo")
+
+        # INSERT do feedback, contador da empresa, UPDATE ... RETURNING do saldo e INSERT da recompensa
+        statements = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 4, statements)
+        self.assertIn("RETURNING", statements[2])
+        self.assertEqual(balance, Decimal("1.25") + settings.REWARD_PER_FEEDBACK)
+        self.assertEqual(UserProfile.objects.get(user=self.user).virtual_balance, balance)
+        self.assertTrue(RewardTransaction.objects.filter(user=self.user, status="PENDING", tx_type="REWARD").exists())
+        self.assertFalse(feedback.is_approved)
+
+    def test_incrementos_relativos_ao_valor_no_banco(self):
+        """Um save() com o saldo antigo em memória perderia o incremento de outro envio."""
+        stale = UserProfile.objects.get(user=self.user)
+        accrual.credit_reward(self.user.id, Decimal("2"))
+        accrual.credit_reward(self.user.id, Decimal("3"))
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.virtual_balance, Decimal("6.25"))
+
+    def test_sem_returning_le_o_saldo_na_mesma_transacao(self):
+        with mock.patch("blockchain.returning.supports_update_returning", return_value=False):
+            balance = accrual.credit_reward(self.user.id, Decimal("0.75"))
+        self.assertEqual(balance, Decimal("2"))
+
+    def test_returning_em_update_so_em_postgresql_e_sqlite_recente(self):
+        from .returning import supports_update_returning
+
+        # MariaDB >= 10.5 tem RETURNING em INSERT, não em UPDATE
+        mariadb = mock.Mock(vendor="mysql")
+        mariadb.features.can_return_columns_from_insert = True
+        self.assertFalse(supports_update_returning(mariadb))
+        self.assertTrue(supports_update_returning(mock.Mock(vendor="postgresql")))
+        for version, expected in (((3, 34, 1), False), ((3, 35, 0), True)):
+            sqlite = mock.Mock(vendor="sqlite")
+            sqlite.Database.sqlite_version_info = version
+            self.assertEqual(supports_update_returning(sqlite), expected)
+
+    def test_cria_o_perfil_que_nao_existe(self):
+        other = User.objects.create_user(username="sem_perfil")
+
+        self.assertEqual(accrual.credit_reward(other.id, Decimal("0.5")), Decimal("0.5"))
+        self.assertEqual(UserProfile.objects.get(user=other).virtual_balance, Decimal("0.5"))
+
+    def test_aprovacao_dupla_nao_recompensa_duas_vezes(self):
+        feedback = Feedback.objects.create(user=self.user, company=self.company, comment="x")
+        stale = Feedback.objects.get(id=feedback.id)
+
+        self.assertIsNotNone(accrual.approve_feedback(feedback))
+        # Segunda aprovação com a cópia antiga (is_approved=False em memória)
+        self.assertIsNone(accrual.approve_feedback(stale))
+
+        self.assertEqual(RewardTransaction.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).virtual_balance, Decimal("1.25") + settings.REWARD_PER_FEEDBACK
+        )
+
+
+class FeedbackListingTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="autor", password="senha")
+        self.staff = User.objects.create_user(username="moderador", password="senha", is_staff=True)
+        self.company = Company.objects.create(name="Empresa Teste")
+        self.other_company = Company.objects.create(name="Outra")
+        for i in range(7):
+            accrual.submit_feedback(self.author, self.company.id, f"feedback {i}")
+        accrual.submit_feedback(self.author, self.other_company.id, "de outra empresa")
+        # Mesmo created_at em todos: a ordem e o cursor desempatam pelo id
+        Feedback.objects.update(created_at=timezone.now())
+        self.client = Client()
+
+    def pages(self, url, limit):
+        ids, cursor = [], None
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(url, params).json()
+            ids.append([item["id"] for item in data["results"]])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return ids, data
+
+    def test_paginas_por_cursor_sem_repetir_nem_pular(self):
+        self.client.login(username="moderador", password="senha")
+        ids, data = self.pages(reverse("company-feedback", args=[self.company.id]), limit=3)
+
+        expected = list(Feedback.objects.filter(company=self.company).order_by("-id").values_list("id", flat=True))
+        self.assertEqual([len(page) for page in ids], [3, 3, 1])
+        self.assertEqual(sum(ids, []), expected)
+        self.assertEqual(data["company"]["feedback_count"], 7)
+
+    def test_empresa_so_mostra_aprovados_para_quem_nao_e_staff(self):
+        approved = Feedback.objects.filter(company=self.company).order_by("id")[:2]
+        for feedback in approved:
+            accrual.approve_feedback(feedback)
+        accrual.mark_useful(approved[0])
+
+        self.client.login(username="autor", password="senha")
+        data = self.client.get(reverse("company-feedback", args=[self.company.id])).json()
+
+        self.assertEqual({item["id"] for item in data["results"]}, {feedback.id for feedback in approved})
+        self.assertEqual(
+            data["company"],
+            {"id": self.company.id, "name": "Empresa Teste", "feedback_count": 7, "approved_count": 2, "useful_count": 1},
+        )
+
+    def test_fila_de_moderacao_so_para_staff(self):
+        accrual.approve_feedback(Feedback.objects.filter(company=self.company).first())
+
+        self.client.login(username="autor", password="senha")
+        self.assertEqual(self.client.get(reverse("pending-feedback")).status_code, 302)
+
+        self.client.login(username="moderador", password="senha")
+        ids, _ = self.pages(reverse("pending-feedback"), limit=5)
+        self.assertEqual(sum(ids, []), list(
+            Feedback.objects.filter(is_approved=False).order_by("-id").values_list("id", flat=True)
+        ))
+
+    def test_meus_feedbacks_e_cursor_invalido(self):
+        self.client.login(username="autor", password="senha")
+        data = self.client.get(reverse("my-feedback"), {"limit": 100}).json()
+        self.assertEqual(len(data["results"]), 8)
+
+        response = self.client.get(reverse("my-feedback"), {"cursor": "nao-e-um-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_contadores_incrementais(self):
+        feedback = Feedback.objects.filter(company=self.company).first()
+
+        accrual.approve_feedback(feedback)
+        accrual.approve_feedback(Feedback.objects.get(id=feedback.id))
+        self.assertTrue(accrual.mark_useful(feedback))
+        self.assertFalse(accrual.mark_useful(feedback))
+        accrual.mark_useful(Feedback.objects.filter(company=self.company).last())
+        accrual.mark_useful(feedback, useful=False)
+
+        company = Company.objects.get(id=self.company.id)
+        self.assertEqual((company.feedback_count, company.approved_count, company.useful_count), (7, 1, 1))
+        self.assertEqual(Company.objects.get(id=self.other_company.id).feedback_count, 1)
+
+    def test_endpoint_marca_util_so_para_staff(self):
+        feedback = Feedback.objects.filter(company=self.company).first()
+        url = reverse("mark-feedback-useful", args=[feedback.id])
+
+        self.client.login(username="autor", password="senha")
+        self.assertEqual(self.client.post(url).status_code, 302)
+
+        self.client.login(username="moderador", password="senha")
+        mark = lambda: self.client.post(url, content_type="application/json").json()
+        self.assertEqual(mark(), {"status": "success", "changed": True, "is_useful": True})
+        self.assertFalse(mark()["changed"])
+        self.assertEqual(Company.objects.get(id=self.company.id).useful_count, 1)
+
+        response = self.client.post(url, {"useful": False}, content_type="application/json")
+        self.assertTrue(response.json()["changed"])
+        self.assertFalse(Feedback.objects.get(id=feedback.id).is_useful)
+        self.assertEqual(Company.objects.get(id=self.company.id).useful_count, 0)
+
+        response = self.client.post(url, {"useful": "sim"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_excluir_feedback_desconta_os_contadores(self):
+        approved, useful, plain = Feedback.objects.filter(company=self.company).order_by("id")[:3]
+        accrual.approve_feedback(approved)
+        accrual.approve_feedback(useful)
+        accrual.mark_useful(useful)
+
+        approved.delete()
+        Feedback.objects.filter(id__in=[useful.id, plain.id]).delete()
+
+        company = Company.objects.get(id=self.company.id)
+        self.assertEqual((company.feedback_count, company.approved_count, company.useful_count), (4, 0, 0))
+        self.assertEqual(company.feedback_count, Feedback.objects.filter(company=self.company).count())
+
+        # Cascata do autor
+        self.author.delete()
+        company.refresh_from_db()
+        self.assertEqual(company.feedback_count, 0)
+        self.assertEqual(Company.objects.get(id=self.other_company.id).feedback_count, 0)
+
+    def test_planos_usam_os_indices_sem_ordenar_em_memoria(self):
+        from .pagination import encode_cursor, keyset_queryset
+
+        cursor = encode_cursor(Feedback.objects.order_by("id")[3])
+        cases = {
+            "feedback_company_created_idx": Feedback.objects.filter(company_id=self.company.id),
+            "feedback_user_created_idx": Feedback.objects.filter(user_id=self.author.id),
+            "feedback_pending_idx": Feedback.objects.filter(is_approved=False),
+        }
+        for index, queryset in cases.items():
+            for page_cursor in (None, cursor):
+                plan = keyset_queryset(queryset, page_cursor)[:51].explain()
+                with self.subTest(index=index, cursor=page_cursor):
+                    self.assertIn(f"USING INDEX {index}", plan)
+                    self.assertNotIn("TEMP B-TREE", plan)
+                    if page_cursor:
+                        # Busca a partir do cursor no índice, não varredura filtrando linha a linha
+                        self.assertIn("SEARCH", plan)
+                        self.assertIn("created_at<?", plan)
+
+
+@override_settings(REWARD_PER_FEEDBACK=Decimal("0.5"))
+class BulkApproveTests(TestCase):
+    def setUp(self):
+        self.authors = [User.objects.create_user(username=f"autor_{i}") for i in range(3)]
+        UserProfile.objects.create(user=self.authors[0], virtual_balance=Decimal("1"))
+        self.staff = User.objects.create_user(username="moderador", password="senha", is_staff=True)
+        self.company = Company.objects.create(name="Empresa Teste")
+        self.other_company = Company.objects.create(name="Outra")
+        self.feedbacks = [
+            Feedback.objects.create(user=self.authors[i % 3], company=self.company, comment=f"feedback {i}")
+            for i in range(9)
+        ] + [Feedback.objects.create(user=self.authors[0], company=self.other_company, comment="de outra")]
+
+    def balances(self):
+        return {
+            author.id: UserProfile.objects.filter(user=author).values_list("virtual_balance", flat=True).first()
+            for author in self.authors
+        }
+
+    def test_lista_aprova_so_os_pendentes_sem_recompensa_dupla(self):
+        from .moderation import bulk_approve_feedback, select_pending
+
+        accrual.approve_feedback(self.feedbacks[0])
+        ids = [feedback.id for feedback in self.feedbacks[:6]]
+
+        self.assertEqual(bulk_approve_feedback(select_pending(ids=ids)), 5)
+        self.assertEqual(bulk_approve_feedback(select_pending(ids=ids)), 0)
+
+        self.assertEqual(Feedback.objects.filter(is_approved=True).count(), 6)
+        self.assertEqual(RewardTransaction.objects.filter(tx_type="REWARD", status="PENDING").count(), 6)
+        # autor_0: saldo inicial 1 + feedbacks 0 e 3; os outros só têm os feedbacks aprovados
+        self.assertEqual(
+            self.balances(),
+            {self.authors[0].id: Decimal("2"), self.authors[1].id: Decimal("1"), self.authors[2].id: Decimal("1")},
+        )
+        self.assertEqual(Company.objects.get(id=self.company.id).approved_count, 6)
+
+    def test_filtro_em_lotes(self):
+        from .moderation import bulk_approve_feedback, select_pending
+
+        self.assertEqual(bulk_approve_feedback(select_pending(company_id=self.company.id), chunk_size=4), 9)
+
+        self.assertFalse(Feedback.objects.filter(company=self.company, is_approved=False).exists())
+        self.assertFalse(Feedback.objects.get(company=self.other_company).is_approved)
+        self.assertEqual(Company.objects.get(id=self.other_company.id).approved_count, 0)
+        self.assertEqual(sum(self.balances().values()), Decimal("1") + Decimal("0.5") * 9)
+
+    def test_queries_nao_crescem_com_o_lote(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .moderation import approve_chunk
+
+        counts = []
+        for feedbacks in (self.feedbacks[:2], self.feedbacks[2:]):
+            with CaptureQueriesContext(connection) as ctx:
+                approve_chunk([feedback.id for feedback in feedbacks])
+            statements = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+            self.assertIn("RETURNING", statements[0])
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_sem_returning(self):
+        from .moderation import approve_chunk
+
+        accrual.approve_feedback(self.feedbacks[1])
+        with mock.patch("blockchain.returning.supports_update_returning", return_value=False):
+            rows = approve_chunk([feedback.id for feedback in self.feedbacks[:3]])
+
+        self.assertEqual({row[0] for row in rows}, {self.feedbacks[0].id, self.feedbacks[2].id})
+        self.assertEqual(RewardTransaction.objects.count(), 3)
+
+    def test_endpoint_so_para_staff_e_exige_selecao(self):
+        url = reverse("bulk-approve-feedback")
+        ids = [feedback.id for feedback in self.feedbacks[:3]]
+
+        self.client.force_login(self.authors[0])
+        self.assertEqual(self.client.post(url, {"ids": ids}, content_type="application/json").status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.post(url, {}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {"ids": "1,2"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            url, {"ids": ids, "user_id": self.authors[0].id}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["approved"], 1)
+        self.assertTrue(Feedback.objects.get(id=self.feedbacks[0].id).is_approved)
+
+    def test_comando(self):
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+
+        out = StringIO()
+        call_command("approve_feedback", "--company", str(self.company.id), "--dry-run", stdout=out)
+        self.assertIn("9 feedbacks", out.getvalue())
+        self.assertFalse(Feedback.objects.filter(is_approved=True).exists())
+
+        call_command("approve_feedback", "--ids", str(self.feedbacks[0].id), str(self.feedbacks[9].id), stdout=out)
+        self.assertEqual(Feedback.objects.filter(is_approved=True).count(), 2)
+
+        with self.assertRaises(CommandError):
+            call_command("approve_feedback", stdout=out)
+
+
+@override_settings(REWARD_LEDGER_BACKEND="redis", REWARD_PER_FEEDBACK=Decimal("0.5"), REWARD_LEDGER_BATCH_SIZE=100)
+class RewardLedgerTests(TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+            client = fakeredis.FakeRedis()
+            client.eval("return 1", 0)
+        except Exception:
+            self.skipTest("fakeredis com suporte a Lua não instalado")
+
+        self.ledger = RewardLedger(client, stream="rewards:test")
+        for target in ("blockchain.accrual.get_reward_ledger", "blockchain.tasks.ledger.get_reward_ledger"):
+            patcher = mock.patch(target, return_value=self.ledger)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.company = Company.objects.create(name="Empresa Teste")
+        self.users = [User.objects.create_user(username=f"autor_{i}") for i in range(2)]
+        UserProfile.objects.create(user=self.users[0], virtual_balance=Decimal("1"))
+
+    def submit(self, *users):
+        for user in users:
+            feedback, balance = accrual.submit_feedback(user, self.company.id, "Ótimo")
+            self.assertIsNone(balance)
+
+    def pending(self):
+        return self.ledger.client.xpending(self.ledger.stream, "reward-ledger")["pending"]
+
+    def test_eventos_somados_por_usuario_no_flush(self):
+        first, second = self.users
+        self.submit(first, second, first, first, second)
+        self.assertFalse(RewardTransaction.objects.exists())
+
+        self.assertEqual(flush_reward_ledger(), 5)
+
+        rewards = dict(RewardTransaction.objects.values_list("user_id", "amount"))
+        self.assertEqual(rewards, {first.id: Decimal("1.5"), second.id: Decimal("1")})
+        self.assertEqual(UserProfile.objects.get(user=first).virtual_balance, Decimal("2.5"))
+        # Perfil criado pelo flush
+        self.assertEqual(UserProfile.objects.get(user=second).virtual_balance, Decimal("1"))
+        self.assertEqual(Feedback.objects.count(), 5)
+        self.assertEqual(self.pending(), 0)
+
+    def test_lotes_de_batch_size_eventos(self):
+        self.submit(*[self.users[0]] * 5)
+
+        with override_settings(REWARD_LEDGER_BATCH_SIZE=2):
+            self.assertEqual(flush_reward_ledger(), 5)
+
+        self.assertEqual(
+            sorted(RewardTransaction.objects.values_list("amount", flat=True)), [Decimal("0.5"), 1, 1]
+        )
+        self.assertEqual(UserProfile.objects.get(user=self.users[0]).virtual_balance, Decimal("3.5"))
+
+    def test_queda_depois_do_commit_nao_credita_duas_vezes(self):
+        self.submit(self.users[0], self.users[0])
+        with mock.patch.object(RewardLedger, "ack", side_effect=ConnectionError("worker caiu")):
+            with self.assertRaises(ConnectionError):
+                flush_reward_ledger()
+        self.assertEqual(self.pending(), 2)
+
+        self.submit(self.users[0])
+        # Os 2 pendentes já estão no banco (LedgerCursor): só o novo é aplicado
+        self.assertEqual(flush_reward_ledger(), 1)
+        self.assertEqual(UserProfile.objects.get(user=self.users[0]).virtual_balance, Decimal("2.5"))
+        self.assertEqual(self.pending(), 0)
+
+    def test_queda_antes_do_commit_reaplica_os_pendentes(self):
+        self.submit(self.users[0], self.users[1])
+        with mock.patch("blockchain.ledger.apply_balance_deltas", side_effect=RuntimeError("worker caiu")):
+            with self.assertRaises(RuntimeError):
+                flush_reward_ledger()
+        self.assertFalse(RewardTransaction.objects.exists())
+
+        self.assertEqual(flush_reward_ledger(), 2)
+        self.assertEqual(RewardTransaction.objects.count(), 2)
+
+    def test_flush_em_andamento_nao_roda_em_paralelo(self):
+        self.submit(self.users[0])
+        lock = self.ledger.lock()
+        self.assertTrue(lock.acquire(blocking=False))
+        self.addCleanup(lock.release)
+
+        self.assertEqual(flush_reward_ledger(), 0)
+        self.assertEqual(self.ledger.client.xlen(self.ledger.stream), 1)
+        self.assertFalse(RewardTransaction.objects.exists())
+
+    def test_flush_mais_longo_que_o_lock_para_sem_confirmar(self):
+        self.submit(*[self.users[0]] * 4)
+        lock_name = self.ledger.lock().name
+        other = self.ledger.lock()
+        self.addCleanup(lambda: other.owned() and other.release())
+
+        def lento(stream, entries):
+            # O lote passa do REWARD_LEDGER_LOCK_TIMEOUT e outro flush pega o lock
+            self.ledger.client.delete(lock_name)
+            self.assertTrue(other.acquire(blocking=False))
+            return apply_entries(stream, entries)
+
+        with override_settings(REWARD_LEDGER_BATCH_SIZE=2), \
+                mock.patch("blockchain.tasks.ledger.apply_entries", side_effect=lento) as mock_apply:
+            self.assertEqual(flush_reward_ledger(), 2)
+
+        # Parou no primeiro lote, sem XACK e sem soltar o lock do outro flush
+        mock_apply.assert_called_once()
+        self.assertEqual(self.pending(), 2)
+        self.assertTrue(other.owned())
+        other.release()
+
+        # A próxima execução pula os 2 já aplicados (LedgerCursor) e aplica o resto
+        with override_settings(REWARD_LEDGER_BATCH_SIZE=2):
+            self.assertEqual(flush_reward_ledger(), 2)
+        self.assertEqual(UserProfile.objects.get(user=self.users[0]).virtual_balance, Decimal("3"))
+        self.assertEqual(self.pending(), 0)
+
+    def test_queda_entre_o_commit_e_o_xadd_nao_perde_a_recompensa(self):
+        with mock.patch.object(RewardLedger, "append", side_effect=KeyboardInterrupt("processo caiu")):
+            with self.assertRaises(KeyboardInterrupt):
+                accrual.submit_feedback(self.users[0], self.company.id, "Ótimo")
+        self.assertEqual(LedgerOutbox.objects.count(), 1)
+
+        # Dentro da janela de REWARD_LEDGER_OUTBOX_GRACE o XADD do submit ainda pode chegar
+        self.assertEqual(flush_reward_ledger(), 0)
+        with override_settings(REWARD_LEDGER_OUTBOX_GRACE=0):
+            self.assertEqual(flush_reward_ledger(), 1)
+            self.assertEqual(flush_reward_ledger(), 0)
+
+        self.assertFalse(LedgerOutbox.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.users[0]).virtual_balance, Decimal("1.5"))
+        self.assertEqual(RewardTransaction.objects.get().amount, Decimal("0.5"))
+
+    @override_settings(REWARD_LEDGER_OUTBOX_GRACE=0)
+    def test_evento_repetido_da_outbox_credita_uma_vez(self):
+        self.submit(self.users[0])
+
+        # queue_outbox repete o evento que ainda está no stream
+        self.assertEqual(flush_reward_ledger(), 1)
+
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(UserProfile.objects.get(user=self.users[0]).virtual_balance, Decimal("1.5"))
+        self.assertEqual(RewardTransaction.objects.count(), 1)
+
+    def test_redis_indisponivel_credita_direto_no_banco(self):
+        with mock.patch.object(RewardLedger, "append", side_effect=ConnectionError("Redis fora")):
+            feedback, balance = accrual.submit_feedback(self.users[0], self.company.id, "Ótimo")
+
+        self.assertEqual(balance, Decimal("1.5"))
+        self.assertEqual(RewardTransaction.objects.get().amount, Decimal("0.5"))
+        self.assertFalse(LedgerOutbox.objects.exists())
+
+
+@override_settings(PRIVATE_KEY=TEST_PRIVATE_KEY, CONTRACT_ADDRESS=None)
+class BlockchainServiceRegistryTests(TestCase):
+    def setUp(self):
+        services.reset_blockchain_services()
+        self.addCleanup(services.reset_blockchain_services)
+
+    @mock.patch("blockchain.services.BlockchainService")
+    def test_get_blockchain_service_reutiliza_instancia(self, mock_cls):
+        """O serviço é criado uma vez por processo, sem health-check no construtor."""
+        first = services.get_blockchain_service()
+        second = services.get_blockchain_service()
+
+        self.assertIs(first, second)
+        mock_cls.assert_called_once_with(use_ws=False, lazy=True)
+        self.assertEqual(first.ensure_connected.call_count, 2)
+
+    @mock.patch("blockchain.services.BlockchainService")
+    def test_get_blockchain_service_recria_apos_fork(self, mock_cls):
+        """Um processo filho (pid diferente) não herda o serviço do pai."""
+        mock_cls.side_effect = lambda **kwargs: mock.Mock()
+        parent = services.get_blockchain_service()
+        with mock.patch("blockchain.services.os.getpid", return_value=-1):
+            child = services.get_blockchain_service()
+
+        self.assertIsNot(parent, child)
+        self.assertEqual(mock_cls.call_count, 2)
+
+    def test_artifact_do_contrato_parseado_uma_vez(self):
+        services.load_contract_artifact.cache_clear()
+        self.addCleanup(services.load_contract_artifact.cache_clear)
+
+        with mock.patch("blockchain.services.json.load", wraps=services.json.load) as mock_load:
+            services.load_contract_artifact()
+            artifact = services.load_contract_artifact()
+
+        mock_load.assert_called_once()
+        self.assertIn("abi", artifact)
+        self.assertIn("bytecode", artifact)
+
+    def test_componentes_preguicosos_criados_uma_vez_entre_threads(self):
+        """Threads que enviam ao mesmo tempo compartilham o mesmo NonceManager."""
+        service = services.BlockchainService(lazy=True)
+        start = threading.Barrier(8)
+
+        def slow_manager(*args):
+            time.sleep(0.05)
+            return mock.Mock()
+
+        with mock.patch("blockchain.services.NonceManager", side_effect=slow_manager) as mock_cls:
+            def first_use():
+                start.wait()
+                return service.nonces
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                managers = list(pool.map(lambda _: first_use(), range(8)))
+
+        mock_cls.assert_called_once()
+        self.assertTrue(all(manager is managers[0] for manager in managers))
+
+    @unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+    @override_settings(WEB3_HEALTHCHECK_INTERVAL=60)
+    def test_health_check_respeita_intervalo(self):
+        from web3 import EthereumTesterProvider
+
+        service = services.BlockchainService(provider=EthereumTesterProvider(), lazy=True)
+        with mock.patch.object(service.w3, "is_connected", return_value=True) as mock_connected:
+            service.ensure_connected()
+            service.ensure_connected()
+            self.assertEqual(mock_connected.call_count, 1)
+
+            service.ensure_connected(force=True)
+            self.assertEqual(mock_connected.call_count, 2)
+
+            mock_connected.return_value = False
+            with self.assertRaises(ConnectionError):
+                service.ensure_connected(force=True)
+
+
+class NonceManagerTests(TestCase):
+    ADDRESS = "0x" + "11" * 20
+
+    def make_manager(self, store=None, chain_nonce=7):
+        w3 = mock.Mock()
+        w3.eth.get_transaction_count.return_value = chain_nonce
+        return NonceManager(w3, self.ADDRESS, store=store or LocalNonceStore(), chain_id=1)
+
+    def test_allocate_consulta_chain_so_na_primeira_vez(self):
+        manager = self.make_manager()
+
+        self.assertEqual([manager.allocate() for _ in range(3)], [7, 8, 9])
+        manager.w3.eth.get_transaction_count.assert_called_once_with(self.ADDRESS, "pending")
+
+    def test_sync_so_avanca_sem_force(self):
+        manager = self.make_manager()
+        manager.allocate()
+        manager.allocate()  # contador local em 9
+
+        manager.w3.eth.get_transaction_count.return_value = 5
+        self.assertEqual(manager.sync(), 9)
+        self.assertEqual(manager.allocate(), 9)
+
+        manager.w3.eth.get_transaction_count.return_value = 12
+        manager.sync()
+        self.assertEqual(manager.allocate(), 12)
+
+    def test_release_devolve_ultimo_nonce(self):
+        manager = self.make_manager()
+        nonce = manager.allocate()
+
+        manager.release(nonce)
+
+        self.assertEqual(manager.allocate(), nonce)
+        manager.w3.eth.get_transaction_count.assert_called_once()
+
+    def test_release_com_gap_reusa_o_nonce_sem_voltar_o_contador(self):
+        manager = self.make_manager()
+        first = manager.allocate()
+        manager.allocate()
+
+        manager.release(first)  # 8 já foi entregue: o 7 vira um buraco
+
+        self.assertEqual(manager.allocate(), 7)
+        self.assertEqual(manager.allocate(), 9)
+        # Sem ressincronizar com a chain, que ainda não viu o 8
+        manager.w3.eth.get_transaction_count.assert_called_once()
+
+    def test_sync_descarta_livres_ja_usados_na_chain(self):
+        manager = self.make_manager()
+        nonces = [manager.allocate() for _ in range(3)]  # 7, 8, 9
+        manager.release(nonces[0])
+        manager.release(nonces[1])
+
+        manager.w3.eth.get_transaction_count.return_value = 8  # o 7 foi usado por outro envio
+        self.assertEqual(manager.sync(), 10)
+        self.assertEqual(manager.allocate(), 8)
+        self.assertEqual(manager.allocate(), 10)
+
+    def test_redis_store_compartilha_contador_entre_processos(self):
+        try:
+            import fakeredis
+            client = fakeredis.FakeRedis()
+            client.eval("return 1", 0)
+        except Exception:
+            self.skipTest("fakeredis com suporte a Lua não instalado")
+
+        first = self.make_manager(store=RedisNonceStore(client))
+        second = self.make_manager(store=RedisNonceStore(client))
+
+        nonces = [first.allocate(), second.allocate(), first.allocate(), second.allocate()]
+
+        self.assertEqual(nonces, [7, 8, 9, 10])
+        second.release(10)
+        self.assertEqual(first.allocate(), 10)
+
+        # Gap devolvido por um processo é alocado pelo outro; o contador não volta
+        first.release(8)
+        self.assertEqual(second.allocate(), 8)
+        self.assertEqual(first.allocate(), 11)
+        second.release(9)
+        self.assertTrue(first.claim(9))
+        self.assertFalse(second.claim(9))
+        self.assertEqual(first.peek(), 12)
+
+
+@override_settings(
+    FEE_CACHE_TTL=60,
+    FEE_HISTORY_BLOCKS=4,
+    FEE_PRIORITY_PERCENTILE=50,
+    FEE_MIN_PRIORITY_FEE=10,
+    FEE_BASE_FEE_MULTIPLIER=2,
+)
+class FeeOracleTests(TestCase):
+    def make_oracle(self, base_fees, rewards):
+        w3 = mock.Mock()
+        w3.eth.fee_history.return_value = {"baseFeePerGas": base_fees, "reward": rewards}
+        return FeeOracle(w3)
+
+    def test_gorjeta_pela_mediana_e_folga_no_base_fee(self):
+        # Último base fee = próximo bloco; blocos vazios (gorjeta 0) ficam fora da mediana
+        oracle = self.make_oracle([100, 110, 120, 130, 140], [[0], [30], [50], [40]])
+
+        self.assertEqual(
+            oracle.fee_params(),
+            {"type": 2, "maxPriorityFeePerGas": 40, "maxFeePerGas": 2 * 140 + 40},
+        )
+        oracle.w3.eth.fee_history.assert_called_once_with(4, "latest", [50])
+
+    def test_gorjeta_minima_sem_historico_de_gorjetas(self):
+        oracle = self.make_oracle([100, 100], [[0]])
+        self.assertEqual(oracle.fee_params()["maxPriorityFeePerGas"], 10)
+
+    def test_cache_por_ttl_e_invalidate(self):
+        oracle = self.make_oracle([100, 100], [[20]])
+
+        for _ in range(5):
+            oracle.fee_params()
+        self.assertEqual(oracle.w3.eth.fee_history.call_count, 1)
+
+        oracle.invalidate()
+        oracle.fee_params()
+        self.assertEqual(oracle.w3.eth.fee_history.call_count, 2)
+
+        with override_settings(FEE_CACHE_TTL=0):
+            oracle.fee_params()
+        self.assertEqual(oracle.w3.eth.fee_history.call_count, 3)
+
+    def test_fallback_para_bloco_e_legacy(self):
+        oracle = self.make_oracle([], [])
+        oracle.w3.eth.get_block.return_value = {"baseFeePerGas": 50}
+        self.assertEqual(oracle.fee_params()["maxFeePerGas"], 2 * 50 + 10)
+
+        oracle = self.make_oracle([], [])
+        oracle.w3.eth.get_block.return_value = {}
+        oracle.w3.eth.gas_price = 77
+        self.assertEqual(oracle.fee_params(), {"gasPrice": 77})
+
+
+@override_settings(GAS_LIMIT_MARGIN=1.5, GAS_ESTIMATE_TTL=60)
+class GasEstimatorTests(TestCase):
+    def make_function(self, name="batchMint", gas=1000):
+        function = mock.Mock(fn_name=name)
+        function.estimate_gas.return_value = gas
+        return function
+
+    def test_faixas_de_tamanho(self):
+        from .gas import gas_bucket
+
+        self.assertEqual(
+            [gas_bucket(n, 100) for n in (1, 2, 3, 5, 16, 17, 33, 99, 100)],
+            [1, 2, 4, 8, 16, 32, 48, 100, 100],
+        )
+
+    def test_sondagem_do_pior_caso_em_cache_com_ttl(self):
+        from .gas import GasEstimator
+
+        estimator = GasEstimator("0x" + "11" * 20)
+        probes = []
+
+        def probe(size):
+            probes.append(size)
+            return self.make_function(gas=1000 * size)
+
+        self.assertEqual(estimator.limit_for(self.make_function(), probe, size=3, max_size=100), 6000)
+        self.assertEqual(estimator.limit_for(self.make_function(), probe, size=4, max_size=100), 6000)
+        self.assertEqual(probes, [4])
+
+        with override_settings(GAS_ESTIMATE_TTL=0):
+            estimator.limit_for(self.make_function(), probe, size=4, max_size=100)
+        self.assertEqual(probes, [4, 4])
+
+    def test_sondagem_revertida_estima_a_propria_chamada(self):
+        from .gas import GasEstimator
+
+        estimator = GasEstimator("0x" + "11" * 20)
+        function = self.make_function(name="batchTransfer", gas=2000)
+        failing = self.make_function(name="batchTransfer")
+        failing.estimate_gas.side_effect = ValueError("execution reverted")
+
+        self.assertEqual(estimator.limit_for(function, lambda size: failing, size=2, max_size=100), 3000)
+        function.estimate_gas.assert_called_once()
+
+
+class CalldataEncoderTests(TestCase):
+    """O calldata montado à mão precisa ser idêntico ao do encoder do web3."""
+
+    def setUp(self):
+        abi = services.load_contract_artifact()["abi"]
+        batch_mint = next(item for item in abi if item.get("name") == "batchMint")
+        # O artifact pode ser anterior ao batchTransfer; a assinatura é a mesma do batchMint
+        self.contract = services.Web3().eth.contract(
+            address=services.Web3.to_checksum_address("0x" + "ff" * 20),
+            abi=[*abi, {**batch_mint, "name": "batchTransfer"}],
+        )
+        self.wallets = [services.Web3.to_checksum_address("0x%040x" % (i * 7919 + 1)) for i in range(100)]
+
+    def web3_data(self, fn_name, recipients, amounts):
+        function = getattr(self.contract.functions, fn_name)(recipients, amounts)
+        return function.build_transaction({"chainId": 1, "gas": 1, "nonce": 0, "gasPrice": 1})["data"]
+
+    def test_batch_mint_e_batch_transfer_byte_a_byte(self):
+        from .calldata import batch_mint_call, batch_transfer_call
+
+        for size in (0, 1, 2, 17, 100):
+            recipients = self.wallets[:size]
+            amounts = [(i * 10 ** 18 + 3) * (i + 1) for i in range(size)]
+            if size:
+                amounts[-1] = 2 ** 256 - 1
+            with self.subTest(size=size):
+                self.assertEqual(
+                    batch_mint_call(self.contract, recipients, amounts).data,
+                    self.web3_data("batchMint", recipients, amounts),
+                )
+                self.assertEqual(
+                    batch_transfer_call(self.contract, recipients, amounts).data,
+                    self.web3_data("batchTransfer", recipients, amounts),
+                )
+
+    def test_transacao_igual_a_do_build_transaction(self):
+        from .calldata import batch_mint_call
+
+        params = {"chainId": 1, "gas": 90000, "nonce": 3, "maxFeePerGas": 2, "maxPriorityFeePerGas": 1, "type": 2}
+        expected = self.contract.functions.batchMint(self.wallets[:3], [1, 2, 3]).build_transaction(params)
+
+        self.assertEqual(batch_mint_call(self.contract, self.wallets[:3], [1, 2, 3]).build_transaction(params), expected)
+
+    def test_argumentos_invalidos(self):
+        from .calldata import BATCH_MINT_SELECTOR, encode_address_amount_batch
+
+        with self.assertRaises(ValueError):
+            encode_address_amount_batch(BATCH_MINT_SELECTOR, ["0x" + "11" * 19], [1])
+        with self.assertRaises(ValueError):
+            encode_address_amount_batch(BATCH_MINT_SELECTOR, self.wallets[:2], [1])
+        with self.assertRaises(OverflowError):
+            encode_address_amount_batch(BATCH_MINT_SELECTOR, self.wallets[:1], [-1])
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class BlockchainServiceSendTests(TestCase):
+    def setUp(self):
+        from web3 import EthereumTesterProvider
+        from .testing import deploy_feedback_token
+
+        self.provider = EthereumTesterProvider()
+        w3 = services.Web3(self.provider)
+        contract_address = deploy_feedback_token(w3)
+        overrides = override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=contract_address,
+            CHAIN_ID=w3.eth.chain_id,
+            NONCE_BACKEND="local",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService(provider=self.provider)
+
+    def test_envios_em_sequencia_sem_consultar_nonce_na_chain(self):
+        """Vários envios seguidos usam nonces consecutivos sem get_transaction_count por envio."""
+        recipient = "0x" + "22" * 20
+
+        with mock.patch.object(
+            self.service.w3.eth, "get_transaction_count", wraps=self.service.w3.eth.get_transaction_count
+        ) as mock_count, mock.patch.object(
+            self.service.w3.eth, "fee_history", wraps=self.service.w3.eth.fee_history
+        ) as mock_fee_history:
+            hashes = [self.service.batch_mint([recipient], [1]) for _ in range(5)]
+
+        self.assertTrue(all(hashes))
+        self.assertEqual(mock_count.call_count, 1)
+        # Taxas do FeeOracle em cache: um eth_feeHistory para os 5 envios
+        self.assertEqual(mock_fee_history.call_count, 1)
+
+        receipts = [self.service.w3.eth.wait_for_transaction_receipt(h) for h in hashes]
+        self.assertTrue(all(r.status == 1 for r in receipts))
+        self.assertEqual(self.service.check_balance(recipient), 5)
+
+    def test_limite_de_gas_em_cache_por_faixa_de_lote(self):
+        wallets = [services.Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(5)]
+
+        with mock.patch.object(self.service.gas, "_estimate", wraps=self.service.gas._estimate) as mock_estimate:
+            hashes = [
+                self.service.batch_mint(wallets[:3], [1] * 3),
+                self.service.batch_mint(wallets[:4], [1] * 4),  # mesma faixa (até 4)
+                self.service.batch_mint(wallets[:5], [1] * 5),  # faixa até 8
+            ]
+
+        self.assertEqual(mock_estimate.call_count, 2)
+        for tx_hash in hashes:
+            receipt = self.service.w3.eth.get_transaction_receipt(tx_hash)
+            tx = self.service.w3.eth.get_transaction(tx_hash)
+            self.assertEqual(receipt.status, 1)
+            self.assertLess(receipt.gasUsed, tx.gas)
+
+    def test_erro_de_nonce_ressincroniza_e_reenvia(self):
+        recipient = "0x" + "22" * 20
+        self.service.batch_mint([recipient], [1])
+        # Contador atrasado em relação à chain (ex.: nonce usado fora do NonceManager)
+        self.service.nonces.store._values[self.service.nonces.key] = 0
+
+        tx_hash = self.service.batch_mint([recipient], [1])
+
+        self.assertIsNotNone(tx_hash)
+        self.assertEqual(self.service.check_balance(recipient), 2)
+
+    def test_already_known_conta_como_envio_sem_novo_nonce(self):
+        recipient = "0x" + "22" * 20
+        send = self.service.w3.eth.send_raw_transaction
+
+        def already_known(raw_tx):
+            send(raw_tx)
+            raise ValueError("already known")
+
+        with mock.patch.object(self.service.w3.eth, "send_raw_transaction", side_effect=already_known) as mock_send:
+            tx_hash = self.service.batch_mint([recipient], [1])
+
+        self.assertEqual(mock_send.call_count, 1)
+        self.assertEqual(TransactionAttempt.objects.get().tx_hash, tx_hash)
+        self.assertEqual(self.service.w3.eth.get_transaction_receipt(tx_hash).status, 1)
+        # Nonce 0 foi do deploy; o 1 não é re-assinado com outro nonce
+        self.assertEqual(self.service.nonces.peek(), 2)
+        self.assertEqual(self.service.check_balance(recipient), 1)
+
+    def test_replacement_underpriced_nao_reenvia_com_outro_nonce(self):
+        recipient = "0x" + "22" * 20
+        with mock.patch.object(
+            self.service.w3.eth, "send_raw_transaction", side_effect=ValueError("replacement transaction underpriced")
+        ) as mock_send, mock.patch.object(self.service.fees, "invalidate") as mock_invalidate:
+            tx_hash = self.service.batch_mint([recipient], [1])
+
+        self.assertIsNone(tx_hash)
+        self.assertEqual(mock_send.call_count, 1)
+        mock_invalidate.assert_called_once()
+        self.assertFalse(BroadcastTransaction.objects.exists())
+        # O nonce segue ocupado pela pendente: não volta para o contador
+        self.assertEqual(self.service.nonces.peek(), 2)
+        self.assertEqual(self.service.nonces.allocate(), 2)
+
+    def test_pool_de_assinatura_produz_a_mesma_transacao_que_inline(self):
+        wallets = [services.Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(3)]
+        tx_function = self.service.contract.functions.batchMint(wallets, [10 ** 18] * 3)
+        params = {"chainId": settings.CHAIN_ID, "gas": 500000, "nonce": 7, **self.service.fees.fee_params()}
+
+        inline_tx, inline_raw = self.service._sign(tx_function, params)
+        pool = SigningPool(TEST_PRIVATE_KEY, 1)
+        self.addCleanup(pool.shutdown)
+        pool_tx, pool_raw = pool.sign({"to": tx_function.address, "value": 0, **params}, tx_function.abi, tx_function.args)
+
+        # Assinatura determinística (RFC 6979): os bytes precisam ser idênticos
+        self.assertEqual(pool_raw, bytes(inline_raw))
+        self.assertEqual(pool_tx["data"], inline_tx["data"])
+
+    def test_envio_com_pool_de_assinatura(self):
+        recipient = "0x" + "22" * 20
+        with override_settings(SIGNING_WORKERS=2):
+            self.addCleanup(lambda: self.service.signer and self.service.signer.shutdown())
+            hashes = [self.service.batch_mint([recipient], [1]) for _ in range(3)]
+
+        self.assertIsNotNone(self.service.signer)
+        self.assertTrue(all(self.service.w3.eth.get_transaction_receipt(h).status == 1 for h in hashes))
+        self.assertEqual(self.service.check_balance(recipient), 3)
+        self.assertEqual(BroadcastTransaction.objects.count(), 3)
+
+    def test_pool_indisponivel_assina_inline(self):
+        recipient = "0x" + "22" * 20
+        with override_settings(SIGNING_WORKERS=2), mock.patch(
+            "blockchain.signing.SigningPool.sign",
+            side_effect=AssertionError("daemonic processes are not allowed to have children"),
+        ):
+            self.addCleanup(lambda: self.service._signer and self.service._signer.shutdown())
+            tx_hash = self.service.batch_mint([recipient], [1])
+
+        self.assertIsNotNone(tx_hash)
+        self.assertIsNone(self.service.signer)
+        self.assertEqual(self.service.check_balance(recipient), 1)
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class BalancesOfTests(TestCase):
+    """Leitura de saldos em massa contra um nó HTTP local (eth-tester)."""
+
+    def setUp(self):
+        from .testing import RPCStubServer, deploy_feedback_token
+
+        self.stub = RPCStubServer().start()
+        self.addCleanup(self.stub.stop)
+        overrides = override_settings(
+            WEB3_HTTP_PROVIDER_URL=self.stub.url,
+            CONTRACT_ADDRESS=deploy_feedback_token(self.stub.w3),
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CHAIN_ID=self.stub.w3.eth.chain_id,
+            NONCE_BACKEND="local",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService()
+        self.wallets = [services.Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(7)]
+        self.amounts = [Decimal(i) + Decimal("0.000000000000000001") for i in range(7)]
+        self.service.batch_mint(self.wallets, self.amounts)
+
+    def test_lotes_em_paralelo_mantem_ordem_e_precisao(self):
+        with mock.patch.object(self.service, "batch_rpc", wraps=self.service.batch_rpc) as batch_rpc:
+            result = list(self.service.iter_balances(self.wallets, chunk_size=3, concurrency=2))
+
+        self.assertEqual(batch_rpc.call_count, 3)
+        self.assertEqual(result, list(zip(self.wallets, self.amounts)))
+        self.assertEqual(self.service.balances_of(self.wallets[:1]), {self.wallets[0]: self.amounts[0]})
+
+    def test_multicall_empacota_o_lote_em_um_eth_call(self):
+        from eth_abi import decode, encode
+
+        multicall = "0xcA11bde05977b3631167028862bE2a173976CA11"
+        raw = [int(amount * 10 ** 18) for amount in self.amounts[:3]]
+
+        def fake_call(tx, block):
+            self.assertEqual(tx["to"], multicall)
+            self.assertEqual(tx["data"][:4], services.AGGREGATE3_SELECTOR)
+            (calls,) = decode(["(address,bool,bytes)[]"], tx["data"][4:])
+            self.assertEqual(len(calls), 3)
+            self.assertEqual({target for target, _, _ in calls}, {settings.CONTRACT_ADDRESS.lower()})
+            return encode(["(bool,bytes)[]"], [[(True, value.to_bytes(32, "big")) for value in raw]])
+
+        with override_settings(MULTICALL3_ADDRESS=multicall), \
+                mock.patch.object(self.service.w3.eth, "call", side_effect=fake_call) as mock_call:
+            result = self.service.balances_of(self.wallets[:3], chunk_size=5)
+
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(list(result.values()), self.amounts[:3])
+
+    def test_comando_exporta_saldos_das_carteiras(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        for i, wallet in enumerate(self.wallets[:2]):
+            UserProfile.objects.create(user=User.objects.create_user(username=f"w{i}"), wallet_address=wallet)
+        out = StringIO()
+        with mock.patch("blockchain.management.commands.export_balances.get_blockchain_service",
+                        return_value=self.service):
+            call_command("export_balances", "--from-db", stdout=out, stderr=StringIO())
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [f"{self.wallets[0]},0.000000000000000001", f"{self.wallets[1]},1.000000000000000001"],
+        )
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class ReconcileBalancesTests(TestCase):
+    def setUp(self):
+        from .testing import RPCStubServer, deploy_feedback_token
+
+        self.stub = RPCStubServer().start()
+        self.addCleanup(self.stub.stop)
+        overrides = override_settings(
+            WEB3_HTTP_PROVIDER_URL=self.stub.url,
+            CONTRACT_ADDRESS=deploy_feedback_token(self.stub.w3),
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CHAIN_ID=self.stub.w3.eth.chain_id,
+            NONCE_BACKEND="local",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService()
+        patcher = mock.patch("blockchain.reconciliation.get_blockchain_service", return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        wallets = [services.Web3.to_checksum_address("0x%040x" % (i + 1)) for i in range(4)]
+        self.service.batch_mint(wallets[:3], [1, 2, 3])
+        balances = ["1", "1.5", "2", "0.000000000000000001"]
+        self.profiles = []
+        for i, (wallet, balance) in enumerate(zip(wallets, balances)):
+            user = User.objects.create_user(username=f"reconcile_{i}")
+            self.profiles.append(
+                UserProfile.objects.create(user=user, wallet_address=wallet, blockchain_balance=Decimal(balance))
+            )
+        UserProfile.objects.create(user=User.objects.create_user(username="sem_carteira"))
+        # Mint da recompensa ainda não confirmado: diferença esperada
+        RewardTransaction.objects.create(
+            user=self.profiles[2].user, amount=Decimal("1"), tx_type="REWARD", status="PROCESSING"
+        )
+
+    def balance(self, index):
+        self.profiles[index].refresh_from_db()
+        return self.profiles[index].blockchain_balance
+
+    def test_particoes_por_keyset(self):
+        from .reconciliation import profile_partitions
+
+        ids = [profile.id for profile in self.profiles]
+        self.assertEqual(
+            list(profile_partitions(3)),
+            [(0, ids[2]), (ids[2], ids[3])],
+        )
+
+    def test_relatorio_e_correcao_exatos(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out, err = StringIO(), StringIO()
+        with mock.patch("blockchain.management.commands.reconcile_balances.get_blockchain_service",
+                        return_value=self.service):
+            call_command("reconcile_balances", "--chunk-size", "2", "--workers", "1", "--fix",
+                         stdout=out, stderr=err)
+
+        rows = out.getvalue().splitlines()
+        self.assertEqual(
+            rows[0], "profile_id,wallet_address,blockchain_balance,withdrawn,onchain_balance,drift,in_flight"
+        )
+        drifts = {int(row.split(",")[0]): row.split(",")[5:] for row in rows[1:]}
+        self.assertEqual(drifts, {
+            self.profiles[1].id: ["0.500000000000000000", "False"],
+            self.profiles[2].id: ["1.000000000000000000", "True"],
+            self.profiles[3].id: ["-0.000000000000000001", "False"],
+        })
+        self.assertIn("4 carteiras comparadas", err.getvalue())
+        self.assertIn("1 corrigidas, 1 positivas para revisão manual", err.getvalue())
+
+        # Divergência positiva não é creditada: só relatada
+        self.assertEqual(self.balance(1), Decimal("1.5"))
+        self.assertEqual(self.balance(2), Decimal("2"))
+        self.assertEqual(self.balance(3), Decimal("0"))
+
+    def test_saque_confirmado_nao_vira_divergencia(self):
+        from .reconciliation import apply_corrections, reconcile_balances
+
+        wallet = self.profiles[0].wallet_address
+        # Mintou 1 e sacou 0.25 para a própria carteira: banco 0.75, on-chain 1.25
+        UserProfile.objects.filter(id=self.profiles[0].id).update(blockchain_balance=Decimal("0.75"))
+        RewardTransaction.objects.create(
+            user=self.profiles[0].user, amount=Decimal("0.25"), tx_type="WITHDRAWAL",
+            status="CONFIRMED", to_address=wallet.lower(),
+        )
+        # Pagamento do saque (da conta admin) chegando na carteira
+        self.service.batch_mint([wallet], [Decimal("0.25")])
+        # Mintou 2 e sacou 0.5 para outra carteira: banco 1.5, on-chain 2
+        RewardTransaction.objects.create(
+            user=self.profiles[1].user, amount=Decimal("0.5"), tx_type="WITHDRAWAL",
+            status="CONFIRMED", to_address="0x" + "9" * 40,
+        )
+
+        block = self.service.w3.eth.block_number
+        drifts = [drift for _, partition in reconcile_balances(block, 10, 1) for drift in partition]
+        self.assertEqual({drift.profile_id for drift in drifts}, {self.profiles[2].id, self.profiles[3].id})
+
+        apply_corrections(drifts)
+        self.assertEqual(self.balance(0), Decimal("0.75"))
+        self.assertEqual(self.balance(1), Decimal("1.5"))
+
+
+class ProcessRewardBatchTests(TestCase):
+    def create_rewards(self, count, amount="0.5"):
+        wallets = []
+        for i in range(count):
+            user = User.objects.create_user(username=f"reward_user_{i}")
+            wallet = services.Web3.to_checksum_address("0x%040x" % (i + 1))
+            UserProfile.objects.create(user=user, wallet_address=wallet, virtual_balance=Decimal(amount))
+            RewardTransaction.objects.create(user=user, amount=Decimal(amount), tx_type="REWARD")
+            wallets.append(wallet)
+        return wallets
+
+    @mock.patch("blockchain.tasks.rewards.MAX_BATCH_SIZE", 2)
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_divide_em_lotes_e_marca_so_os_lotes_enviados(self, mock_get_service):
+        wallets = self.create_rewards(5)
+        failed_wallet = wallets[2]
+
+        def fake_batch_mint(recipients, amounts, reward_mint=False):
+            self.assertLessEqual(len(recipients), 2)
+            return None if failed_wallet in recipients else "0x" + recipients[0][2:].lower()
+
+        mock_get_service.return_value.batch_mint.side_effect = fake_batch_mint
+
+        tx_hashes = process_reward_batch()
+
+        self.assertEqual(len(tx_hashes), 2)
+        self.assertEqual(mock_get_service.return_value.batch_mint.call_count, 3)
+        pending = RewardTransaction.objects.filter(status="PENDING")
+        self.assertEqual(
+            sorted(pending.values_list("user__userprofile__wallet_address", flat=True)),
+            sorted(wallets[2:4]),
+        )
+        self.assertEqual(RewardTransaction.objects.filter(status="PROCESSING").count(), 3)
+
+        # Saldos liquidados em tokens (não em wei) apenas para os lotes enviados
+        settled = UserProfile.objects.get(wallet_address=wallets[0])
+        self.assertEqual(settled.blockchain_balance, Decimal("0.5"))
+        self.assertEqual(settled.virtual_balance, Decimal("0"))
+        untouched = UserProfile.objects.get(wallet_address=failed_wallet)
+        self.assertEqual(untouched.blockchain_balance, Decimal("0"))
+
+    @mock.patch("blockchain.tasks.rewards.MAX_BATCH_SIZE", 2)
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_excecao_no_batch_mint_devolve_o_lote_e_propaga(self, mock_get_service):
+        wallets = self.create_rewards(4)
+
+        def fake_batch_mint(recipients, amounts, reward_mint=False):
+            if wallets[2] in recipients:
+                raise ConnectionError("nó fora do ar")
+            return "0x" + recipients[0][2:].lower()
+
+        mock_get_service.return_value.batch_mint.side_effect = fake_batch_mint
+
+        # Propaga para o autoretry da tarefa
+        with self.assertRaises(ConnectionError):
+            process_reward_batch()
+
+        self.assertEqual(
+            sorted(RewardTransaction.objects.filter(status="PENDING")
+                   .values_list("user__userprofile__wallet_address", flat=True)),
+            sorted(wallets[2:]),
+        )
+        # O lote enviado foi liquidado normalmente
+        self.assertEqual(RewardTransaction.objects.filter(status="PROCESSING", tx_hash__isnull=False).count(), 2)
+        self.assertFalse(RewardTransaction.objects.filter(status="PROCESSING", tx_hash__isnull=True).exists())
+
+    @override_settings(REWARD_CLAIM_TIMEOUT=600)
+    def test_reivindicacao_abandonada_volta_para_pending(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .tasks.rewards import release_stale_reward_claims
+
+        self.create_rewards(3)
+        rewards = list(RewardTransaction.objects.order_by("id"))
+        old = timezone.now() - timedelta(seconds=601)
+        # Worker caiu depois de reivindicar; outra reivindicação é recente; outra já tem mint
+        RewardTransaction.objects.filter(id=rewards[0].id).update(status="PROCESSING", processed_at=old)
+        RewardTransaction.objects.filter(id=rewards[1].id).update(status="PROCESSING", processed_at=timezone.now())
+        RewardTransaction.objects.filter(id=rewards[2].id).update(
+            status="PROCESSING", processed_at=old, tx_hash="0x" + "1" * 64
+        )
+
+        self.assertEqual(release_stale_reward_claims(), 1)
+        self.assertEqual(
+            list(RewardTransaction.objects.order_by("id").values_list("status", flat=True)),
+            ["PENDING", "PROCESSING", "PROCESSING"],
+        )
+
+    @override_settings(REWARD_CLAIM_TIMEOUT=600)
+    def test_reivindicacao_abandonada_com_mint_registrado_vai_para_revisao(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .calldata import BATCH_MINT_SELECTOR, encode_address_amount_batch
+        from .tasks.rewards import release_stale_reward_claims
+
+        wallets = self.create_rewards(3)
+        old = timezone.now() - timedelta(seconds=601)
+        RewardTransaction.objects.update(status="PROCESSING", processed_at=old)
+        # O worker registrou (e talvez transmitiu) o batchMint das duas
+        # primeiras carteiras e caiu antes de gravar o tx_hash
+        BroadcastTransaction.objects.create(
+            sender="0x" + "11" * 20, nonce=7, chain_id=1, to_address="0x" + "22" * 20, gas=100000,
+            data="0x" + encode_address_amount_batch(BATCH_MINT_SELECTOR, wallets[:2], [5 * 10**17] * 2).hex(),
+        )
+
+        self.assertEqual(release_stale_reward_claims(), 1)
+
+        statuses = dict(RewardTransaction.objects.values_list("user__userprofile__wallet_address", "status"))
+        self.assertEqual([statuses[wallet] for wallet in wallets], ["REVIEW", "REVIEW", "PENDING"])
+        # Nada volta a ser mintado
+        self.assertEqual(release_stale_reward_claims(), 0)
+
+    @override_settings(REWARD_CLAIM_CHUNK_SIZE=2)
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_agrega_por_carteira_em_blocos_por_id(self, mock_get_service):
+        wallets = self.create_rewards(2, amount="1")
+        users = User.objects.order_by("id")
+        # ids intercalados: u0, u1, u0, u1, u0 → blocos (1, 2), (3, 4), (5)
+        for user in [users[0], users[1], users[0]]:
+            RewardTransaction.objects.create(user=user, amount=Decimal("1"), tx_type="REWARD")
+        UserProfile.objects.filter(wallet_address=wallets[0]).update(virtual_balance=Decimal("3"))
+        UserProfile.objects.filter(wallet_address=wallets[1]).update(virtual_balance=Decimal("2"))
+        mock_get_service.return_value.batch_mint.side_effect = ["0x%064x" % i for i in range(1, 4)]
+
+        tx_hashes = process_reward_batch()
+
+        self.assertEqual(len(tx_hashes), 3)
+        for call in mock_get_service.return_value.batch_mint.call_args_list:
+            recipients, amounts = call.args
+            self.assertEqual(len(recipients), len(set(recipients)))
+            self.assertLessEqual(len(recipients), 2)
+        self.assertFalse(RewardTransaction.objects.filter(status="PENDING").exists())
+        self.assertFalse(RewardTransaction.objects.filter(tx_hash__isnull=True).exists())
+        for wallet, total in [(wallets[0], Decimal("3")), (wallets[1], Decimal("2"))]:
+            profile = UserProfile.objects.get(wallet_address=wallet)
+            self.assertEqual(profile.blockchain_balance, total)
+            self.assertEqual(profile.virtual_balance, Decimal("0"))
+
+    @override_settings(REWARD_CLAIM_CHUNK_SIZE=2)
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_custo_por_bloco_nao_cresce_com_o_backlog(self, mock_get_service):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        mock_get_service.return_value.batch_mint.return_value = "0x" + "ab" * 32
+        users = [User.objects.create_user(username=f"backlog_{i}") for i in range(2)]
+        for i, user in enumerate(users):
+            UserProfile.objects.create(user=user, wallet_address="0x%040x" % (i + 1))
+
+        query_counts = []
+        for _ in range(3):
+            # Backlog cresce um bloco por rodada; tudo volta para PENDING
+            for user in users:
+                RewardTransaction.objects.create(user=user, amount=Decimal("1"), tx_type="REWARD")
+            RewardTransaction.objects.update(status="PENDING", tx_hash=None, processed_at=None)
+            with CaptureQueriesContext(connection) as ctx:
+                process_reward_batch()
+            query_counts.append(len(ctx.captured_queries))
+            self.assertFalse(RewardTransaction.objects.filter(status="PENDING").exists())
+
+        # 1, 2 e 3 blocos: cada bloco custa o mesmo número de queries
+        self.assertEqual(query_counts[1] - query_counts[0], query_counts[2] - query_counts[1])
+
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_liquida_carteira_gravada_em_minusculas(self, mock_get_service):
+        user = User.objects.create_user(username="minusculas")
+        wallet = "0x" + "ab" * 20
+        UserProfile.objects.create(user=user, wallet_address=wallet, virtual_balance=Decimal("2"))
+        RewardTransaction.objects.create(user=user, amount=Decimal("2"), tx_type="REWARD")
+        mock_get_service.return_value.batch_mint.return_value = "0x" + "cd" * 32
+
+        process_reward_batch()
+
+        recipients, amounts = mock_get_service.return_value.batch_mint.call_args.args
+        self.assertEqual(recipients, [services.Web3.to_checksum_address(wallet)])
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual(profile.blockchain_balance, Decimal("2"))
+        self.assertEqual(profile.virtual_balance, Decimal("0"))
+
+    @mock.patch("blockchain.tasks.rewards.get_blockchain_service")
+    def test_liquidacao_usa_as_mesmas_queries_para_qualquer_lote(self, mock_get_service):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        mock_get_service.return_value.batch_mint.return_value = "0x" + "ab" * 32
+        query_counts = []
+        for size in (2, 6):
+            RewardTransaction.objects.all().delete()
+            UserProfile.objects.all().delete()
+            User.objects.all().delete()
+            self.create_rewards(size)
+            with CaptureQueriesContext(connection) as ctx:
+                process_reward_batch()
+            query_counts.append(len(ctx.captured_queries))
+            self.assertEqual(
+                UserProfile.objects.filter(blockchain_balance=Decimal("0.5")).count(), size
+            )
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class ProcessRewardBatchChainTests(TransactionTestCase):
+    """Mints contra a chain local: as threads do pool gravam no banco (sem a transação do TestCase)."""
+
+    create_rewards = ProcessRewardBatchTests.create_rewards
+
+    @mock.patch("blockchain.tasks.rewards.MAX_BATCH_SIZE", 2)
+    def test_mint_em_varios_lotes_na_chain_local(self):
+        from web3 import EthereumTesterProvider
+        from .testing import deploy_feedback_token
+
+        provider = EthereumTesterProvider()
+        w3 = services.Web3(provider)
+        with override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=deploy_feedback_token(w3),
+            CHAIN_ID=w3.eth.chain_id,
+            NONCE_BACKEND="local",
+            REWARD_MINT_CONCURRENCY=1,  # o eth-tester não é thread-safe
+        ):
+            service = services.BlockchainService(provider=provider)
+            wallets = self.create_rewards(3, amount="1.5")
+            with mock.patch("blockchain.tasks.rewards.get_blockchain_service", return_value=service):
+                tx_hashes = process_reward_batch()
+
+            self.assertEqual(len(tx_hashes), 2)
+            for wallet in wallets:
+                self.assertEqual(service.check_balance(wallet), 1.5)
+            # Cada envio foi registrado antes de ser transmitido
+            self.assertEqual(
+                set(TransactionAttempt.objects.values_list("tx_hash", flat=True)), set(tx_hashes)
+            )
+
+    def test_listener_entre_envio_e_liquidacao_nao_credita_duas_vezes(self):
+        from web3 import EthereumTesterProvider
+        from .tasks import rewards
+        from .testing import deploy_feedback_token
+
+        provider = EthereumTesterProvider()
+        w3 = services.Web3(provider)
+        with override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=deploy_feedback_token(w3),
+            CHAIN_ID=w3.eth.chain_id,
+            NONCE_BACKEND="local",
+            EVENT_SCAN_CONCURRENCY=1,  # o eth-tester não é thread-safe
+        ):
+            service = services.BlockchainService(provider=provider)
+            (wallet,) = self.create_rewards(1, amount="2")
+            settle = rewards.settle_reward_chunk
+
+            def listener_antes_da_liquidacao(*args):
+                # O eth-tester minera na hora: o log já está na chain
+                listen_for_batch_mint_events(from_block=0, catch_up=True)
+                return settle(*args)
+
+            with mock.patch("blockchain.tasks.rewards.get_blockchain_service", return_value=service), \
+                    mock.patch("blockchain.tasks.events.get_blockchain_service", return_value=service), \
+                    mock.patch("blockchain.tasks.rewards.settle_reward_chunk", side_effect=listener_antes_da_liquidacao):
+                self.assertEqual(len(process_reward_batch()), 1)
+
+            self.assertTrue(ProcessedLog.objects.exists())
+            profile = UserProfile.objects.get(wallet_address=wallet)
+            self.assertEqual((profile.blockchain_balance, profile.virtual_balance), (Decimal("2"), Decimal("0")))
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class BatchMintedListenerTests(TestCase):
+    def setUp(self):
+        from web3 import EthereumTesterProvider
+        from .testing import deploy_feedback_token
+
+        self.provider = EthereumTesterProvider()
+        w3 = services.Web3(self.provider)
+        contract_address = deploy_feedback_token(w3)
+        overrides = override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=contract_address,
+            CHAIN_ID=w3.eth.chain_id,
+            NONCE_BACKEND="local",
+            EVENT_SCAN_CONCURRENCY=1,  # o eth-tester não é thread-safe
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService(provider=self.provider)
+        patcher = mock.patch("blockchain.tasks.events.get_blockchain_service", return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.wallet = services.Web3.to_checksum_address("0x" + "33" * 20)
+        user = User.objects.create_user(username="listener")
+        # Gravado em minúsculas: o evento traz o endereço em checksum
+        self.profile = UserProfile.objects.create(user=user, wallet_address=self.wallet.lower())
+
+    def balance(self):
+        self.profile.refresh_from_db()
+        return self.profile.blockchain_balance
+
+    def cursor(self):
+        return ChainCursor.objects.get(event_name=BATCH_MINTED)
+
+    def test_catch_up_credita_e_persiste_o_cursor(self):
+        self.service.batch_mint([self.wallet], [2])
+        head = self.service.w3.eth.block_number
+
+        last_block = listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        self.assertEqual(last_block, head)
+        self.assertEqual(self.cursor().last_block, head)
+        self.assertEqual(self.balance(), Decimal("2"))
+
+    def test_restart_retoma_do_cursor_sem_creditar_de_novo(self):
+        self.service.batch_mint([self.wallet], [2])
+        listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        self.service.batch_mint([self.wallet], [3])
+        # from_block é ignorado quando já existe cursor salvo
+        with mock.patch.object(
+            self.service.contract.events.BatchMinted, "get_logs",
+            wraps=self.service.contract.events.BatchMinted.get_logs,
+        ) as mock_get_logs:
+            listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        self.assertEqual(self.balance(), Decimal("5"))
+        self.assertEqual(mock_get_logs.call_count, 1)
+        self.assertEqual(mock_get_logs.call_args.kwargs["from_block"], self.service.w3.eth.block_number)
+
+    @override_settings(EVENT_SCAN_BLOCK_RANGE=1)
+    def test_varre_em_intervalos_limitados(self):
+        for amount in (1, 2, 3):
+            self.service.batch_mint([self.wallet], [amount])
+
+        listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        self.assertEqual(self.balance(), Decimal("6"))
+        self.assertEqual(self.cursor().last_block, self.service.w3.eth.block_number)
+
+    def test_falha_no_credito_nao_avanca_o_cursor(self):
+        self.service.batch_mint([self.wallet], [2])
+
+        with mock.patch("blockchain.tasks.events.credit_batch_minted", side_effect=RuntimeError("db caiu")):
+            with self.assertRaises(RuntimeError):
+                listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        self.assertEqual(self.cursor().last_block, -1)
+        self.assertEqual(self.balance(), Decimal("0"))
+
+        listen_for_batch_mint_events(catch_up=True)
+        self.assertEqual(self.balance(), Decimal("2"))
+
+    def test_backfill_em_particoes_sobrepostas_credita_uma_vez(self):
+        from django.core.management import call_command
+
+        for amount in (1, 2, 4):
+            self.service.batch_mint([self.wallet], [amount])
+        head = self.service.w3.eth.block_number
+        listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+        with mock.patch("blockchain.management.commands.catch_up_events.get_blockchain_service",
+                        return_value=self.service):
+            call_command("catch_up_events", "--from-block", "0", "--to-block", str(head - 1), stdout=mock.Mock())
+            call_command("catch_up_events", "--from-block", "2", "--to-block", str(head), stdout=mock.Mock())
+
+        self.assertEqual(self.balance(), Decimal("7"))
+        self.assertEqual(self.cursor().last_block, head)
+
+    def test_comando_recusa_mover_cursor_existente(self):
+        from django.core.management import CommandError, call_command
+
+        with mock.patch("blockchain.management.commands.catch_up_events.get_blockchain_service",
+                        return_value=self.service):
+            call_command("catch_up_events", "--from-block", "0", stdout=mock.Mock())
+            with self.assertRaises(CommandError):
+                call_command("catch_up_events", "--from-block", "0", stdout=mock.Mock())
+            call_command("catch_up_events", stdout=mock.Mock())
+
+    @unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+    def test_janelas_em_paralelo_contra_no_http(self):
+        from .testing import RPCStubServer, deploy_feedback_token
+
+        with RPCStubServer() as stub, override_settings(
+            CONTRACT_ADDRESS=deploy_feedback_token(stub.w3),
+            CHAIN_ID=stub.w3.eth.chain_id,
+            WEB3_HTTP_PROVIDER_URL=stub.url,
+            EVENT_SCAN_BLOCK_RANGE=1,
+            EVENT_SCAN_CONCURRENCY=4,
+        ):
+            service = services.BlockchainService()
+            for amount in (1, 2, 3, 4, 5):
+                service.batch_mint([self.wallet], [amount])
+
+            with mock.patch("blockchain.tasks.events.get_blockchain_service", return_value=service):
+                last_block = listen_for_batch_mint_events(from_block=0, catch_up=True)
+
+            self.assertEqual(last_block, service.w3.eth.block_number)
+            self.assertEqual(self.balance(), Decimal("15"))
+
+
+class CreditBatchMintedTests(TestCase):
+    def create_profiles(self, count):
+        wallets = []
+        for i in range(count):
+            user = User.objects.create_user(username=f"credit_{i}")
+            wallet = services.Web3.to_checksum_address("0x%040x" % (i + 1))
+            # Metade gravada em minúsculas: a busca não pode depender do formato
+            UserProfile.objects.create(user=user, wallet_address=wallet if i % 2 else wallet.lower())
+            wallets.append(wallet)
+        return wallets
+
+    def event(self, recipients, amounts, block_number=1, tx_hash=None, log_index=0):
+        from hexbytes import HexBytes
+        from web3.datastructures import AttributeDict
+
+        self.tx_counter = getattr(self, "tx_counter", 0) + 1
+        return AttributeDict({
+            "blockNumber": block_number,
+            "transactionHash": HexBytes(tx_hash or "0x%064x" % self.tx_counter),
+            "logIndex": log_index,
+            "args": AttributeDict({"recipients": recipients, "amounts": [a * 10**18 for a in amounts]}),
+        })
+
+    def test_soma_eventos_por_carteira(self):
+        wallets = self.create_profiles(3)
+        events = [
+            self.event(wallets[:2], [1, 2]),
+            self.event([wallets[0], "0x" + "99" * 20], [3, 5], block_number=2),
+        ]
+
+        credited = credit_batch_minted(events)
+
+        self.assertEqual(credited, 2)
+        balances = dict(UserProfile.objects.values_list("user__username", "blockchain_balance"))
+        self.assertEqual(balances, {"credit_0": Decimal("4"), "credit_1": Decimal("2"), "credit_2": Decimal("0")})
+
+    def test_queries_nao_crescem_com_o_numero_de_destinatarios(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        wallets = self.create_profiles(60)
+        query_counts = []
+        for size in (2, 60):
+            recipients = wallets[:size]
+            events = [self.event(recipients[i:i + 10], [1] * len(recipients[i:i + 10])) for i in range(0, size, 10)]
+            with CaptureQueriesContext(connection) as ctx:
+                credit_batch_minted(events)
+            query_counts.append(len(ctx.captured_queries))
+
+        # ProcessedLog (SELECT + INSERT), envios substituídos, mints de recompensa
+        # registrados, mints já liquidados, perfis, UPDATE
+        self.assertEqual(query_counts, [7, 7])
+        self.assertEqual(UserProfile.objects.filter(blockchain_balance=Decimal("2")).count(), 2)
+
+    def test_log_repetido_credita_uma_vez(self):
+        wallets = self.create_profiles(1)
+        event = self.event(wallets, [2])
+
+        credit_batch_minted([event])
+        credit_batch_minted([event, self.event(wallets, [3], tx_hash=event.transactionHash, log_index=1)])
+
+        self.assertEqual(UserProfile.objects.get().blockchain_balance, Decimal("5"))
+        self.assertEqual(ProcessedLog.objects.count(), 2)
+
+    def test_mint_de_recompensa_liquidada_nao_credita_de_novo(self):
+        wallets = self.create_profiles(1)
+        event = self.event(wallets, [2])
+        # process_reward_batch grava o hash sem o prefixo 0x e já liquida o saldo
+        RewardTransaction.objects.create(
+            user=User.objects.get(), amount=Decimal("2"), tx_type="REWARD",
+            status="PROCESSING", tx_hash=event.transactionHash.hex().removeprefix("0x"),
+        )
+
+        credit_batch_minted([event])
+
+        self.assertEqual(UserProfile.objects.get().blockchain_balance, Decimal("0"))
+        self.assertTrue(ProcessedLog.objects.filter(log_index=event.logIndex).exists())
+
+    def test_mint_de_recompensa_registrado_nao_credita_antes_da_liquidacao(self):
+        wallets = self.create_profiles(2)
+        reward, manual = self.event(wallets[:1], [2]), self.event(wallets[1:], [3])
+        # Registrados no envio; o lote de recompensas ainda não foi liquidado
+        for nonce, (event, reward_mint) in enumerate(((reward, True), (manual, False))):
+            broadcast = BroadcastTransaction.objects.create(
+                sender="0x" + "11" * 20, nonce=nonce, chain_id=1, gas=100000, reward_mint=reward_mint
+            )
+            TransactionAttempt.objects.create(broadcast=broadcast, tx_hash=event.transactionHash.hex())
+
+        credit_batch_minted([reward, manual])
+
+        balances = dict(UserProfile.objects.values_list("user__username", "blockchain_balance"))
+        self.assertEqual(balances, {"credit_0": Decimal("0"), "credit_1": Decimal("3")})
+
+    def test_registro_concorrente_repete_o_intervalo(self):
+        from blockchain.tasks.events import apply_block_range, processed_log_keys
+
+        wallets = self.create_profiles(1)
+        event = self.event(wallets, [2])
+        cursor = get_event_cursor("0x" + "88" * 20, BATCH_MINTED, 1)
+        # Outra réplica registra e credita o log entre a consulta e o INSERT
+        credit_batch_minted([event])
+        with mock.patch(
+            "blockchain.tasks.events.processed_log_keys",
+            side_effect=[set(), processed_log_keys([services.Web3.to_hex(event.transactionHash)])],
+        ):
+            apply_block_range(cursor, 1, 1, [event])
+
+        self.assertEqual(UserProfile.objects.get().blockchain_balance, Decimal("2"))
+        self.assertEqual(ChainCursor.objects.get(pk=cursor.pk).last_block, 1)
+
+    @mock.patch("blockchain.balances.PROFILE_CHUNK_SIZE", 2)
+    def test_divide_em_lotes_de_perfis(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        wallets = self.create_profiles(5)
+        with CaptureQueriesContext(connection) as ctx:
+            credit_batch_minted([self.event(wallets, [1] * 5)])
+
+        # 3 SELECTs + 3 UPDATEs de até 2 perfis, além das 4 queries do ProcessedLog
+        # e da busca por envios substituídos e mints de recompensa
+        self.assertEqual(len(ctx.captured_queries), 11)
+        self.assertEqual(UserProfile.objects.filter(blockchain_balance=Decimal("1")).count(), 5)
+
+
+@override_settings(EVENT_SCAN_CONCURRENCY=3, EVENT_SCAN_MAX_BLOCK_RANGE=1000, EVENT_SCAN_TARGET_LOGS=10)
+class ScanWindowTests(TestCase):
+    """Varredura contra um provider simulado que limita o intervalo de get_logs."""
+
+    def setUp(self):
+        self.service = mock.Mock()
+        self.service.contract.address = "0x" + "44" * 20
+        self.requested = []
+        self.service.contract.events.BatchMinted.get_logs.side_effect = self.get_logs
+        self.max_range = 50
+        self.cursor = get_event_cursor(self.service.contract.address, BATCH_MINTED, 0)
+
+    def get_logs(self, from_block, to_block):
+        self.requested.append((from_block, to_block))
+        if to_block - from_block + 1 > self.max_range:
+            raise ValueError({"code": -32005, "message": "query returned more than 10000 results"})
+        return []
+
+    def test_janela_cresce_com_respostas_pequenas(self):
+        window = ScanWindow(10, 1000, 10)
+        scan_events(self.service, self.cursor, 40, window)
+        self.assertGreater(window.size, 10)
+        self.assertEqual(ChainCursor.objects.get().last_block, 40)
+
+    def test_janela_cai_pela_metade_quando_o_provider_recusa(self):
+        window = ScanWindow(400, 1000, 10)
+        scan_events(self.service, self.cursor, 5000, window)
+
+        self.assertEqual(ChainCursor.objects.get().last_block, 5000)
+        # Os intervalos aceitos pelo provider cobrem todos os blocos
+        covered = set()
+        for start, end in self.requested:
+            if end - start + 1 <= self.max_range:
+                covered.update(range(start, end + 1))
+        self.assertEqual(covered, set(range(0, 5001)))
+        # Depois de achar o limite, a janela não fica alternando entre erro e acerto
+        refused = [r for r in self.requested if r[1] - r[0] + 1 > self.max_range]
+        self.assertLessEqual(len(refused), 3 * settings.EVENT_SCAN_CONCURRENCY)
+
+    def test_erro_que_nao_e_de_intervalo_propaga_sem_perder_progresso(self):
+        self.service.contract.events.BatchMinted.get_logs.side_effect = [[], ConnectionError("nó fora do ar")]
+        with override_settings(EVENT_SCAN_CONCURRENCY=1):
+            with self.assertRaises(ConnectionError):
+                scan_events(self.service, self.cursor, 100, ScanWindow(10, 1000, 10))
+        self.assertEqual(ChainCursor.objects.get().last_block, 9)
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class BatchMintedSubscriptionTests(TransactionTestCase):
+    """Listener em modo WebSocket contra um nó local (eth-tester) com eth_subscribe."""
+
+    def setUp(self):
+        from .testing import RPCStubServer, deploy_feedback_token
+
+        self.stub = RPCStubServer(ws=True).start()
+        self.addCleanup(self.stub.stop)
+        overrides = override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=deploy_feedback_token(self.stub.w3),
+            CHAIN_ID=self.stub.w3.eth.chain_id,
+            WEB3_HTTP_PROVIDER_URL=self.stub.url,
+            NONCE_BACKEND="local",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService()
+
+        self.wallet = services.Web3.to_checksum_address("0x" + "66" * 20)
+        user = User.objects.create_user(username="ws_listener")
+        self.profile = UserProfile.objects.create(user=user, wallet_address=self.wallet)
+
+    def start_listener(self):
+        self.cursor = get_event_cursor(self.service.contract.address, BATCH_MINTED, 0)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=listen_with_subscription,
+            args=(self.service, self.cursor, ScanWindow.from_settings(), self.stub.ws_url, stop),
+            daemon=True,
+        )
+        thread.start()
+
+        def shutdown():
+            stop.set()
+            self.stub.ws_accepting = False
+            self.stub.drop_ws_connections()
+            thread.join(timeout=5)
+
+        self.addCleanup(shutdown)
+        self.wait_for(lambda: self.stub._subscriptions, "assinatura WebSocket")
+        self.wait_for_block(self.service.w3.eth.block_number)
+
+    def wait_for(self, condition, what, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail(f"timeout esperando {what}")
+            time.sleep(0.002)
+
+    def wait_for_block(self, block_number, timeout=5):
+        # Acompanha o cursor em memória: ler o banco (SQLite em memória,
+        # cache compartilhado) durante a escrita do listener trava a tabela
+        self.wait_for(lambda: self.cursor.last_block >= block_number, f"bloco {block_number}", timeout)
+
+    def mint(self, amount):
+        tx_hash = self.service.batch_mint([self.wallet], [amount])
+        return self.service.w3.eth.get_transaction_receipt("0x" + tx_hash).blockNumber
+
+    def balance(self):
+        self.profile.refresh_from_db()
+        return self.profile.blockchain_balance
+
+    @override_settings(EVENT_POLL_INTERVAL=60, EVENT_WS_RETRY_INTERVAL=60)
+    def test_credito_chega_pela_assinatura_sem_polling(self):
+        self.start_listener()
+        requests_before = self.stub.request_count
+        time.sleep(0.2)
+        # Ocioso: nenhuma chamada RPC enquanto não há eventos
+        self.assertEqual(self.stub.request_count, requests_before)
+
+        latencies = []
+        for amount in (1, 2, 3):
+            block_number = self.mint(amount)
+            mined_at = time.monotonic()
+            self.wait_for_block(block_number)
+            latencies.append(time.monotonic() - mined_at)
+
+        # Bem abaixo do EVENT_POLL_INTERVAL: só a assinatura pode ter creditado
+        self.assertLess(max(latencies), 1.0)
+        self.assertEqual(self.balance(), Decimal("6"))
+
+    @override_settings(EVENT_POLL_INTERVAL=60, EVENT_WS_RETRY_INTERVAL=0.2, WEB3_HTTP_TIMEOUT=1)
+    def test_reconecta_e_reconcilia_o_gap_sem_creditar_de_novo(self):
+        self.start_listener()
+        self.wait_for_block(self.mint(1))
+
+        # Queda do WebSocket: eventos minerados enquanto não há assinatura
+        self.stub.ws_accepting = False
+        self.stub.drop_ws_connections()
+        self.wait_for(lambda: not self.stub._subscriptions, "queda da assinatura")
+        self.mint(2)
+        self.mint(4)
+        self.stub.ws_accepting = True
+
+        self.wait_for(lambda: self.stub._subscriptions, "reconexão", timeout=10)
+        self.wait_for_block(self.mint(8))
+        time.sleep(0.2)
+
+        self.assertEqual(self.balance(), Decimal("15"))
+        self.assertEqual(
+            ChainCursor.objects.get(event_name=BATCH_MINTED).last_block,
+            self.service.w3.eth.block_number,
+        )
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+class ConfirmationTrackerTests(TestCase):
+    """track_confirmations contra um nó HTTP local (eth-tester) com JSON-RPC em lote."""
+
+    def setUp(self):
+        from .testing import RPCStubServer, deploy_feedback_token
+
+        self.stub = RPCStubServer().start()
+        self.addCleanup(self.stub.stop)
+        overrides = override_settings(
+            WEB3_HTTP_PROVIDER_URL=self.stub.url,
+            CONTRACT_ADDRESS=deploy_feedback_token(self.stub.w3),
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CHAIN_ID=self.stub.w3.eth.chain_id,
+            NONCE_BACKEND="local",
+            CONFIRMATION_DEPTH=3,
+            CONFIRMATION_BATCH_SIZE=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService()
+        patcher = mock.patch("blockchain.tasks.confirmations.get_blockchain_service", return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username="tracked")
+        self.wallet = services.Web3.to_checksum_address("0x" + "33" * 20)
+        self.profile = UserProfile.objects.create(
+            user=self.user, wallet_address=self.wallet, blockchain_balance=Decimal("10")
+        )
+
+    def processing(self, tx_hash, tx_type="REWARD", amount="1"):
+        return RewardTransaction.objects.create(
+            user=self.user, amount=Decimal(amount), tx_type=tx_type, status="PROCESSING", tx_hash=tx_hash
+        )
+
+    def test_confirma_depois_da_profundidade_configurada(self):
+        rows = [self.processing(self.service.batch_mint([self.wallet], [n])) for n in (1, 2, 3)]
+
+        with mock.patch.object(self.service, "batch_rpc", wraps=self.service.batch_rpc) as batch_rpc:
+            counts = track_confirmations()
+
+        # 3 hashes em lotes de 2: recibos e blocos maduros em uma requisição cada
+        # (o segundo lote não tem bloco maduro)
+        self.assertEqual(counts["confirmed"], 1)
+        self.assertEqual(batch_rpc.call_count, 3)
+        rows[0].refresh_from_db()
+        self.assertEqual(rows[0].status, "CONFIRMED")
+        rows[2].refresh_from_db()
+        self.assertEqual(rows[2].status, "PROCESSING")
+        receipt = self.service.w3.eth.get_transaction_receipt(rows[2].tx_hash)
+        self.assertEqual(rows[2].block_number, receipt.blockNumber)
+        self.assertEqual(rows[2].block_hash, receipt.blockHash.to_0x_hex())
+
+        self.stub.w3.testing.mine(2)
+        track_confirmations()
+
+        self.assertEqual(RewardTransaction.objects.filter(status="CONFIRMED").count(), 3)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("10"))
+
+    def test_transacao_revertida_vira_failed_e_desfaz_saldos(self):
+        # Conta sem tokens: o transfer reverte, mas com gas explícito é minerado (status 0)
+        token = self.stub.w3.eth.contract(address=settings.CONTRACT_ADDRESS, abi=self.service.contract.abi)
+        sender = self.stub.w3.eth.accounts[1]
+        reverted = token.functions.transfer(self.wallet, 10 ** 18).transact({"from": sender, "gas": 100000})
+        withdrawal = self.processing(reverted.hex(), tx_type="WITHDRAWAL", amount="4")
+        reward = self.processing(reverted.to_0x_hex(), amount="1")
+        self.stub.w3.testing.mine(3)
+
+        counts = track_confirmations()
+
+        self.assertEqual(counts["failed"], 2)
+        withdrawal.refresh_from_db()
+        reward.refresh_from_db()
+        self.assertEqual((withdrawal.status, reward.status), ("FAILED", "FAILED"))
+        # Saque devolvido em blockchain_balance; recompensa volta para virtual_balance
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("13"))
+        self.assertEqual(self.profile.virtual_balance, Decimal("1"))
+        # A recompensa revertida volta para a fila de mint
+        remint = RewardTransaction.objects.get(tx_type="REWARD", status="PENDING")
+        self.assertEqual((remint.user_id, remint.amount, remint.tx_hash), (reward.user_id, Decimal("1"), None))
+
+        track_confirmations()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.blockchain_balance, Decimal("13"))
+        self.assertEqual(RewardTransaction.objects.filter(tx_type="REWARD", status="PENDING").count(), 1)
+
+
+@override_settings(CONFIRMATION_DEPTH=3, CONFIRMATION_BATCH_SIZE=100)
+class ConfirmationReorgTests(TestCase):
+    TX_HASH = "0x" + "ab" * 32
+    BLOCK_A = "0x" + "0a" * 32
+    BLOCK_B = "0x" + "0b" * 32
+
+    def setUp(self):
+        user = User.objects.create_user(username="reorg")
+        UserProfile.objects.create(user=user)
+        self.tx = RewardTransaction.objects.create(
+            user=user, amount=Decimal("1"), tx_type="REWARD", status="PROCESSING", tx_hash=self.TX_HASH[2:]
+        )
+        patcher = mock.patch("blockchain.tasks.confirmations.get_blockchain_service")
+        self.service = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def chain(self, head, receipt_block=None, canonical=None):
+        receipt = None
+        if receipt_block:
+            receipt = {"blockNumber": hex(receipt_block[0]), "blockHash": receipt_block[1], "status": "0x1"}
+
+        def batch_rpc(calls):
+            if calls[0][0] == "eth_blockNumber":
+                self.assertEqual(calls[1], ("eth_getTransactionReceipt", [self.TX_HASH]))
+                return [hex(head), receipt]
+            return [{"hash": canonical} for _ in calls]
+
+        self.service.batch_rpc.side_effect = batch_rpc
+
+    def test_reorg_remove_recibo_e_bloco_orfao_nao_confirma(self):
+        self.chain(head=5, receipt_block=(5, self.BLOCK_A))
+        track_confirmations()
+        self.tx.refresh_from_db()
+        self.assertEqual((self.tx.block_number, self.tx.block_hash), (5, self.BLOCK_A))
+
+        # Reorg: a transação voltou para a mempool
+        self.chain(head=6)
+        counts = track_confirmations()
+        self.tx.refresh_from_db()
+        self.assertEqual(counts["reorged"], 1)
+        self.assertEqual((self.tx.status, self.tx.block_hash), ("PROCESSING", None))
+
+        # Reincluída em outro bloco, mas o nó ainda devolve o hash órfão como canônico
+        self.chain(head=9, receipt_block=(7, self.BLOCK_B), canonical=self.BLOCK_A)
+        track_confirmations()
+        self.tx.refresh_from_db()
+        self.assertEqual((self.tx.status, self.tx.block_number, self.tx.block_hash), ("PROCESSING", 7, self.BLOCK_B))
+
+        self.chain(head=9, receipt_block=(7, self.BLOCK_B), canonical=self.BLOCK_B)
+        track_confirmations()
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, "CONFIRMED")
+
+
+@unittest.skipUnless(HAS_ETH_TESTER, "eth-tester não instalado")
+@override_settings(STUCK_TX_TIMEOUT=0, REPLACEMENT_FEE_BUMP=1.125, REPLACEMENT_MAX_FEE_PER_GAS=None)
+class StuckTransactionReplacementTests(TestCase):
+    """Watchdog contra o eth-tester com mineração automática desligada (transações ficam pendentes)."""
+
+    def setUp(self):
+        from web3 import EthereumTesterProvider
+        from .testing import deploy_feedback_token
+
+        provider = EthereumTesterProvider()
+        w3 = services.Web3(provider)
+        overrides = override_settings(
+            PRIVATE_KEY=TEST_PRIVATE_KEY,
+            CONTRACT_ADDRESS=deploy_feedback_token(w3),
+            CHAIN_ID=w3.eth.chain_id,
+            NONCE_BACKEND="local",
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.service = services.BlockchainService(provider=provider)
+        patcher = mock.patch("blockchain.tasks.replacements.get_blockchain_service", return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tester = provider.ethereum_tester
+        self.tester.disable_auto_mine_transactions()
+        self.wallet = services.Web3.to_checksum_address("0x" + "44" * 20)
+        user = User.objects.create_user(username="stuck")
+        UserProfile.objects.create(user=user, wallet_address=self.wallet)
+        self.tx_hash = self.service.batch_mint([self.wallet], [2])
+        self.reward = RewardTransaction.objects.create(
+            user=user, amount=Decimal("2"), tx_type="REWARD", status="PROCESSING", tx_hash=self.tx_hash
+        )
+
+    def test_registra_envio_para_substituicao(self):
+        broadcast = BroadcastTransaction.objects.get()
+        attempt = broadcast.attempts.get()
+        self.assertEqual(attempt.tx_hash, self.tx_hash)
+        self.assertEqual(broadcast.to_address, self.service.contract.address)
+        self.assertTrue(attempt.max_fee_per_gas and attempt.max_priority_fee_per_gas)
+
+    def test_substitui_com_taxas_maiores_e_liquida_o_envio_minerado(self):
+        original = TransactionAttempt.objects.get()
+
+        self.assertEqual(replace_stuck_transactions(), {"mined": 0, "replaced": 1, "filled": 0})
+
+        replacement = TransactionAttempt.objects.exclude(id=original.id).get()
+        self.assertGreaterEqual(replacement.max_priority_fee_per_gas, original.max_priority_fee_per_gas * 1.1)
+        self.assertGreaterEqual(replacement.max_fee_per_gas, original.max_fee_per_gas * 1.1)
+        self.reward.refresh_from_db()
+        self.assertEqual(self.reward.tx_hash, replacement.tx_hash)
+
+        self.tester.mine_blocks(1)
+        self.assertEqual(replace_stuck_transactions(), {"mined": 1, "replaced": 0, "filled": 0})
+
+        broadcast = BroadcastTransaction.objects.get()
+        self.assertEqual((broadcast.status, broadcast.mined_hash), ("MINED", replacement.tx_hash))
+        self.assertEqual(self.service.check_balance(self.wallet), 2)
+
+    def test_envio_original_minerado_vence_a_substituicao(self):
+        original = TransactionAttempt.objects.get()
+        replace_stuck_transactions()
+        replacement = TransactionAttempt.objects.exclude(id=original.id).get()
+
+        # Simula o nó ter minerado a original: a linha aponta para a substituição,
+        # que nunca vai ter recibo
+        receipts = {services.Web3.to_hex(hexstr=original.tx_hash): {"status": "0x1"}}
+        with mock.patch.object(
+            self.service, "batch_rpc", side_effect=lambda calls: [receipts.get(p[0]) for _, p in calls]
+        ), mock.patch.object(self.service.w3.eth, "get_transaction_count", return_value=2):
+            self.assertEqual(replace_stuck_transactions()["mined"], 1)
+
+        self.reward.refresh_from_db()
+        self.assertEqual(self.reward.tx_hash, original.tx_hash)
+        self.assertNotEqual(self.reward.tx_hash, replacement.tx_hash)
+        self.assertEqual(BroadcastTransaction.objects.get().mined_hash, original.tx_hash)
+
+    def test_nonce_devolvido_fora_de_ordem_e_ocupado(self):
+        self.tester.mine_blocks(1)
+        first = self.service.nonces.allocate()
+        self.service.nonces.allocate()  # outro envio em andamento
+        self.service.nonces.release(first)
+
+        self.assertEqual(replace_stuck_transactions()["filled"], 1)
+
+        gap = BroadcastTransaction.objects.get(nonce=first)
+        self.assertEqual((gap.to_address, gap.data), (self.service.admin_address, ""))
+        # O nonce saiu da lista de livres: não é alocado de novo
+        self.assertEqual(self.service.nonces.allocate(), first + 2)
+        self.tester.mine_blocks(1)
+        self.assertEqual(self.service.w3.eth.get_transaction_count(self.service.admin_address), first + 1)
+
+    def test_nonce_abandonado_abaixo_de_envio_antigo_e_ocupado(self):
+        from .tasks.replacements import fill_nonce_gaps
+
+        self.tester.mine_blocks(1)
+        base = self.service.w3.eth.get_transaction_count(self.service.admin_address, "pending")
+        # Nonces base e base+1 alocados por um processo que caiu; o base+2 foi transmitido
+        BroadcastTransaction.objects.create(
+            sender=self.service.admin_address, nonce=base + 2, chain_id=1, gas=21000
+        )
+        self.service.nonces.store._values[self.service.nonces.key] = base + 3
+        with mock.patch.object(self.service, "fill_nonce_gap", return_value="ab") as mock_fill:
+            self.assertEqual(fill_nonce_gaps(self.service), 2)
+        self.assertEqual([c.args[0] for c in mock_fill.call_args_list], [base, base + 1])
+
+        # Envio recente acima do gap: quem alocou pode ainda estar transmitindo
+        with override_settings(STUCK_TX_TIMEOUT=3600), \
+                mock.patch.object(self.service, "fill_nonce_gap", return_value="ab") as mock_fill:
+            self.assertEqual(fill_nonce_gaps(self.service), 0)
+
+    def test_teto_de_taxa_impede_substituicao(self):
+        with override_settings(REPLACEMENT_MAX_FEE_PER_GAS=1):
+            self.assertEqual(replace_stuck_transactions()["replaced"], 0)
+        self.assertEqual(TransactionAttempt.objects.count(), 1)
+
+    def test_listener_nao_credita_mint_substituido_de_recompensa(self):
+        original = TransactionAttempt.objects.get()
+        replace_stuck_transactions()
+
+        from hexbytes import HexBytes
+        from web3.datastructures import AttributeDict
+
+        # O evento chega com o hash original, mas a linha já aponta para a substituição
+        event = AttributeDict({
+            "transactionHash": HexBytes(original.tx_hash),
+            "logIndex": 0,
+            "blockNumber": 1,
+            "args": AttributeDict({"recipients": [self.wallet], "amounts": [2 * 10 ** 18]}),
+        })
+        self.assertEqual(credit_batch_minted([event]), 0)
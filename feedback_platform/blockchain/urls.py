@@ -14,10 +14,43 @@ urlpatterns = [
         views.withdraw_tokens,
         name="withdraw-tokens",
     ),
+    # Status de um saque enfileirado por withdraw_tokens
+    path(
+        "tokens/withdraw/<int:transaction_id>/status/",
+        views.withdrawal_status,
+        name="withdrawal-status",
+    ),
     # Para aprovar feedback:
+    path(
+        "feedback/approve/bulk/",
+        views.bulk_approve_feedback,
+        name="bulk-approve-feedback",
+    ),
     path(
         "feedback/approve/<int:feedback_id>/",
         views.approve_feedback,
         name="approve-feedback",
     ),
-]
\ No newline at end of file
+    # Marca (ou desmarca, com {"useful": false}) um feedback como útil
+    path(
+        "feedback/<int:feedback_id>/useful/",
+        views.mark_feedback_useful,
+        name="mark-feedback-useful",
+    ),
+    # Listagens paginadas por cursor (?cursor=&limit=)
+    path(
+        "feedback/pending/",
+        views.pending_feedback,
+        name="pending-feedback",
+    ),
+    path(
+        "feedback/mine/",
+        views.my_feedback,
+        name="my-feedback",
+    ),
+    path(
+        "companies/<int:company_id>/feedback/",
+        views.company_feedback,
+        name="company-feedback",
+    ),
+]
@@ -1,53 +1,82 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
-from .models import Feedback, UserProfile, RewardTransaction
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from . import accrual, moderation, pagination
+from .models import Company, Feedback, UserProfile, RewardTransaction
 from django.conf import settings
 from decimal import Decimal
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from blockchain.services import BlockchainService
+from blockchain.tasks.withdrawals import schedule_withdrawal
 from decimal import Decimal, InvalidOperation
 from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.urls import reverse
+from web3 import Web3
 
 
 @login_required
-def submit_feedback(request, company_id):
+async def submit_feedback(request, company_id):
     if request.method == 'POST':
         comment = request.POST.get('comment', '')
+        user = await request.auser()
 
-        feedback = Feedback.objects.create(
-            user=request.user,
-            company_id=company_id,
-            comment=comment,
-            is_approved=False
-        )
-        
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.virtual_balance += Decimal(settings.REWARD_PER_FEEDBACK)
-        profile.save()
-        
-
-        RewardTransaction.objects.create(
-            user=request.user,
-            amount=Decimal(settings.REWARD_PER_FEEDBACK),
-            tx_type='REWARD',
-            status='PENDING'
-        )
+        # Feedback, saldo (F()) e RewardTransaction em uma transação
+        feedback, new_balance = await sync_to_async(accrual.submit_feedback)(user, company_id, comment)
         
         return JsonResponse({
             'status': 'success',
             'message': 'Feedback enviado! Você ganhou ' + 
                        str(settings.REWARD_PER_FEEDBACK) + 
                        ' tokens. Eles serão creditados em breve.',
-            'new_balance': str(profile.virtual_balance)
+            # None no modo write-behind: a recompensa ainda não foi aplicada
+            'new_balance': None if new_balance is None else str(new_balance)
         })
     
     return JsonResponse({'status': 'error', 'message': 'Método inválido'}, status=400)
+
+
+def reserve_withdrawal(user, amount, wallet_address):
+    """
+    Debita `amount` de blockchain_balance e cria o saque PENDING na mesma
+    transação; o saque é enfileirado depois do commit. Retorna None se o
+    saldo não for mais suficiente.
+    """
+    with db_transaction.atomic():
+        # Reserva atômica: só debita se ainda houver saldo
+        reserved = UserProfile.objects.filter(
+            user=user,
+            blockchain_balance__gte=amount,
+        ).update(blockchain_balance=F('blockchain_balance') - amount)
+        if not reserved:
+            return None
+
+        withdrawal = RewardTransaction.objects.create(
+            user=user,
+            amount=amount,
+            tx_type='WITHDRAWAL',
+            status='PENDING',
+            to_address=Web3.to_checksum_address(wallet_address),
+        )
+        db_transaction.on_commit(lambda: schedule_withdrawal(withdrawal.id))
+    return withdrawal
+
+
 @login_required
-def withdraw_tokens(request):
+async def withdraw_tokens(request):
+    """
+    Valida o saque, reserva o saldo e enfileira a transferência para o worker
+    de saques (schedule_withdrawal). Nenhuma chamada à blockchain é feita aqui.
+    Sob ASGI, a reserva e o envio ao broker rodam na thread da própria
+    requisição (sync_to_async), sem ocupar um worker por saque.
+    """
     if request.method == 'POST':
         try:
+            user = await request.auser()
 
             amount = Decimal(request.POST.get('amount', '0'))
             wallet_address = request.POST.get('wallet_address', '').strip()
@@ -64,8 +93,10 @@ def withdraw_tokens(request):
                     'message': 'Endereço da carteira é obrigatório'
                 }, status=400)
             
-            profile = UserProfile.objects.get(user=request.user)
-            if amount > profile.blockchain_balance:
+            balance = await UserProfile.objects.filter(user=user).values_list(
+                'blockchain_balance', flat=True
+            ).afirst()
+            if balance is None or amount > balance:
                 return JsonResponse({
                     'status': 'error',
                     'message': 'Saldo insuficiente para saque'
@@ -77,36 +108,27 @@ def withdraw_tokens(request):
                     'status': 'error',
                     'message': f'Saque mínimo é {min_withdrawal} tokens'
                 }, status=400)
-            
 
-            transaction = RewardTransaction.objects.create(
-                user=request.user,
-                amount=amount,
-                tx_type='WITHDRAWAL',
-                status='PENDING'
-            )
-            
-            service = BlockchainService()
-            tx_hash = service.transfer(wallet_address, float(amount))
-            
-            if tx_hash:
-                transaction.tx_hash = tx_hash
-                transaction.status = 'PROCESSING'
-                transaction.save()
-                
-                profile.blockchain_balance -= amount
-                profile.save()
-                
+            if not Web3.is_address(wallet_address):
                 return JsonResponse({
-                    'status': 'success',
-                    'tx_hash': tx_hash,
-                    'message': f'Saque iniciado! Transação: {tx_hash}'
-                })
-            
+                    'status': 'error',
+                    'message': 'Endereço da carteira inválido'
+                }, status=400)
+
+            # Transações (atomic) ainda não têm API assíncrona
+            withdrawal = await sync_to_async(reserve_withdrawal)(user, amount, wallet_address)
+            if withdrawal is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Saldo insuficiente para saque'
+                }, status=400)
+
             return JsonResponse({
-                'status': 'error',
-                'message': 'Falha ao iniciar saque'
-            }, status=500)
+                'status': 'success',
+                'transaction_id': withdrawal.id,
+                'status_url': reverse('withdrawal-status', args=[withdrawal.id]),
+                'message': 'Saque solicitado! Acompanhe o status da transação.'
+            }, status=202)
             
         except InvalidOperation:
             return JsonResponse({
@@ -124,29 +146,155 @@ def withdraw_tokens(request):
         'message': 'Método inválido'
     }, status=400)
 
+
+@login_required
+def withdrawal_status(request, transaction_id):
+    withdrawal = get_object_or_404(
+        RewardTransaction,
+        id=transaction_id,
+        user=request.user,
+        tx_type='WITHDRAWAL',
+    )
+    return JsonResponse({
+        'status': 'success',
+        'transaction_id': withdrawal.id,
+        'withdrawal_status': withdrawal.status,
+        'amount': str(withdrawal.amount),
+        'to_address': withdrawal.to_address,
+        'tx_hash': withdrawal.tx_hash,
+    })
+
 @login_required
 @staff_member_required
-def approve_feedback(request, feedback_id):
-    feedback = get_object_or_404(Feedback, id=feedback_id)
+async def approve_feedback(request, feedback_id):
+    feedback = await aget_object_or_404(Feedback.objects.only('id', 'user_id', 'company_id', 'is_approved'), id=feedback_id)
     
     if feedback.is_approved:
         return JsonResponse({'status': 'error', 'message': 'Feedback já aprovado'})
     
-    feedback.is_approved = True
-    feedback.save()
-    
-    profile, created = UserProfile.objects.get_or_create(user=feedback.user)
-    profile.virtual_balance += Decimal(settings.REWARD_PER_FEEDBACK)
-    profile.save()
-    
-    RewardTransaction.objects.create(
-        user=feedback.user,
-        amount=Decimal(settings.REWARD_PER_FEEDBACK),
-        tx_type='REWARD',
-        status='PENDING'
-    )
+    # Aprovação e recompensa em uma transação; None se outra aprovação chegou antes
+    if await sync_to_async(accrual.approve_feedback)(feedback) is None:
+        return JsonResponse({'status': 'error', 'message': 'Feedback já aprovado'})
     
     return JsonResponse({
         'status': 'success',
         'message': f'Feedback aprovado! Usuário ganhou {settings.REWARD_PER_FEEDBACK} tokens.'
-    })
\ No newline at end of file
+    })
+
+
+
+@login_required
+@staff_member_required
+async def mark_feedback_useful(request, feedback_id):
+    """
+    Marca o feedback como útil (ou desmarca, com o corpo JSON
+    {"useful": false}) e ajusta o useful_count da empresa.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Método inválido'}, status=400)
+
+    try:
+        useful = json.loads(request.body or b'{}').get('useful', True)
+    except (AttributeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Corpo JSON inválido'}, status=400)
+    if not isinstance(useful, bool):
+        return JsonResponse({'status': 'error', 'message': '"useful" deve ser true ou false'}, status=400)
+
+    feedback = await aget_object_or_404(Feedback.objects.only('id', 'company_id', 'is_useful'), id=feedback_id)
+    changed = await sync_to_async(accrual.mark_useful)(feedback, useful)
+    return JsonResponse({
+        'status': 'success',
+        'changed': changed,
+        'is_useful': useful,
+    })
+
+
+@login_required
+@staff_member_required
+async def bulk_approve_feedback(request):
+    """
+    Aprova em massa os feedbacks pendentes escolhidos por um corpo JSON com
+    a lista {"ids": [...]} e/ou um filtro (company_id, user_id,
+    created_before, created_after). Cada lote é um UPDATE ... RETURNING com
+    as recompensas em bulk_create; feedbacks já aprovados são ignorados.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Método inválido'}, status=400)
+
+    try:
+        selection = json.loads(request.body or b'{}')
+        if not isinstance(selection, dict):
+            raise ValueError("O corpo deve ser um objeto JSON")
+        queryset = moderation.select_pending(**selection)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    approved = await sync_to_async(moderation.bulk_approve_feedback)(queryset)
+    return JsonResponse({
+        'status': 'success',
+        'approved': approved,
+        'message': f'{approved} feedbacks aprovados.',
+    })
+
+def _feedback_json(feedback):
+    return {
+        'id': feedback.id,
+        'user_id': feedback.user_id,
+        'company_id': feedback.company_id,
+        'comment': feedback.comment,
+        'created_at': feedback.created_at.isoformat(),
+        'is_approved': feedback.is_approved,
+        'is_useful': feedback.is_useful,
+    }
+
+
+async def _feedback_page(request, queryset, **extra):
+    """Resposta de uma página (?cursor=&limit=) de `queryset` por keyset em (created_at, id)."""
+    try:
+        limit = pagination.page_size(request.GET.get('limit'))
+        items, next_cursor = await pagination.akeyset_page(queryset, request.GET.get('cursor'), limit)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        **extra,
+        'results': [_feedback_json(feedback) for feedback in items],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@staff_member_required
+async def pending_feedback(request):
+    """Fila de moderação: feedbacks não aprovados, mais novos primeiro (índice parcial)."""
+    return await _feedback_page(request, Feedback.objects.filter(is_approved=False))
+
+
+@login_required
+async def company_feedback(request, company_id):
+    """
+    Feedbacks de uma empresa, mais novos primeiro, com os contadores da
+    empresa. Quem não é staff só vê os aprovados.
+    """
+    company = await aget_object_or_404(Company, id=company_id)
+    user = await request.auser()
+
+    queryset = Feedback.objects.filter(company_id=company.id)
+    if not user.is_staff:
+        queryset = queryset.filter(is_approved=True)
+
+    return await _feedback_page(request, queryset, company={
+        'id': company.id,
+        'name': company.name,
+        'feedback_count': company.feedback_count,
+        'approved_count': company.approved_count,
+        'useful_count': company.useful_count,
+    })
+
+
+@login_required
+async def my_feedback(request):
+    """Feedbacks enviados pelo usuário logado, mais novos primeiro."""
+    user = await request.auser()
+    return await _feedback_page(request, Feedback.objects.filter(user_id=user.id))
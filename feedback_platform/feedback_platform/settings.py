@@ -28,6 +28,70 @@ PRIVATE_KEY = os.getenv('PRIVATE_KEY')
 ADMIN_ADDRESS = os.getenv('ADMIN_ADDRESS')
 REWARD_PER_FEEDBACK = Decimal(os.getenv('REWARD_PER_FEEDBACK', '0.5'))
 MIN_WITHDRAWAL = Decimal(os.getenv('MIN_WITHDRAWAL', '50'))
+# Janela (s) para agrupar saques em um batchTransfer; 0 envia cada saque na hora
+WITHDRAWAL_BATCH_WINDOW = int(os.getenv('WITHDRAWAL_BATCH_WINDOW', 10))
+# Saques em PROCESSING sem tx_hash há mais de WITHDRAWAL_CLAIM_TIMEOUT segundos (worker caiu
+# antes de registrar o envio) são devolvidos; verificado a cada WITHDRAWAL_CLAIM_SWEEP_INTERVAL
+WITHDRAWAL_CLAIM_TIMEOUT = int(os.getenv('WITHDRAWAL_CLAIM_TIMEOUT', 900))
+WITHDRAWAL_CLAIM_SWEEP_INTERVAL = int(os.getenv('WITHDRAWAL_CLAIM_SWEEP_INTERVAL', 60))
+# Lotes de batchMint enviados em paralelo por process_reward_batch
+REWARD_MINT_CONCURRENCY = int(os.getenv('REWARD_MINT_CONCURRENCY', 4))
+# Recompensas PENDING reivindicadas por vez (paginação por id) em process_reward_batch
+REWARD_CLAIM_CHUNK_SIZE = int(os.getenv('REWARD_CLAIM_CHUNK_SIZE', 1000))
+# Recompensas em PROCESSING sem tx_hash há mais de REWARD_CLAIM_TIMEOUT segundos (worker
+# caiu antes do mint) voltam para PENDING; verificado a cada REWARD_CLAIM_SWEEP_INTERVAL
+REWARD_CLAIM_TIMEOUT = int(os.getenv('REWARD_CLAIM_TIMEOUT', 900))
+REWARD_CLAIM_SWEEP_INTERVAL = int(os.getenv('REWARD_CLAIM_SWEEP_INTERVAL', 60))
+WEB3_HTTP_TIMEOUT = int(os.getenv('WEB3_HTTP_TIMEOUT', 30))
+WEB3_HEALTHCHECK_INTERVAL = int(os.getenv('WEB3_HEALTHCHECK_INTERVAL', 30))  # segundos
+# Taxas (blockchain/fees.py): eth_feeHistory em cache por FEE_CACHE_TTL segundos (~1 bloco);
+# gorjeta = mediana do percentil dos últimos FEE_HISTORY_BLOCKS blocos (mínimo
+# FEE_MIN_PRIORITY_FEE wei) e maxFeePerGas = FEE_BASE_FEE_MULTIPLIER × base fee + gorjeta
+FEE_CACHE_TTL = float(os.getenv('FEE_CACHE_TTL', 12))
+FEE_HISTORY_BLOCKS = int(os.getenv('FEE_HISTORY_BLOCKS', 10))
+FEE_PRIORITY_PERCENTILE = int(os.getenv('FEE_PRIORITY_PERCENTILE', 50))
+FEE_MIN_PRIORITY_FEE = int(os.getenv('FEE_MIN_PRIORITY_FEE', 1_000_000_000))  # 1 gwei
+FEE_BASE_FEE_MULTIPLIER = float(os.getenv('FEE_BASE_FEE_MULTIPLIER', 2))
+# replace_stuck_transactions: envios pendentes há mais de STUCK_TX_TIMEOUT segundos são
+# re-assinados com o mesmo nonce e taxas × REPLACEMENT_FEE_BUMP (nós exigem +10%),
+# até REPLACEMENT_MAX_FEE_PER_GAS wei (vazio = sem teto)
+STUCK_TX_TIMEOUT = int(os.getenv('STUCK_TX_TIMEOUT', 180))
+STUCK_TX_CHECK_INTERVAL = int(os.getenv('STUCK_TX_CHECK_INTERVAL', 60))  # segundos
+REPLACEMENT_FEE_BUMP = float(os.getenv('REPLACEMENT_FEE_BUMP', 1.125))
+REPLACEMENT_MAX_FEE_PER_GAS = int(os.getenv('REPLACEMENT_MAX_FEE_PER_GAS')) if os.getenv('REPLACEMENT_MAX_FEE_PER_GAS') else None
+# Limites de gas (blockchain/gas.py): estimate_gas do pior caso por função e faixa de
+# tamanho do lote, com folga GAS_LIMIT_MARGIN, reestimado a cada GAS_ESTIMATE_TTL segundos
+GAS_LIMIT_MARGIN = float(os.getenv('GAS_LIMIT_MARGIN', 1.2))
+GAS_ESTIMATE_TTL = int(os.getenv('GAS_ESTIMATE_TTL', 3600))
+# Processos que codificam e assinam as transações da conta admin (blockchain/signing.py);
+# 0 assina inline, na thread que envia
+SIGNING_WORKERS = int(os.getenv('SIGNING_WORKERS', 0))
+# Leitura de saldos em massa (BlockchainService.balances_of): endereços por
+# requisição em lote e lotes em paralelo. Com MULTICALL3_ADDRESS cada lote vira
+# um único eth_call ao Multicall3 (0xcA11bde05977b3631167028862bE2a173976CA11
+# na maioria das redes, incluindo Sepolia)
+BALANCE_READ_CHUNK_SIZE = int(os.getenv('BALANCE_READ_CHUNK_SIZE', 200))
+BALANCE_READ_CONCURRENCY = int(os.getenv('BALANCE_READ_CONCURRENCY', 4))
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS') or None
+# reconcile_balances: perfis por partição e processos em paralelo
+RECONCILIATION_CHUNK_SIZE = int(os.getenv('RECONCILIATION_CHUNK_SIZE', 5000))
+RECONCILIATION_WORKERS = int(os.getenv('RECONCILIATION_WORKERS', 4))
+# Listener de eventos: bloco inicial quando ainda não há cursor salvo (vazio = bloco atual)
+EVENT_LISTENER_START_BLOCK = int(os.getenv('EVENT_LISTENER_START_BLOCK')) if os.getenv('EVENT_LISTENER_START_BLOCK') else None
+# Janela inicial de blocos por get_logs/commit; cresce até EVENT_SCAN_MAX_BLOCK_RANGE
+# enquanto as respostas têm menos de EVENT_SCAN_TARGET_LOGS/2 logs e cai pela metade
+# quando o provider recusa o intervalo
+EVENT_SCAN_BLOCK_RANGE = int(os.getenv('EVENT_SCAN_BLOCK_RANGE', 2000))
+EVENT_SCAN_MAX_BLOCK_RANGE = int(os.getenv('EVENT_SCAN_MAX_BLOCK_RANGE', 100000))
+EVENT_SCAN_TARGET_LOGS = int(os.getenv('EVENT_SCAN_TARGET_LOGS', 1000))
+EVENT_SCAN_CONCURRENCY = int(os.getenv('EVENT_SCAN_CONCURRENCY', 4))  # janelas buscadas em paralelo
+EVENT_POLL_INTERVAL = int(os.getenv('EVENT_POLL_INTERVAL', 5))  # segundos
+# Com WEB3_WS_PROVIDER_URL, tempo em polling HTTP após uma queda do WebSocket antes de reconectar
+EVENT_WS_RETRY_INTERVAL = int(os.getenv('EVENT_WS_RETRY_INTERVAL', 60))  # segundos
+# track_confirmations: blocos até uma transação PROCESSING virar CONFIRMED/FAILED
+CONFIRMATION_DEPTH = int(os.getenv('CONFIRMATION_DEPTH', 12))
+CONFIRMATION_BATCH_SIZE = int(os.getenv('CONFIRMATION_BATCH_SIZE', 100))  # recibos por requisição em lote
+CONFIRMATION_POLL_INTERVAL = int(os.getenv('CONFIRMATION_POLL_INTERVAL', 30))  # segundos
 
 # Configuração do Logger
 LOGGING = {
@@ -163,3 +227,68 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+
+# O cache padrão continua local (LocMem). O alias 'withdrawals' fica no Redis e é
+# compartilhado entre processos: agenda no máximo um lote de saques por janela em
+# todos os workers/servidores
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', CELERY_BROKER_URL)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'withdrawals': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+    },
+}
+
+# Recompensas por feedback: 'db' credita na hora (blockchain/accrual.py); 'redis' só
+# grava o evento em um stream do Redis e flush_reward_ledger aplica os eventos em lote,
+# somados por usuário, a cada REWARD_LEDGER_FLUSH_INTERVAL segundos (blockchain/ledger.py).
+# Para não perder eventos se o Redis cair, use persistência AOF (appendfsync everysec/always)
+REWARD_LEDGER_BACKEND = os.getenv('REWARD_LEDGER_BACKEND', 'db')
+REWARD_LEDGER_REDIS_URL = os.getenv('REWARD_LEDGER_REDIS_URL', CELERY_BROKER_URL)
+REWARD_LEDGER_STREAM = os.getenv('REWARD_LEDGER_STREAM', 'rewards:ledger')
+REWARD_LEDGER_FLUSH_INTERVAL = int(os.getenv('REWARD_LEDGER_FLUSH_INTERVAL', 5))
+REWARD_LEDGER_BATCH_SIZE = int(os.getenv('REWARD_LEDGER_BATCH_SIZE', 5000))
+# Validade do lock de consumidor único; maior que o tempo de um flush
+REWARD_LEDGER_LOCK_TIMEOUT = int(os.getenv('REWARD_LEDGER_LOCK_TIMEOUT', 300))
+# Recompensas gravadas na LedgerOutbox e ainda não aplicadas há mais de
+# REWARD_LEDGER_OUTBOX_GRACE segundos voltam para o stream (XADD perdido)
+REWARD_LEDGER_OUTBOX_GRACE = int(os.getenv('REWARD_LEDGER_OUTBOX_GRACE', 60))
+
+CELERY_BEAT_SCHEDULE = {
+    'track-confirmations': {
+        'task': 'track_confirmations',
+        'schedule': CONFIRMATION_POLL_INTERVAL,
+    },
+    'replace-stuck-transactions': {
+        'task': 'replace_stuck_transactions',
+        'schedule': STUCK_TX_CHECK_INTERVAL,
+    },
+    # Drena os saques PENDING a cada janela; o countdown de schedule_withdrawal só
+    # adianta o primeiro lote
+    **({
+        'process-withdrawal-batch': {
+            'task': 'process_withdrawal_batch',
+            'schedule': WITHDRAWAL_BATCH_WINDOW,
+        },
+    } if WITHDRAWAL_BATCH_WINDOW > 0 else {}),
+    'refund-stale-withdrawals': {
+        'task': 'refund_stale_withdrawals',
+        'schedule': WITHDRAWAL_CLAIM_SWEEP_INTERVAL,
+    },
+    'release-stale-reward-claims': {
+        'task': 'release_stale_reward_claims',
+        'schedule': REWARD_CLAIM_SWEEP_INTERVAL,
+    },
+    'flush-reward-ledger': {
+        'task': 'flush_reward_ledger',
+        'schedule': REWARD_LEDGER_FLUSH_INTERVAL,
+    },
+}
+
+# Nonces da conta admin: 'redis' compartilha o contador entre workers/processos,
+# 'local' mantém em memória (um único processo)
+NONCE_BACKEND = os.getenv('NONCE_BACKEND', 'redis')
+NONCE_REDIS_URL = os.getenv('NONCE_REDIS_URL', CELERY_BROKER_URL)